@@ -0,0 +1,154 @@
+"""
+Fake MCP executor
+
+本地 MCP 執行器替身（WebSocket 傳輸），用於基準測試：
+- execute_task: 按配置的延遲分佈休眠後返回，按錯誤率返回工具錯誤
+- cancel_task: 立即確認
+
+用法:
+    uv run python benchmarks/fake_executor.py --port 18789 --latency-ms 50 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+from typing import Dict
+
+import mcp.types as types
+import uvicorn
+from mcp.server.lowlevel import Server
+from mcp.server.websocket import websocket_server
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+TOOLS = [
+    types.Tool(
+        name="execute_task",
+        description="Sleep for a sampled latency and return a canned result",
+        inputSchema={"type": "object"},
+    ),
+    types.Tool(
+        name="cancel_task",
+        description="Acknowledge a cancellation",
+        inputSchema={"type": "object"},
+    ),
+]
+
+
+class FakeExecutor:
+    """可配置延遲與錯誤率的執行器替身"""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        distribution: str = "exponential",
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        初始化執行器替身
+
+        Args:
+            latency_ms: 延遲中位數/均值（毫秒）
+            distribution: 延遲分佈 (constant / uniform / exponential / lognormal)
+            error_rate: 返回工具錯誤的概率
+            seed: 隨機種子（便於復現）
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats = {"calls": 0, "errors": 0, "cancels": 0}
+        self.server = self._build_server()
+
+    def sample_latency(self) -> float:
+        """
+        按分佈抽樣一次延遲
+
+        Returns:
+            延遲（秒）
+        """
+        mean = self.latency_ms / 1000
+        if self.distribution == "constant":
+            return mean
+        if self.distribution == "uniform":
+            return self.random.uniform(0, 2 * mean)
+        if self.distribution == "exponential":
+            return self.random.expovariate(1 / mean) if mean > 0 else 0.0
+        # lognormal：中位數為 latency_ms，sigma=1 給出明顯的長尾
+        return self.random.lognormvariate(0, 1) * mean
+
+    def _build_server(self) -> Server:
+        """創建 MCP 服務並註冊工具"""
+        server = Server("fake-executor")
+
+        @server.list_tools()
+        async def list_tools():
+            return TOOLS
+
+        @server.call_tool(validate_input=False)
+        async def call_tool(name: str, arguments: Dict):
+            if name == "cancel_task":
+                self.stats["cancels"] += 1
+                return [types.TextContent(type="text", text="cancelled")]
+
+            self.stats["calls"] += 1
+            await asyncio.sleep(self.sample_latency())
+            if self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                raise RuntimeError("Injected executor failure")
+            return [types.TextContent(type="text", text=f"done: {arguments.get('task_id')}")]
+
+        return server
+
+    async def app(self, scope, receive, send):
+        """ASGI 入口：每個 WebSocket 連接運行一個 MCP 會話"""
+        if scope["type"] != "websocket":
+            return
+        async with websocket_server(scope, receive, send) as (read_stream, write_stream):
+            await self.server.run(
+                read_stream, write_stream, self.server.create_initialization_options()
+            )
+
+    def create_server(self, host: str, port: int) -> uvicorn.Server:
+        """
+        創建 uvicorn 服務（調用方負責 serve / should_exit）
+
+        Args:
+            host: 監聽地址
+            port: 監聽端口
+
+        Returns:
+            uvicorn.Server 實例
+        """
+        config = uvicorn.Config(
+            self.app,
+            host=host,
+            port=port,
+            interface="asgi3",
+            log_level="warning",
+            lifespan="off",
+        )
+        return uvicorn.Server(config)
+
+
+def main():
+    """主入口"""
+    parser = argparse.ArgumentParser(description="Fake MCP executor for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18789)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="exponential")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    executor = FakeExecutor(args.latency_ms, args.latency_dist, args.error_rate, args.seed)
+    asyncio.run(executor.create_server(args.host, args.port).serve())
+
+
+if __name__ == "__main__":
+    main()
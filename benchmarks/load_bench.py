@@ -0,0 +1,228 @@
+"""
+Load benchmark
+
+在本地啟動 MCPServer（子進程）與執行器替身，用 N 個併發 WebSocket 客戶端
+發送 create_task 與 get_task_status，測量：
+- tasks_per_sec: 完成任務吞吐量
+- create_task / get_task_status 延遲 p50 / p95 / p99
+- 數據庫寫入速率（任務創建 + 狀態寫入，狀態寫入數取自 get_metrics）
+
+用法:
+    uv run python benchmarks/load_bench.py --clients 16 --requests 50 \\
+        --latency-ms 50 --latency-dist lognormal --error-rate 0.01 --output load.json
+
+輸出為 JSON，便於在不同提交間比較。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+from websockets import connect
+
+from fake_executor import LATENCY_DISTRIBUTIONS, FakeExecutor
+from startup_bench import _env, _free_port, _git_revision, _request
+
+
+def _percentiles(samples: List[float]) -> Dict:
+    """延遲摘要（毫秒，最近秩百分位）"""
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": ordered[-1],
+    }
+
+
+async def _call(websocket, message: Dict) -> Dict:
+    """發送一條消息並解析響應"""
+    await websocket.send(json.dumps(message))
+    return json.loads(await websocket.recv())
+
+
+async def _wait_ready(port: int, timeout: float = 30.0):
+    """等待服務就緒"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            async with connect(f"ws://127.0.0.1:{port}") as websocket:
+                if (await _request(websocket, "get_readiness"))["result"]["ready"]:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.05)
+    raise TimeoutError("Server did not become ready")
+
+
+async def _client(port: int, client_id, requests: int, results: Dict):
+    """單個客戶端：依次創建任務並查詢狀態"""
+    async with connect(f"ws://127.0.0.1:{port}", max_size=None) as websocket:
+        for i in range(requests):
+            started = time.perf_counter()
+            response = await _call(
+                websocket,
+                {
+                    "method": "create_task",
+                    "params": {"description": f"Benchmark task {client_id}-{i}"},
+                },
+            )
+            results["create_task"].append((time.perf_counter() - started) * 1000)
+
+            result = response.get("result") or {}
+            results["statuses"][result.get("status", "error")] += 1
+            task_id = result.get("task_id")
+            if not task_id:
+                continue
+
+            started = time.perf_counter()
+            await _call(
+                websocket, {"method": "get_task_status", "params": {"task_id": task_id}}
+            )
+            results["get_task_status"].append((time.perf_counter() - started) * 1000)
+
+
+def _new_results() -> Dict:
+    """空的結果收集器"""
+    return {"create_task": [], "get_task_status": [], "statuses": Counter()}
+
+
+def _state_writes(metrics: Dict) -> int:
+    """從 get_metrics 結果統計狀態寫入次數"""
+    return sum(
+        sample["count"]
+        for sample in metrics.get("omni_stage_duration_seconds", [])
+        if sample["labels"]["stage"] == "state_write"
+    )
+
+
+async def run(args) -> Dict:
+    """
+    執行一次負載測試
+
+    Returns:
+        結果報告
+    """
+    executor = FakeExecutor(args.latency_ms, args.latency_dist, args.error_rate, args.seed)
+    executor_port = _free_port()
+    executor_server = executor.create_server("127.0.0.1", executor_port)
+    executor_task = asyncio.create_task(executor_server.serve())
+    while not executor_server.started:
+        await asyncio.sleep(0.01)
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "config.yaml"), "w", encoding="utf-8") as f:
+            f.write(
+                f"mcp_server_url: ws://127.0.0.1:{executor_port}\n"
+                "config_watch:\n  enabled: false\n"
+                f"scheduler:\n  max_concurrency: {args.max_concurrency}\n"
+            )
+
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.main"],
+            cwd=workdir,
+            env=_env(port),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            await _wait_ready(port)
+
+            # 預熱：首個任務會加載 mcp 並建立執行器連接，不計入結果
+            if args.warmup:
+                await _client(port, "warmup", args.warmup, _new_results())
+            async with connect(f"ws://127.0.0.1:{port}", max_size=None) as websocket:
+                baseline = (await _request(websocket, "get_metrics"))["result"]
+            executor_baseline = dict(executor.stats)
+
+            results = _new_results()
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(_client(port, i, args.requests, results) for i in range(args.clients))
+            )
+            duration = time.perf_counter() - started
+
+            async with connect(f"ws://127.0.0.1:{port}", max_size=None) as websocket:
+                metrics = (await _request(websocket, "get_metrics"))["result"]
+        finally:
+            process.terminate()
+            process.wait()
+            executor_server.should_exit = True
+            await executor_task
+
+    completed = results["statuses"].get("completed", 0)
+    created = sum(results["statuses"].values()) - results["statuses"].get("error", 0)
+    db_writes = created + _state_writes(metrics) - _state_writes(baseline)
+
+    return {
+        "benchmark": "load",
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "params": {
+            "clients": args.clients,
+            "requests_per_client": args.requests,
+            "max_concurrency": args.max_concurrency,
+            "latency_ms": args.latency_ms,
+            "latency_dist": args.latency_dist,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+            "warmup": args.warmup,
+        },
+        "duration_s": duration,
+        "tasks_per_sec": completed / duration if duration else 0.0,
+        "statuses": dict(results["statuses"]),
+        "latency_ms": {
+            "create_task": _percentiles(results["create_task"]),
+            "get_task_status": _percentiles(results["get_task_status"]),
+        },
+        "db": {"writes": db_writes, "writes_per_sec": db_writes / duration if duration else 0.0},
+        "executor": {
+            name: count - executor_baseline[name] for name, count in executor.stats.items()
+        },
+    }
+
+
+def main():
+    """主入口"""
+    parser = argparse.ArgumentParser(description="Omni-Orchestrator load benchmark")
+    parser.add_argument("--clients", type=int, default=8, help="併發客戶端數")
+    parser.add_argument("--requests", type=int, default=25, help="每個客戶端的任務數")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="調度器執行槽上限")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="執行器延遲（毫秒）")
+    parser.add_argument(
+        "--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="exponential", help="延遲分佈"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="執行器錯誤率")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    parser.add_argument("--warmup", type=int, default=1, help="預熱任務數（不計入結果）")
+    parser.add_argument("--output", help="結果 JSON 文件（默認輸出到 stdout）")
+    args = parser.parse_args()
+
+    output = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Metrics overhead benchmark
+
+在同一進程中用執行器替身（立即返回或固定延遲）順序執行 process_task，
+比較開啟與關閉指標統計時的單任務耗時：
+- on_us / off_us: 默認的 MetricsRegistry 與空操作的 NullMetrics 下的單任務耗時，
+  兩種模式交替多輪取中位數；overhead_pct 為兩者之差（受 SQLite 提交耗時抖動影響）
+- direct_us: 記錄一個任務實際產生的全部統計調用，在 MetricsRegistry 上重放計時，
+  得到單任務的指標開銷；direct_pct = direct_us / off_us × 100
+
+執行器延遲為 0 時只剩協調器自身的開銷，是指標開銷佔比的上界。
+
+用法:
+    uv run python benchmarks/metrics_overhead_bench.py --tasks 2000 --rounds 5 --output metrics.json
+
+輸出為 JSON，便於在不同提交間比較。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Optional
+
+from startup_bench import REPO_ROOT, _git_revision
+
+sys.path.insert(0, REPO_ROOT)
+
+from src.metrics import MetricsRegistry  # noqa: E402
+from src.orchestrator import Orchestrator  # noqa: E402
+
+
+class _NullMetric:
+    """空操作指標（可選記錄調用）"""
+
+    def __init__(self, name: str, calls: Optional[list]):
+        self.name = name
+        self.calls = calls
+
+    def inc(self, amount: float = 1.0, **labels):
+        """不計數"""
+        if self.calls is not None:
+            self.calls.append((self.name, "inc", labels))
+
+    def observe(self, value: float, **labels):
+        """不記錄"""
+        if self.calls is not None:
+            self.calls.append((self.name, "observe", labels))
+
+
+class NullMetrics:
+    """與 MetricsRegistry 接口相同、不做任何統計的註冊表"""
+
+    def __init__(self, calls: Optional[list] = None):
+        """
+        Args:
+            calls: 傳入列表時記錄每次統計調用 (指標, 方法, 標籤)
+        """
+        self.calls = calls
+        self.stage_duration = _NullMetric("stage_duration", calls)
+        self.stage_errors = _NullMetric("stage_errors", calls)
+        self.tasks = _NullMetric("tasks", calls)
+
+    @contextmanager
+    def time(self, stage: str, **labels):
+        """不計時"""
+        if self.calls is not None:
+            self.calls.append((None, "time", {"stage": stage, **labels}))
+        yield
+
+    def snapshot(self) -> dict:
+        """無指標"""
+        return {}
+
+
+class StubExecutor:
+    """執行器替身：休眠固定延遲後返回，同時充當 MCPClientRegistry"""
+
+    session = None
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    async def connect(self):
+        """無需連接"""
+
+    async def close(self):
+        """無需斷開"""
+
+    def get(self, name: str) -> "StubExecutor":
+        """所有執行器共用同一個替身"""
+        return self
+
+    async def call_tool(self, name: str, timeout=None, **arguments):
+        """按固定延遲響應"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return SimpleNamespace(content="ok", usage={"input_tokens": 10, "output_tokens": 10})
+
+
+async def run_round(orchestrator: Orchestrator, metrics, tasks: int, offset: int) -> float:
+    """
+    順序執行 tasks 個任務
+
+    Returns:
+        單任務平均耗時（微秒）
+    """
+    orchestrator.metrics = metrics
+    started = time.perf_counter()
+    for i in range(tasks):
+        result = await orchestrator.process_task(f"Benchmark task {offset + i}")
+        if result["status"] != "completed":
+            raise RuntimeError(f"Task failed: {result}")
+    return (time.perf_counter() - started) / tasks * 1e6
+
+
+def replay_calls(calls: list, repeat: int = 10000) -> float:
+    """
+    在 MetricsRegistry 上重放一個任務的統計調用
+
+    Returns:
+        單任務的指標開銷（微秒）
+    """
+    registry = MetricsRegistry()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for name, method, labels in calls:
+            if method == "time":
+                with registry.time(**labels):
+                    pass
+            elif method == "observe":
+                getattr(registry, name).observe(0.001, **labels)
+            else:
+                getattr(registry, name).inc(**labels)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+async def measure(tasks: int, rounds: int, latency_ms: float) -> dict:
+    """
+    交替測量開啟與關閉指標時的單任務耗時
+
+    Returns:
+        {"on_us", "off_us", "overhead_us", "overhead_pct", "calls_per_task",
+         "direct_us", "direct_pct", "samples"}
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        config_path = os.path.join(workdir, "config.yaml")
+        with open(config_path, "w", encoding="utf-8") as f:
+            f.write(
+                "model_list: []\n"
+                f"state_manager:\n  db_path: {os.path.join(workdir, 'state.db')}\n"
+                "config_watch:\n  enabled: false\n"
+            )
+        orchestrator = Orchestrator(config_path=config_path)
+        stub = StubExecutor(latency_ms)
+        orchestrator.mcp_client = stub
+        orchestrator.mcp_clients = stub
+
+        # 預熱（導入、SQLite 頁緩存、路由表）
+        await run_round(orchestrator, MetricsRegistry(), min(tasks, 200), -1000000)
+
+        samples = {"on": [], "off": []}
+        offset = 0
+        for _ in range(rounds):
+            for mode, metrics in (("off", NullMetrics()), ("on", MetricsRegistry())):
+                samples[mode].append(await run_round(orchestrator, metrics, tasks, offset))
+                offset += tasks
+
+        calls: list = []
+        await run_round(orchestrator, NullMetrics(calls), 1, offset)
+        await orchestrator.shutdown()
+
+    on = statistics.median(samples["on"])
+    off = statistics.median(samples["off"])
+    direct = replay_calls(calls)
+    return {
+        "on_us": on,
+        "off_us": off,
+        "overhead_us": on - off,
+        "overhead_pct": (on - off) / off * 100,
+        "calls_per_task": len(calls),
+        "direct_us": direct,
+        "direct_pct": direct / off * 100,
+        "samples": samples,
+    }
+
+
+def main():
+    """主入口"""
+    parser = argparse.ArgumentParser(description="Omni-Orchestrator metrics overhead benchmark")
+    parser.add_argument("--tasks", type=int, default=2000, help="每輪任務數")
+    parser.add_argument("--rounds", type=int, default=5, help="開啟/關閉交替輪數")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="執行器替身延遲（毫秒）")
+    parser.add_argument("--output", help="結果 JSON 文件（默認輸出到 stdout）")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    result = asyncio.run(measure(args.tasks, args.rounds, args.latency_ms))
+
+    report = {
+        "benchmark": "metrics_overhead",
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "tasks": args.tasks,
+        "rounds": args.rounds,
+        "latency_ms": args.latency_ms,
+        **result,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Startup benchmark
+
+測量冷啟動性能：
+- import_ms: `import src.main` 的導入耗時（全新解釋器）
+- first_pong_ms: 從啟動 `python -m src.main` 到收到首個 pong 的時間
+- ready_ms: 從啟動到 get_readiness 報告就緒的時間
+
+用法:
+    uv run python benchmarks/startup_bench.py --runs 5 --output startup.json
+
+輸出為 JSON，便於在不同提交間比較。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from websockets import connect
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = (
+    "import time; t = time.perf_counter(); import src.main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def _free_port() -> int:
+    """獲取一個空閒端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(port: int = 0) -> dict:
+    """子進程環境變量"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["OMNI_HOST"] = "127.0.0.1"
+    env["OMNI_PORT"] = str(port)
+    return env
+
+
+def measure_import() -> float:
+    """在全新解釋器中測量導入耗時（毫秒）"""
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=REPO_ROOT, env=_env()
+    )
+    return float(output.strip())
+
+
+async def _request(websocket, method: str) -> dict:
+    """發送請求並解析響應"""
+    await websocket.send(json.dumps({"method": method}))
+    return json.loads(await websocket.recv())
+
+
+async def measure_first_pong(timeout: float = 30.0) -> dict:
+    """
+    啟動服務並輪詢，直到收到首個 pong 和就緒報告
+
+    Returns:
+        {"first_pong_ms": ..., "ready_ms": ...}
+    """
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "config.yaml"), "w", encoding="utf-8") as f:
+            f.write("config_watch:\n  enabled: false\n")
+
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.main"],
+            cwd=workdir,
+            env=_env(port),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            first_pong_ms = None
+            while time.perf_counter() - started < timeout:
+                try:
+                    async with connect(f"ws://127.0.0.1:{port}") as websocket:
+                        if (await _request(websocket, "ping")).get("result") == "pong":
+                            first_pong_ms = (time.perf_counter() - started) * 1000
+                        while True:
+                            readiness = await _request(websocket, "get_readiness")
+                            if readiness["result"]["ready"]:
+                                return {
+                                    "first_pong_ms": first_pong_ms,
+                                    "ready_ms": (time.perf_counter() - started) * 1000,
+                                }
+                            await asyncio.sleep(0.005)
+                except OSError:
+                    await asyncio.sleep(0.005)
+            raise TimeoutError("Server did not become ready")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def _summary(samples: list) -> dict:
+    """統計摘要"""
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+
+def _git_revision() -> str:
+    """當前提交"""
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT)
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    """主入口"""
+    parser = argparse.ArgumentParser(description="Omni-Orchestrator startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="重複次數")
+    parser.add_argument("--output", help="結果 JSON 文件（默認輸出到 stdout）")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    startups = [asyncio.run(measure_first_pong()) for _ in range(args.runs)]
+
+    report = {
+        "benchmark": "startup",
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": _summary(imports),
+        "first_pong_ms": _summary([s["first_pong_ms"] for s in startups]),
+        "ready_ms": _summary([s["ready_ms"] for s in startups]),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Task record benchmark
+
+比較待處理任務的兩種物化方式（同一查詢、同一數據庫）：
+- dict: 每行構造一個字典（TaskRecord 之前的做法）
+- record: 游標 row_factory 直接構造 TaskRecord（slots，無實例 __dict__）
+
+對每種方式測量：
+- peak_mb: tracemalloc 記錄的物化峰值內存
+- load_ms: 物化全部行的耗時（不開啟 tracemalloc）
+- encode_ms: 全部任務 JSON 編碼的耗時
+
+用法:
+    uv run python benchmarks/task_record_bench.py --tasks 1000000 --output task_record.json
+
+輸出為 JSON，便於在不同提交間比較。
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.state_manager import StateManager, TaskRecord, TaskState  # noqa: E402
+
+QUERY = f"SELECT {StateManager._SELECT_COLUMNS} FROM tasks WHERE state != ?"
+COLUMNS = TaskRecord.FIELDS
+
+
+def populate(manager: StateManager, count: int, batch: int = 50000):
+    """寫入 count 個待處理任務（無主，便於模擬共享隊列積壓）"""
+    now = time.time()
+    states = [TaskState.IDLE.value, TaskState.DISPATCHING.value, TaskState.EXECUTING.value]
+    for start in range(0, count, batch):
+        rows = [
+            (
+                str(uuid.uuid4()),
+                f"Pending task {i}",
+                states[i % len(states)],
+                f"session-{i % 1000}",
+                now + 60,
+            )
+            for i in range(start, min(start + batch, count))
+        ]
+        manager.conn.executemany(
+            "INSERT INTO tasks (task_id, description, state, created_at, updated_at, "
+            "session_id, deadline) VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?)",
+            rows,
+        )
+    manager.conn.commit()
+
+
+def load_dicts(manager: StateManager) -> list:
+    """每行構造字典"""
+    cursor = manager.conn.execute(QUERY, (TaskState.COMPLETED.value,))
+    return [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def load_records(manager: StateManager) -> list:
+    """游標直接構造 TaskRecord"""
+    cursor = manager.conn.cursor()
+    cursor.row_factory = TaskRecord.from_row
+    cursor.execute(QUERY, (TaskState.COMPLETED.value,))
+    return cursor.fetchall()
+
+
+def encode_dicts(tasks: list):
+    """字典 JSON 編碼"""
+    for task in tasks:
+        json.dumps(task, separators=(",", ":"))
+
+
+def encode_records(tasks: list):
+    """TaskRecord JSON 編碼"""
+    for task in tasks:
+        task.to_json()
+
+
+def measure(manager: StateManager, load, encode) -> dict:
+    """
+    測量一種物化方式
+
+    Returns:
+        {"count", "peak_mb", "load_ms", "encode_ms"}
+    """
+    gc.collect()
+    tracemalloc.start()
+    tasks = load(manager)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(tasks)
+    del tasks
+    gc.collect()
+
+    started = time.perf_counter()
+    tasks = load(manager)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    encode(tasks)
+    encode_ms = (time.perf_counter() - started) * 1000
+    del tasks
+    gc.collect()
+
+    return {
+        "count": count,
+        "peak_mb": peak / (1024 * 1024),
+        "load_ms": load_ms,
+        "encode_ms": encode_ms,
+    }
+
+
+def _git_revision() -> str:
+    """當前提交"""
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT)
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    """主入口"""
+    parser = argparse.ArgumentParser(description="Omni-Orchestrator task record benchmark")
+    parser.add_argument("--tasks", type=int, default=1000000, help="待處理任務數")
+    parser.add_argument("--output", help="結果 JSON 文件（默認輸出到 stdout）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        manager = StateManager(os.path.join(workdir, "state.db"))
+        populate(manager, args.tasks)
+        dicts = measure(manager, load_dicts, encode_dicts)
+        records = measure(manager, load_records, encode_records)
+        manager.close()
+
+    report = {
+        "benchmark": "task_record",
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "tasks": args.tasks,
+        "dict": dicts,
+        "record": records,
+        "memory_ratio": records["peak_mb"] / dicts["peak_mb"] if dicts["peak_mb"] else None,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# src/batch_ingest.py
+"""
+Omni-Orchestrator 离线批量导入
+
+从 JSONL 文件逐行读取任务，经由与 WebSocket 服务相同的
+RouterDecision / StateManager / 执行器流程处理，结果流式写入输出 JSONL。
+
+- 有界并发：同时在途的任务数固定，内存占用与输入文件大小无关
+- 断点续传：定期写入检查点（已完成行的水位线与输出文件长度），中断后从断点继续
+- 收到 SIGTERM/SIGINT 后停止读取新行并等待在途任务完成；再次收到信号时立即取消
+- 与服务共享数据库：运行期间为本进程的任务续约，但不拉取共享队列中的任务
+
+用法:
+    python -m src.batch_ingest tasks.jsonl -o results.jsonl [-c 8] [--config config.yaml]
+
+输入每行一个 JSON 对象:
+    {"description": "...", "id": "...", "priority": "batch", "timeout": 60,
+     "session_id": "...", "deterministic": true}
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+from src.log_pipeline import LogPipeline
+from src.result_cache import encode_default
+from src.scheduler import PriorityClass
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def parse_line(raw: bytes) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    解析一行任务
+
+    Args:
+        raw: 原始行（含换行符）
+
+    Returns:
+        (任务参数, 错误信息)；空行返回 (None, None)。
+        与 create_task 相同的校验：优先级、超时/截止时间、session_id；
+        timeout（相对秒数）优先于 deadline，统一换算为 deadline（Unix 时间戳）
+    """
+    text = raw.strip()
+    if not text:
+        return None, None
+    try:
+        item = json.loads(text)
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+    if not isinstance(item, dict) or not isinstance(item.get("description"), str):
+        return None, "Missing description"
+    if not item["description"]:
+        return None, "Missing description"
+    priority = item.get("priority")
+    if priority is not None:
+        try:
+            PriorityClass(priority)
+        except ValueError:
+            return None, f"Invalid priority: {priority}"
+    try:
+        if item.get("timeout") is not None:
+            item["deadline"] = time.time() + float(item["timeout"])
+        elif item.get("deadline") is not None:
+            item["deadline"] = float(item["deadline"])
+    except (TypeError, ValueError):
+        return None, "Invalid timeout or deadline"
+    session_id = item.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return None, "Invalid session_id"
+    return item, None
+
+
+class BatchIngest:
+    """JSONL 批量导入器"""
+
+    def __init__(
+        self,
+        orchestrator,
+        input_path: str,
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        concurrency: int = 8,
+        checkpoint_every: int = 100,
+    ):
+        """
+        Args:
+            orchestrator: Orchestrator 实例
+            input_path: 输入 JSONL 文件
+            output_path: 输出 JSONL 文件（续传时追加）
+            checkpoint_path: 检查点文件，默认为输出文件名加 .checkpoint
+            concurrency: 同时在途的任务数
+            checkpoint_every: 每完成多少行写入一次检查点
+        """
+        self.orchestrator = orchestrator
+        self.input_path = input_path
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_every = max(1, checkpoint_every)
+
+        # 收到停止信号后置位：不再读取新行
+        self.stopping = asyncio.Event()
+        # 水位线：该行及之前的所有行均已完成；offset 为其后一行的字节偏移
+        self._line = 0
+        self._offset = 0
+        # 水位线之后已完成的行 → 行尾偏移（规模不超过在途窗口）
+        self._done: Dict[int, int] = {}
+        self._since_checkpoint = 0
+        self._output = None
+        self.stats = {"completed": 0, "failed": 0, "skipped": 0}
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        """读取与当前输入文件匹配的检查点"""
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("input") != os.path.abspath(self.input_path):
+            logger.warning("检查点属于其他输入文件，忽略: %s", self.checkpoint_path)
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self):
+        """先落盘输出，再原子替换检查点"""
+        self._output.flush()
+        os.fsync(self._output.fileno())
+        checkpoint = {
+            "input": os.path.abspath(self.input_path),
+            "line": self._line,
+            "offset": self._offset,
+            "done": sorted(self._done),
+            "output_size": self._output.tell(),
+            "updated_at": time.time(),
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+
+    def _mark_done(self, line_no: int, end_offset: int):
+        """记录完成的行并推进水位线"""
+        self._done[line_no] = end_offset
+        while self._line + 1 in self._done:
+            self._line += 1
+            self._offset = self._done.pop(self._line)
+
+    def _write(self, row: Dict):
+        """写入一行结果"""
+        line = json.dumps(row, ensure_ascii=False, default=encode_default) + "\n"
+        self._output.write(line.encode("utf-8"))
+
+    async def run(self) -> Dict:
+        """
+        处理整个输入文件（或从检查点继续）
+
+        Returns:
+            统计 {completed, failed, skipped, resumed_from, line, interrupted}
+        """
+        checkpoint = self._load_checkpoint()
+        resume_done = set()
+        if checkpoint is not None:
+            self._line = checkpoint["line"]
+            self._offset = checkpoint["offset"]
+            resume_done = set(checkpoint.get("done", []))
+            # 截掉上次检查点之后写入的结果，这些行会重新处理
+            self._output = open(self.output_path, "r+b")
+            self._output.truncate(checkpoint["output_size"])
+            self._output.seek(0, os.SEEK_END)
+            logger.info("从检查点继续: 第 %d 行之后", self._line)
+        else:
+            self._output = open(self.output_path, "wb")
+        resumed_from = self._line
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        # 读取与执行并行：任一协程异常时立即结束，读取方不会阻塞在已满的队列上
+        workers.append(asyncio.create_task(self._read(queue, resume_done)))
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._save_checkpoint()
+            self._output.close()
+
+        return {
+            **self.stats,
+            "resumed_from": resumed_from,
+            "line": self._line,
+            "interrupted": self.stopping.is_set(),
+        }
+
+    async def _read(self, queue: asyncio.Queue, resume_done: set):
+        """逐行读取输入并放入有界队列，结束后为每个工作协程放入结束标记"""
+        await self._read_lines(queue, resume_done)
+        for _ in range(self.concurrency):
+            await queue.put(_STOP)
+
+    async def _read_lines(self, queue: asyncio.Queue, resume_done: set):
+        """逐行读取输入（从水位线偏移开始，跳过检查点中已完成的行）"""
+        with open(self.input_path, "rb") as f:
+            f.seek(self._offset)
+            line_no = self._line
+            for raw in iter(f.readline, b""):
+                line_no += 1
+                end_offset = f.tell()
+                if line_no in resume_done:
+                    self.stats["skipped"] += 1
+                    self._mark_done(line_no, end_offset)
+                    continue
+                if self.stopping.is_set():
+                    return
+                # 队列满时等待空闲槽位（背压：最多读取在途窗口内的行）
+                await queue.put((line_no, end_offset, raw))
+
+    async def _worker(self, queue: asyncio.Queue):
+        """从队列取任务并执行，直到收到结束标记"""
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+            line_no, end_offset, raw = item
+            row = await self._process(line_no, raw)
+            self._write(row)
+            self._mark_done(line_no, end_offset)
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= self.checkpoint_every:
+                self._save_checkpoint()
+
+    async def _process(self, line_no: int, raw: bytes) -> Dict:
+        """
+        执行一行任务
+
+        Returns:
+            输出行（line、id 与 process_task 的结果）
+        """
+        item, error = parse_line(raw)
+        if item is None:
+            if error is None:
+                self.stats["skipped"] += 1
+                return {"line": line_no, "status": "skipped"}
+            self.stats["failed"] += 1
+            return {"line": line_no, "status": "failed", "error": error}
+
+        result = await self.orchestrator.process_task(
+            item["description"],
+            priority=item.get("priority"),
+            deadline=item.get("deadline"),
+            session_id=item.get("session_id"),
+            deterministic=item.get("deterministic", True) is not False,
+        )
+        self.stats["completed" if result.get("status") == "completed" else "failed"] += 1
+        return {"line": line_no, "id": item.get("id"), **result}
+
+    def install_signal_handlers(self, on_force_stop):
+        """
+        注册 SIGTERM/SIGINT：第一次停止读取，第二次调用 on_force_stop
+
+        Args:
+            on_force_stop: 再次收到信号时的回调（取消在途任务）
+        """
+        loop = asyncio.get_running_loop()
+
+        def handler():
+            if self.stopping.is_set():
+                on_force_stop()
+                return
+            logger.info("收到停止信号，等待在途任务完成后写入检查点")
+            self.stopping.set()
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, handler)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch_ingest", description="JSONL 任务批量导入"
+    )
+    parser.add_argument("input", help="输入 JSONL 文件")
+    parser.add_argument("-o", "--output", required=True, help="输出 JSONL 文件")
+    parser.add_argument("--checkpoint", help="检查点文件（默认 <output>.checkpoint）")
+    parser.add_argument(
+        "-c", "--concurrency", type=int, help="同时在途的任务数（默认 scheduler.max_concurrency）"
+    )
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="检查点间隔（行）")
+    parser.add_argument("--config", default="config.yaml", help="配置文件路径")
+    return parser
+
+
+async def main(argv=None) -> int:
+    """批量导入入口"""
+    args = build_parser().parse_args(argv)
+    log_pipeline = LogPipeline()
+    log_pipeline.install()
+
+    from src.orchestrator import Orchestrator
+
+    orchestrator = Orchestrator(config_path=args.config)
+    log_pipeline.install(orchestrator.config.config.get("logging"))
+    # 与服务共享数据库时为本进程的任务续约，避免租约过期被接管后重复执行；
+    # 只续约不拉取，不认领服务的任务
+    if orchestrator.lease_keeper is not None:
+        orchestrator.lease_keeper.start(pull=False)
+    ingest = BatchIngest(
+        orchestrator,
+        args.input,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        concurrency=args.concurrency or orchestrator.scheduler.max_concurrency,
+        checkpoint_every=args.checkpoint_every,
+    )
+    run = asyncio.create_task(ingest.run())
+    ingest.install_signal_handlers(run.cancel)
+
+    try:
+        report = await run
+    except asyncio.CancelledError:
+        report = {**ingest.stats, "line": ingest._line, "interrupted": True}
+    finally:
+        await orchestrator.shutdown()
+        log_pipeline.stop()
+
+    print(json.dumps(report, ensure_ascii=False))
+    return 1 if report.get("interrupted") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
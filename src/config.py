@@ -5,17 +5,91 @@ Configuration management module
 - 加载配置文件
 - API Key 管理（主/備用）
 - 環境變量覆蓋
+- 配置校驗與熱重載（不可變快照原子替換）
 """
 
+import asyncio
+import logging
 import os
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, List, Optional
+
 import yaml
 
+from src.scheduler import PriorityClass
+
+logger = logging.getLogger(__name__)
+
+
+def _freeze(value: Any) -> Any:
+    """將配置遞歸轉換為只讀結構（dict → MappingProxyType, list → tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _check_number(value: Any, name: str, allow_zero: bool = False):
+    """
+    校驗可選的數值配置項（未配置時跳過）
+
+    Args:
+        value: 配置值
+        name: 配置項路徑（用於錯誤信息）
+        allow_zero: 是否允許 0
+
+    Raises:
+        ValueError: 不是數值，或為負數（allow_zero 為 False 時含 0）
+    """
+    if value is None:
+        return
+    if (
+        not isinstance(value, (int, float))
+        or isinstance(value, bool)
+        or value < 0
+        or (value == 0 and not allow_zero)
+    ):
+        kind = "non-negative" if allow_zero else "positive"
+        raise ValueError(f"{name} must be a {kind} number")
+
+
+def _check_integer(value: Any, name: str):
+    """校驗可選的正整數配置項（未配置時跳過）"""
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value <= 0):
+        raise ValueError(f"{name} must be a positive integer")
+
 
 class Config:
     """配置管理類"""
 
     DEFAULT_GITHUB_KEY = "${GITHUB_LITELLM_KEY}"
 
+    # 必須為映射的配置段
+    SECTIONS = (
+        "mcp_servers",
+        "fault_handler",
+        "router",
+        "scheduler",
+        "result_cache",
+        "result_store",
+        "response_cache",
+        "retry",
+        "recovery",
+        "state_manager",
+        "logging",
+        "config_watch",
+        "shutdown",
+        "metrics",
+        "profiler",
+        "traffic_capture",
+        "usage",
+        "conversations",
+        "leases",
+        "server",
+    )
+
     def __init__(self, config_path: str = "config.yaml"):
         """
         初始化配置
@@ -23,25 +97,218 @@ class Config:
         Args:
             config_path: 配置文件路徑
         """
+        self.config_path = config_path
         self.config = self._load_config(config_path)
 
-    def _load_config(self, path: str) -> dict:
+    def _load_config(self, path: str) -> Mapping:
         """
-        加載配置文件
+        加載並校驗配置文件
 
         Args:
             path: 配置文件路徑
 
         Returns:
-            配置字典
+            只讀配置快照
+
+        Raises:
+            ValueError: 配置無效
         """
         with open(path, "r", encoding="utf-8") as f:
             config = yaml.safe_load(f) or {}
 
+        self.validate(config)
+
         # GitHub Key: 配置優先，環境變量兜底，最後使用默認值
         github_key = config.get("github_key")
         if not github_key:
             github_key = os.getenv("GITHUB_LITELLM_KEY", self.DEFAULT_GITHUB_KEY)
 
         config["github_key"] = github_key
-        return config
+        return _freeze(config)
+
+    @classmethod
+    def validate(cls, config: Any):
+        """
+        校驗配置結構
+
+        Args:
+            config: 解析後的配置
+
+        Raises:
+            ValueError: 配置無效
+        """
+        if not isinstance(config, dict):
+            raise ValueError("Config root must be a mapping")
+
+        for section in cls.SECTIONS:
+            if section in config and not isinstance(config[section], dict):
+                raise ValueError(f"Config section '{section}' must be a mapping")
+
+        # 熱重載時各組件直接以 float() / int() 讀取以下配置：在替換快照前全部校驗，
+        # 任一項無效則整體保留舊配置
+        fault_config = config.get("fault_handler", {})
+        for key in (
+            "lite_llm_timeout",
+            "consecutive_failures_threshold",
+            "cloud_failure_threshold",
+            "cloud_check_timeout",
+        ):
+            _check_number(fault_config.get(key), f"fault_handler.{key}")
+        _check_number(
+            fault_config.get("health_check_interval"),
+            "fault_handler.health_check_interval",
+            allow_zero=True,
+        )
+
+        threshold = config.get("router", {}).get("complexity_threshold")
+        if threshold is not None and (
+            not isinstance(threshold, (int, float)) or not 0 <= threshold <= 100
+        ):
+            raise ValueError("router.complexity_threshold must be between 0 and 100")
+
+        scheduler_config = config.get("scheduler", {})
+        _check_integer(scheduler_config.get("max_concurrency"), "scheduler.max_concurrency")
+        for key in ("aging_rate", "sjf_seconds_per_point"):
+            _check_number(scheduler_config.get(key), f"scheduler.{key}", allow_zero=True)
+        weights = scheduler_config.get("weights") or {}
+        if not isinstance(weights, dict):
+            raise ValueError("scheduler.weights must be a mapping")
+        classes = {priority.value for priority in PriorityClass}
+        for name, weight in weights.items():
+            if name not in classes:
+                raise ValueError(f"scheduler.weights.{name} is not a priority class")
+            _check_number(weight, f"scheduler.weights.{name}")
+
+        usage_config = config.get("usage", {})
+        for section in ("prices", "budgets"):
+            if not isinstance(usage_config.get(section) or {}, dict):
+                raise ValueError(f"usage.{section} must be a mapping")
+        for model, price in (usage_config.get("prices") or {}).items():
+            if not isinstance(price, dict):
+                raise ValueError(f"usage.prices.{model} must be a mapping")
+            for key in ("input", "output"):
+                _check_number(price.get(key), f"usage.prices.{model}.{key}", allow_zero=True)
+        for name, budget in (usage_config.get("budgets") or {}).items():
+            if not isinstance(budget, dict) or budget.get("limit") is None:
+                raise ValueError(f"usage.budgets.{name} must define a limit")
+            _check_number(budget["limit"], f"usage.budgets.{name}.limit")
+            _check_number(budget.get("window_seconds"), f"usage.budgets.{name}.window_seconds")
+        budget_threshold = usage_config.get("budget_threshold")
+        if budget_threshold is not None and (
+            not isinstance(budget_threshold, (int, float))
+            or isinstance(budget_threshold, bool)
+            or not 0 < budget_threshold <= 1
+        ):
+            raise ValueError("usage.budget_threshold must be greater than 0 and at most 1")
+        _check_integer(usage_config.get("batch_size"), "usage.batch_size")
+        _check_number(usage_config.get("flush_interval"), "usage.flush_interval", allow_zero=True)
+
+        for name, server in config.get("mcp_servers", {}).items():
+            if not isinstance(server, dict) or not server.get("url"):
+                raise ValueError(f"mcp_servers.{name} must define a url")
+
+    def reload(self) -> Optional[Mapping]:
+        """
+        重新加載配置文件並原子替換快照
+
+        Returns:
+            舊快照；配置無效時保留舊配置並返回 None
+        """
+        try:
+            new_config = self._load_config(self.config_path)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            logger.error("配置重載失敗，保留當前配置: %s", e)
+            return None
+
+        old_config = self.config
+        self.config = new_config
+        return old_config
+
+
+class ConfigWatcher:
+    """配置文件監視類（輪詢修改時間）"""
+
+    def __init__(
+        self,
+        config: Config,
+        on_change: Callable[[Mapping, Mapping], Any],
+        interval: float = 2.0,
+    ):
+        """
+        初始化配置監視器
+
+        Args:
+            config: Config 實例
+            on_change: 配置變更回調 (舊快照, 新快照)
+            interval: 輪詢間隔（秒）
+        """
+        self.config = config
+        self.on_change = on_change
+        self.interval = interval
+        self._mtime = self._stat()
+        self._task: Optional[asyncio.Task] = None
+
+    def _stat(self) -> Optional[float]:
+        """讀取配置文件修改時間"""
+        try:
+            return os.stat(self.config.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    async def check(self) -> bool:
+        """
+        檢查配置文件是否變更，變更則重載並通知
+
+        Returns:
+            是否應用了新配置
+        """
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+
+        self._mtime = mtime
+        old_config = self.config.reload()
+        if old_config is None:
+            return False
+
+        logger.info("配置已重載: %s", self.config.config_path)
+        result = self.on_change(old_config, self.config.config)
+        if asyncio.iscoroutine(result):
+            await result
+        return True
+
+    async def _run(self):
+        """輪詢循環"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("應用新配置失敗: %s", e)
+
+    def start(self) -> asyncio.Task:
+        """啟動後台輪詢"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stop(self):
+        """停止後台輪詢"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def changed_sections(old: Mapping, new: Mapping) -> List[str]:
+    """
+    比較兩個配置快照，返回變更的頂層鍵
+
+    Args:
+        old: 舊快照
+        new: 新快照
+
+    Returns:
+        變更的鍵列表
+    """
+    keys = set(old) | set(new)
+    return sorted(key for key in keys if old.get(key) != new.get(key))
@@ -0,0 +1,249 @@
+"""
+Conversation store module
+
+功能:
+- 按會話 ID 存儲對話歷史（緊湊 JSON + zlib 壓縮，SQLite 持久化）
+- 熱會話的有界內存緩存（LRU）
+- 按 token 預算截斷發送給執行器的上下文，可接入摘要鉤子
+"""
+
+import json
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional
+
+# 摘要鉤子：接收被截斷的消息，返回摘要文本
+Summarizer = Callable[[List[Dict]], str]
+
+# 每條消息的角色/分隔開銷（token 估算）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 數（約 4 個字符一個 token）
+
+    Args:
+        text: 文本
+
+    Returns:
+        token 數
+    """
+    return len(text) // 4 + 1
+
+
+def message_text(content: Any) -> str:
+    """
+    將執行結果內容轉換為對話文本
+
+    支持字符串、MCP 內容塊列表與 Anthropic 響應（content 為文本塊列表）。
+
+    Args:
+        content: 執行結果內容
+
+    Returns:
+        文本
+    """
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, Mapping):
+        if "content" in content:
+            return message_text(content["content"])
+        if isinstance(content.get("text"), str):
+            return content["text"]
+        return json.dumps(content, ensure_ascii=False, default=str)
+    if isinstance(content, (list, tuple)):
+        return "\n".join(filter(None, (message_text(block) for block in content)))
+    text = getattr(content, "text", None)
+    return text if isinstance(text, str) else str(content)
+
+
+def _encode(messages: List[Dict]) -> bytes:
+    """序列化並壓縮消息列表"""
+    payload = json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"))
+
+
+def _decode(blob: bytes) -> List[Dict]:
+    """解壓並反序列化消息列表"""
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ConversationStore:
+    """對話歷史存儲類"""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        cache_size: int = 256,
+        max_messages: int = 200,
+        max_context_tokens: int = 2000,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        """
+        初始化對話存儲
+
+        Args:
+            conn: SQLite 連接（通常與 StateManager 共用）
+            cache_size: 內存中保留的熱會話數
+            max_messages: 每個會話最多保存的消息數（超出的舊消息交給摘要鉤子或丟棄）
+            max_context_tokens: 發送給執行器的上下文 token 上限
+            summarizer: 摘要鉤子，None 表示直接丟棄被截斷的消息
+        """
+        self.conn = conn
+        self.cache_size = max(1, cache_size)
+        self.max_messages = max(2, max_messages)
+        self.max_context_tokens = max_context_tokens
+        self.summarizer = summarizer
+        self._cache: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._init_db()
+
+    @classmethod
+    def from_config(
+        cls, conn: sqlite3.Connection, section: Optional[Dict]
+    ) -> "ConversationStore":
+        """
+        根據配置段創建對話存儲
+
+        Args:
+            conn: SQLite 連接
+            section: config.yaml 中的 conversations 配置
+
+        Returns:
+            ConversationStore 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            conn,
+            cache_size=int(section.get("cache_size", 256)),
+            max_messages=int(section.get("max_messages", 200)),
+            max_context_tokens=int(section.get("max_context_tokens", 2000)),
+        )
+
+    def _init_db(self):
+        """初始化對話表"""
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                session_id TEXT PRIMARY KEY,
+                messages BLOB NOT NULL,
+                message_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """
+        )
+        self.conn.commit()
+
+    def get(self, session_id: str) -> List[Dict]:
+        """
+        讀取會話的完整歷史（優先命中內存緩存）
+
+        Args:
+            session_id: 會話ID
+
+        Returns:
+            消息列表（{"role", "content"}），不存在時為空列表
+        """
+        messages = self._cache.get(session_id)
+        if messages is not None:
+            self._cache.move_to_end(session_id)
+            return list(messages)
+
+        row = self.conn.execute(
+            "SELECT messages FROM conversations WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        messages = _decode(row[0]) if row else []
+        self._remember(session_id, messages)
+        return list(messages)
+
+    def append(self, session_id: str, *messages: Dict):
+        """
+        追加消息並持久化
+
+        Args:
+            session_id: 會話ID
+            *messages: {"role", "content"} 消息
+        """
+        history = self.get(session_id) + [
+            {"role": message["role"], "content": message["content"]} for message in messages
+        ]
+        if len(history) > self.max_messages:
+            overflow = len(history) - self.max_messages + 1
+            history = self._summarize(history[:overflow]) + history[overflow:]
+
+        self._remember(session_id, history)
+        self.conn.execute(
+            """
+            INSERT INTO conversations (session_id, messages, message_count, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET
+                messages = excluded.messages,
+                message_count = excluded.message_count,
+                updated_at = excluded.updated_at
+        """,
+            (session_id, _encode(history), len(history), time.time()),
+        )
+        self.conn.commit()
+
+    def context_for(self, history: List[Dict], max_tokens: Optional[int] = None) -> List[Dict]:
+        """
+        按 token 預算截取發送給執行器的上下文（保留最新的消息）
+
+        Args:
+            history: 完整歷史
+            max_tokens: token 上限，默認 max_context_tokens
+
+        Returns:
+            截斷後的消息列表（開頭的非 user 消息一併截去，聊天 API 要求以 user 開頭）；
+            有摘要鉤子時以摘要消息開頭
+        """
+        budget = self.max_context_tokens if max_tokens is None else max_tokens
+        kept = 0
+        used = 0
+        for message in reversed(history):
+            cost = estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget:
+                break
+            used += cost
+            kept += 1
+
+        start = len(history) - kept
+        while start < len(history) and history[start].get("role") != "user":
+            start += 1
+        if start == 0:
+            return list(history)
+        return self._summarize(history[:start]) + history[start:]
+
+    def delete(self, session_id: str):
+        """
+        刪除會話
+
+        Args:
+            session_id: 會話ID
+        """
+        self._cache.pop(session_id, None)
+        self.conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+        self.conn.commit()
+
+    def _summarize(self, dropped: List[Dict]) -> List[Dict]:
+        """將被截斷的消息交給摘要鉤子（未配置時丟棄）"""
+        if self.summarizer is None or not dropped:
+            return []
+        summary = self.summarizer(dropped)
+        if not summary:
+            return []
+        return [{"role": "user", "content": f"[Earlier conversation summary] {summary}"}]
+
+    def _remember(self, session_id: str, messages: List[Dict]):
+        """放入內存緩存並淘汰最久未用的會話"""
+        self._cache[session_id] = messages
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -3,14 +3,33 @@ Fault handling module
 
 功能:
 - LiteLLM 故障檢測
-- 降級到直連 API
+- 降級到直連 API（相同請求命中響應緩存時不再調用上游）
 - 觸發 Claude Code 修復任務
 - 腦幹模式 (雲端 API 故障)
+- 故障狀態與探測歷史可持久化到共享存儲（多實例一致、重啟後保留）
 """
 
-import httpx
+import importlib
+import time
+from collections.abc import Mapping
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
+
+from src.response_cache import response_key
+
+
+def __getattr__(name: str) -> Any:
+    """延遲加載 httpx（首次健康檢查時才導入，加快啟動）"""
+    if name == "httpx":
+        module = importlib.import_module("httpx")
+        globals()["httpx"] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _httpx() -> Any:
+    """獲取 httpx 模塊（已加載時直接返回）"""
+    return globals()["httpx"] if "httpx" in globals() else __getattr__("httpx")
 
 
 class SystemState(Enum):
@@ -47,10 +66,92 @@ class FaultHandler:
         self.consecutive_failures_threshold = consecutive_failures_threshold
         self.cloud_failure_threshold = cloud_failure_threshold
         self.lite_llm_timeout = lite_llm_timeout
+        self.cloud_check_timeout = 10.0
 
         self.consecutive_failures = 0
         self.consecutive_cloud_failures = 0
-        self.system_state = SystemState.NORMAL
+        self._system_state = SystemState.NORMAL
+        # 共享故障狀態存儲（FaultStateStore），None 表示僅在內存中
+        self.store: Optional[Any] = None
+        # 直連 API 響應緩存（ResponseCache），None 表示不緩存
+        self.response_cache: Optional[Any] = None
+
+    @property
+    def system_state(self) -> SystemState:
+        """當前系統模式"""
+        return self._system_state
+
+    @system_state.setter
+    def system_state(self, state: SystemState):
+        """切換系統模式（接入共享存儲時同步寫入）"""
+        changed = state != self._system_state
+        self._system_state = state
+        if changed and self.store is not None:
+            self._persist()
+
+    def attach_store(self, store: Any):
+        """
+        接入共享故障狀態存儲並加載已保存的狀態
+
+        Args:
+            store: FaultStateStore 實例
+        """
+        self.store = store
+        self.load_shared_state()
+
+    def load_shared_state(self):
+        """從共享存儲讀取系統模式與失敗計數（不寫回）"""
+        if self.store is None:
+            return
+        shared = self.store.load()
+        self._system_state = SystemState(shared["system_state"])
+        self.consecutive_failures = shared["consecutive_failures"]
+        self.consecutive_cloud_failures = shared["consecutive_cloud_failures"]
+
+    def _persist(self):
+        """將系統模式與失敗計數寫入共享存儲"""
+        self.store.save(
+            self._system_state.value,
+            self.consecutive_failures,
+            self.consecutive_cloud_failures,
+        )
+
+    def _record_probe(self, probe: str, healthy: bool, started: float):
+        """記錄探測結果並寫入共享狀態（未接入存儲時無操作）"""
+        if self.store is None:
+            return
+        self.store.record_probe(probe, healthy, (time.perf_counter() - started) * 1000)
+        self._persist()
+
+    def apply_config(
+        self,
+        section: Mapping,
+        lite_llm_url: Optional[str] = None,
+        github_key: Optional[str] = None,
+    ):
+        """
+        應用新配置（熱重載），保留當前的失敗計數與系統狀態
+
+        Args:
+            section: config.yaml 中的 fault_handler 配置
+            lite_llm_url: LiteLLM 服務 URL
+            github_key: GitHub API Key (備用直連)
+        """
+        if lite_llm_url:
+            self.lite_llm_url = lite_llm_url
+        if github_key:
+            self.github_key = github_key
+
+        self.consecutive_failures_threshold = int(
+            section.get("consecutive_failures_threshold", self.consecutive_failures_threshold)
+        )
+        self.cloud_failure_threshold = int(
+            section.get("cloud_failure_threshold", self.cloud_failure_threshold)
+        )
+        self.lite_llm_timeout = float(section.get("lite_llm_timeout", self.lite_llm_timeout))
+        self.cloud_check_timeout = float(
+            section.get("cloud_check_timeout", self.cloud_check_timeout)
+        )
 
     async def check_lite_llm_health(self) -> bool:
         """
@@ -59,8 +160,15 @@ class FaultHandler:
         Returns:
             健康狀態
         """
+        started = time.perf_counter()
+        healthy = await self._probe_lite_llm()
+        self._record_probe("lite_llm", healthy, started)
+        return healthy
+
+    async def _probe_lite_llm(self) -> bool:
+        """請求 LiteLLM 健康端點並更新失敗計數"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with _httpx().AsyncClient() as client:
                 response = await client.get(
                     f"{self.lite_llm_url}/health", timeout=self.lite_llm_timeout
                 )
@@ -90,11 +198,18 @@ class FaultHandler:
         Returns:
             雲端健康狀態
         """
+        started = time.perf_counter()
+        healthy = await self._probe_cloud()
+        self._record_probe("cloud", healthy, started)
+        return healthy
+
+    async def _probe_cloud(self) -> bool:
+        """請求雲端 API 並更新失敗計數"""
         try:
             # 簡單的連通性測試
-            async with httpx.AsyncClient() as client:
+            async with _httpx().AsyncClient() as client:
                 response = await client.get(
-                    "https://api.anthropic.com", timeout=10.0
+                    "https://api.anthropic.com", timeout=self.cloud_check_timeout
                 )
                 if response.status_code < 500:
                     self.consecutive_cloud_failures = 0
@@ -114,20 +229,33 @@ class FaultHandler:
             self.system_state = SystemState.BRAINSTEM
 
     async def fallback_to_direct_api(
-        self, messages: List[Dict], model: str = "claude-3-5-sonnet-20241022"
+        self,
+        messages: List[Dict],
+        model: str = "claude-3-5-sonnet-20241022",
+        deterministic: bool = True,
     ) -> Optional[Dict]:
         """
-        降級到直連 API
+        降級到直連 API（相同請求優先返回響應緩存）
 
         Args:
             messages: 消息列表
             model: 模型名稱
+            deterministic: 為 False 時繞過響應緩存
 
         Returns:
             API 響應
         """
+        params = {"max_tokens": 1024}
+        cache = self.response_cache if deterministic else None
+        key = None
+        if cache is not None and cache.enabled:
+            key = response_key(model, messages, params)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            async with httpx.AsyncClient() as client:
+            async with _httpx().AsyncClient() as client:
                 response = await client.post(
                     "https://api.anthropic.com/v1/messages",
                     headers={
@@ -135,11 +263,15 @@ class FaultHandler:
                         "anthropic-version": "2023-06-01",
                         "content-type": "application/json",
                     },
-                    json={"model": model, "messages": messages, "max_tokens": 1024},
+                    json={"model": model, "messages": messages, **params},
                     timeout=30.0,
                 )
                 response.raise_for_status()
-                return response.json()
+                data = response.json()
         except Exception as e:
             print(f"Direct API call failed: {e}")
             return None
+
+        if key is not None:
+            cache.put(key, data)
+        return data
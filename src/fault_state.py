@@ -0,0 +1,268 @@
+"""
+Fault state module
+
+功能:
+- 故障狀態（系統模式、連續失敗計數）持久化到狀態數據庫，重啟後保留
+- 多實例共享同一故障狀態，各實例的運行模式保持一致
+- 健康探測歷史
+- 通過租約選舉唯一的探測實例，其餘實例只讀取共享狀態
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FaultStateStore:
+    """共享故障狀態存儲類（SQLite 持久化）"""
+
+    def __init__(self, conn: sqlite3.Connection, instance_id: str, history_limit: int = 1000):
+        """
+        初始化故障狀態存儲
+
+        Args:
+            conn: SQLite 連接（通常與 StateManager 共用）
+            instance_id: 本實例 ID（探測者租約所有者）
+            history_limit: 保留的探測歷史條數
+        """
+        self.conn = conn
+        self.instance_id = instance_id
+        self.history_limit = max(1, history_limit)
+        self._init_db()
+
+    def _init_db(self):
+        """初始化故障狀態表（單行）與探測歷史表"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fault_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                system_state TEXT NOT NULL,
+                consecutive_failures INTEGER NOT NULL,
+                consecutive_cloud_failures INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                prober TEXT,
+                prober_expires_at REAL
+            )
+        """
+        )
+        cursor.execute(
+            "INSERT OR IGNORE INTO fault_state "
+            "(id, system_state, consecutive_failures, consecutive_cloud_failures, updated_at) "
+            "VALUES (1, 'normal', 0, 0, ?)",
+            (time.time(),),
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS probe_history (
+                at REAL NOT NULL,
+                probe TEXT NOT NULL,
+                healthy INTEGER NOT NULL,
+                latency_ms REAL,
+                instance_id TEXT NOT NULL
+            )
+        """
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_probe_history_at ON probe_history (at)")
+        self.conn.commit()
+
+    def load(self) -> Dict:
+        """
+        讀取共享故障狀態
+
+        Returns:
+            {system_state, consecutive_failures, consecutive_cloud_failures, updated_at, prober}
+        """
+        row = self.conn.execute(
+            "SELECT system_state, consecutive_failures, consecutive_cloud_failures, "
+            "updated_at, prober FROM fault_state WHERE id = 1"
+        ).fetchone()
+        return {
+            "system_state": row[0],
+            "consecutive_failures": row[1],
+            "consecutive_cloud_failures": row[2],
+            "updated_at": row[3],
+            "prober": row[4],
+        }
+
+    def save(self, system_state: str, consecutive_failures: int, consecutive_cloud_failures: int):
+        """
+        寫入共享故障狀態
+
+        Args:
+            system_state: 系統模式
+            consecutive_failures: LiteLLM 連續失敗次數
+            consecutive_cloud_failures: 雲端連續失敗次數
+        """
+        self.conn.execute(
+            "UPDATE fault_state SET system_state = ?, consecutive_failures = ?, "
+            "consecutive_cloud_failures = ?, updated_at = ? WHERE id = 1",
+            (system_state, consecutive_failures, consecutive_cloud_failures, time.time()),
+        )
+        self.conn.commit()
+
+    def record_probe(self, probe: str, healthy: bool, latency_ms: Optional[float] = None):
+        """
+        記錄一次健康探測（超出保留條數的舊記錄同時刪除）
+
+        Args:
+            probe: 探測名稱 (lite_llm / cloud)
+            healthy: 是否健康
+            latency_ms: 耗時（毫秒）
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO probe_history (at, probe, healthy, latency_ms, instance_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (time.time(), probe, int(healthy), latency_ms, self.instance_id),
+        )
+        cursor.execute(
+            "DELETE FROM probe_history WHERE rowid <= "
+            "(SELECT rowid FROM probe_history ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+            (self.history_limit,),
+        )
+        self.conn.commit()
+
+    def get_history(self, limit: int = 50) -> List[Dict]:
+        """
+        讀取最近的探測歷史
+
+        Args:
+            limit: 返回條數
+
+        Returns:
+            [{at, probe, healthy, latency_ms, instance_id}]，按時間降序
+        """
+        cursor = self.conn.execute(
+            "SELECT at, probe, healthy, latency_ms, instance_id FROM probe_history "
+            "ORDER BY rowid DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            {
+                "at": row[0],
+                "probe": row[1],
+                "healthy": bool(row[2]),
+                "latency_ms": row[3],
+                "instance_id": row[4],
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def try_acquire_prober(self, lease_seconds: float) -> bool:
+        """
+        嘗試成為（或續任）探測實例
+
+        Args:
+            lease_seconds: 探測者租約時長（秒）
+
+        Returns:
+            本實例是否為探測者
+        """
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE fault_state SET prober = ?, prober_expires_at = ? WHERE id = 1 "
+            "AND (prober IS NULL OR prober = ? OR prober_expires_at < ?) RETURNING prober",
+            (self.instance_id, now + lease_seconds, self.instance_id, now),
+        )
+        elected = cursor.fetchone() is not None
+        self.conn.commit()
+        return elected
+
+    def release_prober(self):
+        """卸任探測者（關閉時調用，其他實例可立即接任）"""
+        self.conn.execute(
+            "UPDATE fault_state SET prober = NULL, prober_expires_at = NULL "
+            "WHERE id = 1 AND prober = ?",
+            (self.instance_id,),
+        )
+        self.conn.commit()
+
+
+class HealthMonitor:
+    """定期健康檢查類：選舉出的實例探測，其餘實例同步共享狀態"""
+
+    def __init__(self, fault_handler: Any, store: FaultStateStore, interval: float = 30.0):
+        """
+        初始化健康檢查器
+
+        Args:
+            fault_handler: FaultHandler 實例（已接入 store）
+            store: 共享故障狀態存儲
+            interval: 檢查間隔（秒）
+        """
+        self.fault_handler = fault_handler
+        self.store = store
+        self.interval = interval
+        self.is_prober = False
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(
+        cls, fault_handler: Any, store: FaultStateStore, section: Optional[Dict]
+    ) -> "HealthMonitor":
+        """
+        根據配置段創建健康檢查器
+
+        Args:
+            fault_handler: FaultHandler 實例
+            store: 共享故障狀態存儲
+            section: config.yaml 中的 fault_handler 配置
+
+        Returns:
+            HealthMonitor 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(fault_handler, store, interval=float(section.get("health_check_interval", 30)))
+
+    def start(self):
+        """在後台啟動檢查循環"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止檢查循環並卸任探測者"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_prober:
+            self.store.release_prober()
+            self.is_prober = False
+
+    async def _run(self):
+        """檢查循環"""
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("健康檢查失敗")
+            await asyncio.sleep(self.interval)
+
+    async def tick(self) -> bool:
+        """
+        執行一輪檢查：探測者探測並寫入共享狀態，其餘實例讀取共享狀態
+
+        Returns:
+            本輪是否由本實例探測
+        """
+        # 租約覆蓋三個檢查周期，探測者錯過一次檢查不會觸發重新選舉
+        elected = self.store.try_acquire_prober(self.interval * 3)
+        if elected != self.is_prober:
+            logger.info("健康探測者%s: %s", "當選" if elected else "卸任", self.store.instance_id)
+        self.is_prober = elected
+
+        # 先同步共享狀態：新當選的探測者從上一任的計數繼續
+        self.fault_handler.load_shared_state()
+        if elected:
+            await self.fault_handler.check_lite_llm_health()
+            await self.fault_handler.check_cloud_apis()
+        return elected
@@ -0,0 +1,150 @@
+"""
+Lease keeper module
+
+功能:
+- 定期為本實例處理中的任務續約（心跳）
+- 發現租約被其他實例接管或任務已在其他實例取消時放棄本地執行
+- 按空閒執行槽從共享隊列拉取任務（無主或租約過期），多實例間自然均衡
+"""
+
+import asyncio
+import logging
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Set
+
+from src.state_manager import TaskRecord, TaskState
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseKeeper:
+    """租約維護類"""
+
+    def __init__(
+        self,
+        orchestrator: Any,
+        heartbeat_interval: Optional[float] = None,
+        poll_interval: float = 2.0,
+    ):
+        """
+        初始化租約維護器
+
+        Args:
+            orchestrator: Orchestrator 實例
+            heartbeat_interval: 續約間隔（秒），默認租約時長的三分之一
+            poll_interval: 拉取共享隊列的間隔（秒）
+        """
+        self.orchestrator = orchestrator
+        self.heartbeat_interval = (
+            heartbeat_interval
+            if heartbeat_interval is not None
+            else orchestrator.state_manager.lease_seconds / 3
+        )
+        self.poll_interval = poll_interval
+        self.pulling = True
+        self._task: Optional[asyncio.Task] = None
+        self._pulls: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, orchestrator: Any, section: Optional[Dict]) -> Optional["LeaseKeeper"]:
+        """
+        根據配置段創建租約維護器
+
+        Args:
+            orchestrator: Orchestrator 實例
+            section: config.yaml 中的 leases 配置
+
+        Returns:
+            LeaseKeeper 實例，未啟用時返回 None
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+        if not section.get("enabled", True):
+            return None
+
+        heartbeat_interval = section.get("heartbeat_interval")
+        return cls(
+            orchestrator,
+            heartbeat_interval=float(heartbeat_interval) if heartbeat_interval else None,
+            poll_interval=float(section.get("poll_interval", 2.0)),
+        )
+
+    def start(self, pull: bool = True):
+        """
+        在後台啟動心跳與拉取循環
+
+        Args:
+            pull: 是否從共享隊列拉取任務（False 時只為本實例的任務續約）
+        """
+        self.pulling = pull
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止循環（已拉取的任務繼續由協調器處理）"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        """心跳與拉取循環"""
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time()
+        while True:
+            if loop.time() >= next_heartbeat:
+                self.heartbeat()
+                next_heartbeat = loop.time() + self.heartbeat_interval
+            if self.pulling:
+                self.pull()
+            await asyncio.sleep(min(self.poll_interval, self.heartbeat_interval))
+
+    def heartbeat(self) -> List[str]:
+        """
+        為本實例持有的任務續約，放棄已被接管或已在其他實例取消的任務
+
+        Returns:
+            租約已丟失的任務ID
+        """
+        state_manager = self.orchestrator.state_manager
+        owned = self.orchestrator.owned_task_ids()
+        renewed = set(state_manager.renew_leases(owned))
+        lost = [task_id for task_id in owned if task_id not in renewed]
+        for task_id in lost:
+            task = state_manager.get_task(task_id)
+            if task is not None and task.state == TaskState.CANCELLED:
+                logger.info(
+                    "任務已被取消，停止本地執行: %s",
+                    task_id,
+                    extra={"task_id": task_id, "stage": "lease"},
+                )
+            else:
+                logger.warning(
+                    "任務租約已被其他實例接管，放棄本地執行: %s",
+                    task_id,
+                    extra={"task_id": task_id, "stage": "lease"},
+                )
+            self.orchestrator.abandon_task(task_id)
+        return lost
+
+    def pull(self) -> List[TaskRecord]:
+        """
+        按空閒容量認領共享隊列中的任務並在後台處理
+
+        Returns:
+            本次認領的任務
+        """
+        if not self.orchestrator.accepting:
+            return []
+        free = self.orchestrator.free_capacity()
+        if free <= 0:
+            return []
+
+        recovery = self.orchestrator.recovery
+        tasks = recovery.claim(limit=free)
+        if tasks:
+            logger.info("從共享隊列認領 %d 個任務", len(tasks))
+            pull = asyncio.create_task(recovery.recover(tasks))
+            self._pulls.add(pull)
+            pull.add_done_callback(self._pulls.discard)
+        return tasks
@@ -0,0 +1,180 @@
+"""
+Log pipeline module
+
+功能:
+- 基於隊列的非阻塞日誌：調用方只入隊，格式化與 I/O 在後台線程完成
+- 結構化 JSON 日誌（支持 task_id / stage 字段）
+- 日誌文件輪轉
+- 熱路徑調試日誌的限速採樣
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# 通過 extra={...} 傳入、需要寫入結構化日誌的字段
+STRUCTURED_FIELDS = ("task_id", "stage", "executor", "model", "peer")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON 日誌格式化器（每條記錄一行）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        格式化日誌記錄
+
+        Args:
+            record: 日誌記錄
+
+        Returns:
+            JSON 字符串
+        """
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """只入隊、不在調用線程格式化的隊列處理器"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 消息參數的合併延遲到後台線程的格式化器中
+        return record
+
+
+class RateLimiter:
+    """令牌桶限速器（用於熱路徑調試日誌採樣）"""
+
+    def __init__(self, per_second: float = 10.0, burst: Optional[float] = None):
+        """
+        初始化限速器
+
+        Args:
+            per_second: 每秒允許的次數
+            burst: 突發上限，默認等於 per_second
+        """
+        self.per_second = per_second
+        self.burst = burst if burst is not None else max(1.0, per_second)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def allow(self) -> bool:
+        """
+        嘗試消耗一個令牌
+
+        Returns:
+            是否允許
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.per_second)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class LogPipeline:
+    """日誌管道類：根 logger → 隊列 → 後台線程 → 控制台 / 輪轉文件"""
+
+    def __init__(self):
+        """初始化日誌管道"""
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._queue_handler = _DeferredQueueHandler(self.queue)
+        self._lock = threading.Lock()
+        # 熱路徑調試日誌採樣器（按 debug_sample_per_second 配置）
+        self.debug_sampler = RateLimiter()
+
+    @staticmethod
+    def build_handlers(section: Mapping) -> List[logging.Handler]:
+        """
+        根據配置創建輸出處理器（在後台線程中運行）
+
+        Args:
+            section: config.yaml 中的 logging 配置
+
+        Returns:
+            處理器列表
+        """
+        if section.get("format", "text") == "json":
+            formatter: logging.Formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(TEXT_FORMAT)
+
+        handlers: List[logging.Handler] = [logging.StreamHandler(sys.stderr)]
+        if section.get("file"):
+            handlers.append(
+                logging.handlers.RotatingFileHandler(
+                    section["file"],
+                    maxBytes=int(section.get("max_bytes", 10 * 1024 * 1024)),
+                    backupCount=int(section.get("backup_count", 5)),
+                    encoding="utf-8",
+                )
+            )
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        return handlers
+
+    def install(self, section: Optional[Dict] = None):
+        """
+        安裝或按新配置重建管道
+
+        Args:
+            section: config.yaml 中的 logging 配置（缺省時輸出文本到控制台）
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        handlers = self.build_handlers(section)
+        root = logging.getLogger()
+        with self._lock:
+            # 先停止舊監聽器（其間入隊的日誌由新監聽器處理）
+            if self.listener is not None:
+                self._stop_listener(self.listener)
+            self.listener = logging.handlers.QueueListener(
+                self.queue, *handlers, respect_handler_level=True
+            )
+            self.listener.start()
+
+            if self._queue_handler not in root.handlers:
+                root.addHandler(self._queue_handler)
+            root.setLevel(str(section.get("level", "INFO")).upper())
+
+        self.debug_sampler = RateLimiter(
+            per_second=float(section.get("debug_sample_per_second", 10))
+        )
+
+    def stop(self):
+        """停止後台線程並寫出隊列中剩餘的日誌"""
+        logging.getLogger().removeHandler(self._queue_handler)
+        with self._lock:
+            if self.listener is not None:
+                self._stop_listener(self.listener)
+                self.listener = None
+
+    @staticmethod
+    def _stop_listener(listener: logging.handlers.QueueListener):
+        """停止監聽器並關閉其處理器"""
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
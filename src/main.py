@@ -4,62 +4,414 @@ Omni-Orchestrator MCP WebSocket Server
 
 启动 MCP WebSocket 服务，监听 18765 端口，
 接收客户端连接并处理任务。
+
+连接管理：最大连接数、ping/pong 心跳（清理失联客户端）、空闲超时、
+消息大小与每连接缓冲上限，get_connections 查询在线连接。
 """
 
 import asyncio
+import json
 import os
 import logging
+import signal
+import time
+from collections.abc import Mapping
 
 from websockets.server import serve
-from src.orchestrator import Orchestrator
 
-logging.basicConfig(level=logging.INFO)
+from src.log_pipeline import LogPipeline, RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
 class MCPServer:
     """MCP WebSocket 服务器"""
 
-    def __init__(self, orchestrator):
+    def __init__(self, orchestrator=None):
         """
         Args:
-            orchestrator: Orchestrator 实例
+            orchestrator: Orchestrator 实例（可在监听后通过 set_orchestrator 注入）
         """
 
         self.orchestrator = orchestrator
         self.host = os.getenv("OMNI_HOST", "0.0.0.0")
         self.port = int(os.getenv("OMNI_PORT", "18765"))
 
+        # 就绪状态与存活状态分开上报：未就绪时仍响应 ping
+        self.ready = asyncio.Event()
+        self._created_at = time.perf_counter()
+        self.ready_after_ms = None
+        # 收到 SIGTERM/SIGINT 后置位，触发排空与关闭
+        self.stopping = asyncio.Event()
+        # 热路径调试日志限速采样
+        self.debug_sampler = RateLimiter(per_second=10)
+
+        # 连接限制（apply_config 按 server 配置更新，对之后的连接生效）
+        self.max_connections = 256
+        self.idle_timeout = 300.0
+        self.heartbeat_interval = 20.0
+        self.heartbeat_timeout = 20.0
+        self.max_message_size = 2**20
+        self.max_queue = 32
+        self.write_limit = 2**16
+        # 在线连接：websocket → 连接信息
+        self.connections = {}
+        self.server = None
+        self._next_connection_id = 0
+        self.rejected_connections = 0
+        self.reaped_connections = 0
+
+        if orchestrator is not None:
+            self.set_orchestrator(orchestrator)
+
+    def apply_config(self, section=None):
+        """
+        应用连接限制配置
+
+        Args:
+            section: config.yaml 中的 server 配置（0 表示不限制 / 不启用）
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        self.max_connections = int(section.get("max_connections", self.max_connections))
+        self.idle_timeout = float(section.get("idle_timeout", self.idle_timeout))
+        self.heartbeat_interval = float(
+            section.get("heartbeat_interval", self.heartbeat_interval)
+        )
+        self.heartbeat_timeout = float(section.get("heartbeat_timeout", self.heartbeat_timeout))
+        self.max_message_size = int(section.get("max_message_size", self.max_message_size))
+        self.max_queue = int(section.get("max_queue", self.max_queue))
+        self.write_limit = int(section.get("write_limit", self.write_limit))
+
+    def set_orchestrator(self, orchestrator):
+        """
+        注入 Orchestrator 并标记就绪
+
+        Args:
+            orchestrator: Orchestrator 实例
+        """
+        self.orchestrator = orchestrator
+        # 在线连接清单通过 Orchestrator 的管理方法 get_connections 查询
+        orchestrator.connection_inventory = self.get_connections
+        self.ready_after_ms = (time.perf_counter() - self._created_at) * 1000
+        self.ready.set()
+
+    def get_connections(self):
+        """
+        在线连接清单
+
+        Returns:
+            {count, max_connections, rejected, reaped, connections: [...]}
+        """
+        now = time.time()
+        return {
+            "count": len(self.connections),
+            "max_connections": self.max_connections,
+            "rejected": self.rejected_connections,
+            "reaped": self.reaped_connections,
+            "connections": [
+                {
+                    **info,
+                    "idle_seconds": round(now - info["last_activity"], 3),
+                    "buffered_messages": len(getattr(websocket, "messages", ())),
+                }
+                for websocket, info in self.connections.items()
+            ],
+        }
+
+    def _register(self, websocket):
+        """
+        登记新连接并应用每连接的缓冲上限
+
+        Returns:
+            连接信息；超出最大连接数时返回 None
+        """
+        if self.max_connections and len(self.connections) >= self.max_connections:
+            self.rejected_connections += 1
+            return None
+
+        websocket.max_size = self.max_message_size or None
+        websocket.max_queue = self.max_queue or None
+        transport = getattr(websocket, "transport", None)
+        if transport is not None:
+            transport.set_write_buffer_limits(self.write_limit)
+
+        self._next_connection_id += 1
+        now = time.time()
+        info = {
+            "id": self._next_connection_id,
+            "peer": websocket.remote_address,
+            "connected_at": now,
+            "last_activity": now,
+            "in_flight": 0,
+            "messages_in": 0,
+            "messages_out": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "latency_ms": None,
+        }
+        self.connections[websocket] = info
+        return info
+
+    def _handle_lifecycle(self, message: str):
+        """
+        处理存活/就绪探测（不依赖 Orchestrator）
+
+        Returns:
+            响应消息，非探测消息返回 None
+        """
+        try:
+            method = json.loads(message).get("method")
+        except (json.JSONDecodeError, AttributeError):
+            return None
+
+        if method == "get_readiness":
+            return json.dumps(
+                {
+                    "result": {
+                        "ready": self.ready.is_set(),
+                        "ready_after_ms": self.ready_after_ms,
+                    }
+                }
+            )
+        if method == "ping" and not self.ready.is_set():
+            return json.dumps({"result": "pong"})
+        return None
+
+    async def handle_message(self, message: str, peer=None) -> str:
+        """
+        处理单条消息；未就绪时业务请求等待就绪
+
+        Args:
+            message: MCP 协议消息
+            peer: 客户端地址（用于限制管理方法）
+
+        Returns:
+            响应消息
+        """
+        # 按解析出的 method 识别探测请求，任务描述中的同名文本不受影响
+        response = self._handle_lifecycle(message)
+        if response is not None:
+            return response
+        await self.ready.wait()
+
+        return await self.orchestrator.process_mcp_message(message, peer=peer)
+
     async def handle_client(self, websocket):
         """处理客户端连接"""
         client_id = websocket.remote_address
-        logger.info(f"客户端连接: {client_id}")
+        info = self._register(websocket)
+        if info is None:
+            logger.warning("连接数已达上限，拒绝: %s", client_id, extra={"peer": client_id})
+            await websocket.close(1013, "Too many connections")
+            return
+        logger.info("客户端连接: %s", client_id, extra={"peer": client_id})
 
         try:
             async for message in websocket:
-                logger.debug(f"收到消息: {message[:100] if len(message) > 100 else message}")
-                response = await self.orchestrator.process_mcp_message(message)
+                info["last_activity"] = time.time()
+                info["messages_in"] += 1
+                info["bytes_in"] += len(message)
+                # 未开启 DEBUG 或超出采样速率时不做任何格式化
+                if logger.isEnabledFor(logging.DEBUG) and self.debug_sampler.allow():
+                    logger.debug(
+                        "收到消息: %.100s", message, extra={"peer": client_id, "stage": "receive"}
+                    )
+                info["in_flight"] += 1
+                try:
+                    response = await self.handle_message(message, peer=client_id)
+                finally:
+                    info["in_flight"] -= 1
                 await websocket.send(response)
+                info["last_activity"] = time.time()
+                info["messages_out"] += 1
+                info["bytes_out"] += len(response)
         except Exception as e:
-            logger.error(f"客户端错误: {e}")
+            logger.error("客户端错误: %s", e, extra={"peer": client_id})
         finally:
-            logger.info(f"客户端断开: {client_id}")
+            self.connections.pop(websocket, None)
+            logger.info("客户端断开: %s", client_id, extra={"peer": client_id})
+
+    async def reap_connections(self):
+        """
+        关闭空闲超时的连接，并对其余连接发送 ping；超时未回 pong 的连接直接断开
+
+        正在处理请求的连接不算空闲。
 
-    async def start(self):
-        """启动服务"""
-        logger.info(f"启动 MCP Server: {self.host}:{self.port}")
+        Returns:
+            本轮关闭的连接数
+        """
+        now = time.time()
+        idle, alive = [], []
+        for websocket, info in list(self.connections.items()):
+            if (
+                self.idle_timeout
+                and info["in_flight"] == 0
+                and now - info["last_activity"] > self.idle_timeout
+            ):
+                idle.append(websocket)
+            else:
+                alive.append(websocket)
+
+        for websocket in idle:
+            logger.info("关闭空闲连接: %s", websocket.remote_address)
+            websocket.fail_connection(1001, "Idle timeout")
+
+        dead = []
+        if self.heartbeat_interval and alive:
+            results = await asyncio.gather(
+                *(self._heartbeat(websocket) for websocket in alive), return_exceptions=True
+            )
+            dead = [websocket for websocket, ok in zip(alive, results) if ok is not True]
+            for websocket in dead:
+                logger.info("心跳超时，断开连接: %s", websocket.remote_address)
+                websocket.fail_connection(1011, "Heartbeat timeout")
+
+        closed = len(idle) + len(dead)
+        self.reaped_connections += closed
+        for websocket in idle + dead:
+            self.connections.pop(websocket, None)
+        return closed
+
+    async def _heartbeat(self, websocket) -> bool:
+        """发送 ping 并等待 pong，记录往返延迟"""
+        pong = await websocket.ping()
+        latency = await asyncio.wait_for(pong, timeout=self.heartbeat_timeout or None)
+        info = self.connections.get(websocket)
+        if info is not None:
+            info["latency_ms"] = round(latency * 1000, 3)
+        return True
 
-        async with serve(self.handle_client, self.host, self.port) as server:
-            logger.info(f"服务已启动，等待连接...")
-            await server.serve_forever()
+    async def _reap_loop(self):
+        """定期清理连接（间隔取心跳间隔，未启用心跳时取空闲超时的一半）"""
+        while True:
+            interval = self.heartbeat_interval or self.idle_timeout / 2
+            if not interval:
+                await asyncio.sleep(60)
+                continue
+            await asyncio.sleep(interval)
+            try:
+                await self.reap_connections()
+            except Exception:
+                logger.exception("连接清理失败")
+
+    def stop(self):
+        """请求停止服务（信号处理器调用）"""
+        if not self.stopping.is_set():
+            logger.info("收到停止信号，开始排空")
+            self.stopping.set()
+
+    def _install_signal_handlers(self):
+        """注册 SIGTERM/SIGINT 处理器（不支持的平台上忽略）"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    async def start(self, on_started=None):
+        """
+        启动服务，直到收到停止信号后排空并关闭
+
+        关闭顺序：停止监听 → 排空在途任务（超时的任务存档）→ 关闭客户端连接
+        → 关闭 Orchestrator 的连接池和数据库。
+
+        Args:
+            on_started: 开始监听后调用的回调（用于启动后台任务）
+        """
+        logger.info("启动 MCP Server: %s:%s", self.host, self.port)
+
+        # 心跳由 _reap_loop 统一发送；消息大小与缓冲上限在 _register 中按连接设置
+        async with serve(
+            self.handle_client,
+            self.host,
+            self.port,
+            ping_interval=None,
+            max_size=self.max_message_size or None,
+            max_queue=self.max_queue or None,
+            write_limit=self.write_limit,
+        ) as server:
+            self.server = server
+            logger.info("服务已启动，等待连接...")
+            self._install_signal_handlers()
+            if on_started:
+                on_started()
+            reaper = asyncio.create_task(self._reap_loop())
+            try:
+                await self.stopping.wait()
+            finally:
+                reaper.cancel()
+
+            # 停止接受新连接；已建立的连接继续收到在途任务的响应
+            server.server.close()
+            if self.orchestrator is not None:
+                await self.orchestrator.drain()
+        # 退出上下文时以 1001 关闭剩余连接并等待处理器结束
+
+        if self.orchestrator is not None:
+            await self.orchestrator.shutdown()
+        logger.info("服务已停止")
+
+
+def _build_orchestrator():
+    """导入并构建 Orchestrator（在工作线程中运行）"""
+    from src.orchestrator import Orchestrator
+
+    return Orchestrator()
+
+
+async def load_orchestrator(server: MCPServer, log_pipeline: LogPipeline):
+    """
+    在工作线程中导入并构建 Orchestrator，完成后注入服务器
+
+    导入与构建期间事件循环继续完成握手并响应 ping；加载失败时停止服务。
+
+    Args:
+        server: 已开始监听的 MCPServer
+        log_pipeline: 日志管道（按 logging 配置重建）
+    """
+    try:
+        orchestrator = await asyncio.to_thread(_build_orchestrator)
+    except Exception:
+        logger.exception("加载 Orchestrator 失败，停止服务")
+        server.stop()
+        raise
+
+    if server.stopping.is_set():
+        # 加载期间收到停止信号：服务已排空，直接关闭
+        await orchestrator.shutdown()
+        return
+
+    log_pipeline.install(orchestrator.config.config.get("logging"))
+    server.apply_config(orchestrator.config.config.get("server"))
+    server.debug_sampler = log_pipeline.debug_sampler
+    server.set_orchestrator(orchestrator)
+    # 断点恢复与配置热重载在后台进行，不延迟接受连接
+    orchestrator.start_background_tasks()
 
 
 async def main():
     """主入口"""
-    orchestrator = Orchestrator()
+    # 日志格式化与写入在后台线程进行；加载配置后按 logging 配置重建
+    log_pipeline = LogPipeline()
+    log_pipeline.install()
+    server = MCPServer()
+    loading = None
+
+    def on_started():
+        # 先监听再加载 Orchestrator，缩短冷启动到首个 pong 的时间
+        nonlocal loading
+        loading = asyncio.create_task(load_orchestrator(server, log_pipeline))
 
-    server = MCPServer(orchestrator)
-    await server.start()
+    try:
+        await server.start(on_started=on_started)
+        if loading is not None:
+            # 加载失败时在此抛出
+            await loading
+    finally:
+        log_pipeline.stop()
 
 
 if __name__ == "__main__":
@@ -5,11 +5,42 @@ MCP Client module
 - 連接到 MCP Server (OpenClaw, Claude Code 等)
 - 列出可用工具
 - 調用工具並獲取結果
+- 熱重載替換客戶端時等待在途調用結束後再斷開
 """
 
-from typing import Any, Dict, List, Optional
-from mcp import ClientSession
-from mcp.client.websocket import websocket_client
+import asyncio
+import importlib
+import logging
+from collections.abc import Mapping
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+logger = logging.getLogger(__name__)
+
+# mcp 導入耗時較長（數百毫秒），延遲到首次連接時加載以加快啟動
+_LAZY_IMPORTS = {
+    "ClientSession": ("mcp", "ClientSession"),
+    "websocket_client": ("mcp.client.websocket", "websocket_client"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    """按需加載 mcp 依賴"""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+
+def _lazy(name: str) -> Any:
+    """獲取延遲加載的名稱（已加載或被替換時直接返回）"""
+    return globals()[name] if name in globals() else __getattr__(name)
 
 
 class MCPClient:
@@ -23,20 +54,73 @@ class MCPClient:
             server_url: MCP Server URL (e.g., ws://127.0.0.1:18789)
         """
         self.server_url = server_url
-        self.session: Optional[ClientSession] = None
-        self._connection_context = None
+        self.session: Optional["ClientSession"] = None
+        # 連接由獨立任務持有：anyio 要求在同一任務中進入和退出連接上下文
+        self._connection_task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        # 併發任務首次連接時只建立一個會話
+        self._connect_lock = asyncio.Lock()
+        # 在途的工具調用數：熱重載替換客戶端時等待歸零後再斷開
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
 
     async def connect(self):
-        """連接到 MCP Server"""
-        # 創建 WebSocket 連接
-        self._connection_context = websocket_client(self.server_url)
-        # 進入異步上下文管理器
-        read_stream, write_stream = await self._connection_context.__aenter__()
+        """連接到 MCP Server（已連接時直接複用會話）"""
+        if self.session:
+            return
+
+        async with self._connect_lock:
+            if self.session:
+                return
+            await self._open()
 
-        # 創建並初始化會話
-        self.session = ClientSession(read_stream, write_stream)
-        await self.session.__aenter__()
-        await self.session.initialize()
+    async def _open(self):
+        """啟動連接任務並等待會話初始化完成"""
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._connection_task = asyncio.create_task(self._hold_connection(ready))
+        try:
+            # 初始化完成後才對其他任務可見
+            self.session = await ready
+        except asyncio.CancelledError:
+            self._closing.set()
+            raise
+
+    async def _hold_connection(self, ready: asyncio.Future):
+        """
+        在獨立任務中建立並持有連接，直到 disconnect 或連接斷開
+
+        Args:
+            ready: 會話初始化完成（或失敗）時設置的 Future
+        """
+        session = None
+        try:
+            # 創建 WebSocket 連接
+            connection = _lazy("websocket_client")(self.server_url)
+            read_stream, write_stream = await connection.__aenter__()
+            try:
+                # 創建並初始化會話
+                session = _lazy("ClientSession")(read_stream, write_stream)
+                await session.__aenter__()
+                try:
+                    await session.initialize()
+                    if not ready.done():
+                        ready.set_result(session)
+                    await self._closing.wait()
+                finally:
+                    await session.__aexit__(None, None, None)
+            finally:
+                await connection.__aexit__(None, None, None)
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            elif not isinstance(e, asyncio.CancelledError):
+                logger.warning("MCP 連接已斷開 %s: %s", self.server_url, e)
+        finally:
+            # 連接斷開後允許下次 connect 重新建立
+            if session is not None and self.session is session:
+                self.session = None
 
     async def list_tools(self) -> List[Any]:
         """
@@ -51,12 +135,15 @@ class MCPClient:
         response = await self.session.list_tools()
         return response.tools
 
-    async def call_tool(self, tool_name: str, **kwargs) -> Any:
+    async def call_tool(
+        self, tool_name: str, timeout: Optional[float] = None, **kwargs
+    ) -> Any:
         """
         調用指定工具
 
         Args:
             tool_name: 工具名稱
+            timeout: 讀取超時（秒），通常為任務截止時間的剩餘時間
             **kwargs: 工具參數
 
         Returns:
@@ -65,15 +152,118 @@ class MCPClient:
         if not self.session:
             raise RuntimeError("Not connected to server")
 
-        result = await self.session.call_tool(tool_name, arguments=kwargs)
-        return result
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            if timeout is not None:
+                return await self.session.call_tool(
+                    tool_name,
+                    arguments=kwargs,
+                    read_timeout_seconds=timedelta(seconds=max(0.0, timeout)),
+                )
+
+            result = await self.session.call_tool(tool_name, arguments=kwargs)
+            return result
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    async def close_when_idle(self):
+        """等待在途的工具調用全部結束後斷開連接（熱重載替換客戶端時不中斷進行中的任務）"""
+        await self._idle.wait()
+        await self.disconnect()
 
     async def disconnect(self):
         """斷開連接"""
-        if self.session:
-            await self.session.__aexit__(None, None, None)
-            self.session = None
+        task = self._connection_task
+        self._connection_task = None
+        self.session = None
+
+        if task is not None:
+            self._closing.set()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class MCPClientRegistry:
+    """MCP 客戶端註冊表（按執行器名稱管理連接）"""
+
+    def __init__(self, servers: Optional[Mapping] = None):
+        """
+        初始化註冊表
+
+        Args:
+            servers: config.yaml 中的 mcp_servers 配置
+        """
+        self.clients: Dict[str, MCPClient] = {
+            name: MCPClient(server_url=url)
+            for name, url in self._websocket_servers(servers or {}).items()
+        }
+        # 已被替換、等待在途調用結束後斷開的客戶端
+        self._retiring: Dict[asyncio.Task, MCPClient] = {}
+
+    @staticmethod
+    def _websocket_servers(servers: Mapping) -> Dict[str, str]:
+        """篩選啟用的 WebSocket 執行器（stdio 執行器不經過註冊表）"""
+        return {
+            name: server["url"]
+            for name, server in servers.items()
+            if server.get("enabled", True) and str(server["url"]).startswith("ws")
+        }
+
+    def get(self, name: str) -> Optional[MCPClient]:
+        """
+        獲取執行器對應的客戶端
+
+        Args:
+            name: 執行器名稱
+
+        Returns:
+            MCPClient 或 None（未配置）
+        """
+        return self.clients.get(name)
+
+    async def apply(self, servers: Mapping) -> List[str]:
+        """
+        按配置同步客戶端，只重建 URL 變更、新增或移除的連接
+
+        Args:
+            servers: config.yaml 中的 mcp_servers 配置
+
+        Returns:
+            發生變化的執行器名稱
+        """
+        wanted = self._websocket_servers(servers)
+
+        changed = []
+        for name in list(self.clients):
+            if wanted.get(name) != self.clients[name].server_url:
+                self.retire(self.clients.pop(name))
+                changed.append(name)
+
+        for name, url in wanted.items():
+            if name not in self.clients:
+                self.clients[name] = MCPClient(server_url=url)
+                if name not in changed:
+                    changed.append(name)
+
+        return changed
+
+    def retire(self, client: MCPClient):
+        """
+        在後台等待被替換的客戶端的在途調用結束後斷開
+
+        Args:
+            client: 不再分配新調用的客戶端
+        """
+        retire = asyncio.create_task(client.close_when_idle())
+        self._retiring[retire] = client
+        retire.add_done_callback(lambda task: self._retiring.pop(task, None))
 
-        if self._connection_context:
-            await self._connection_context.__aexit__(None, None, None)
-            self._connection_context = None
+    async def close(self):
+        """斷開所有連接（含尚在等待在途調用的舊客戶端）"""
+        for client in self.clients.values():
+            await client.disconnect()
+        for retire, client in list(self._retiring.items()):
+            retire.cancel()
+            await client.disconnect()
@@ -0,0 +1,310 @@
+"""
+Metrics module
+
+功能:
+- 低開銷的計數器與直方圖（按標籤分組，固定分桶）
+- 協調流程各階段耗時統計（狀態寫入、路由、連接、執行、降級直連）
+- Prometheus 文本格式輸出
+- 本地 HTTP 指標端口
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默認分桶（秒）：覆蓋毫秒級狀態寫入到分鐘級執行器調用
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+def _escape(value: str) -> str:
+    """轉義 Prometheus 標籤值"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    """格式化標籤集合"""
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """格式化樣本值"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """計數器類"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        """
+        初始化計數器
+
+        Args:
+            name: 指標名
+            help_text: 說明
+            labelnames: 標籤名
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        """
+        增加計數
+
+        Args:
+            amount: 增量
+            **labels: 標籤值（未提供的標籤記為空字符串）
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        """輸出 Prometheus 文本行"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            labels = _format_labels(list(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        """輸出結構化樣本"""
+        return [
+            {"labels": dict(zip(self.labelnames, key)), "value": value}
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """直方圖類（非累積分桶存儲，輸出時累加）"""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        初始化直方圖
+
+        Args:
+            name: 指標名
+            help_text: 說明
+            labelnames: 標籤名
+            buckets: 分桶上界（升序）
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 標籤 → [各分桶計數（末位為 +Inf）, 總和, 樣本數]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        """
+        記錄一個樣本
+
+        Args:
+            value: 樣本值（秒）
+            **labels: 標籤值（未提供的標籤記為空字符串）
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        """輸出 Prometheus 文本行"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(pairs + [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(pairs)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        """輸出結構化樣本"""
+        return [
+            {
+                "labels": dict(zip(self.labelnames, key)),
+                "count": count,
+                "sum": total,
+                "avg_ms": total / count * 1000 if count else 0.0,
+            }
+            for key, (_, total, count) in sorted(self._series.items())
+        ]
+
+
+class MetricsRegistry:
+    """協調器指標註冊表"""
+
+    STAGE_LABELS = ("stage", "executor", "model", "system_state")
+
+    def __init__(self):
+        """初始化指標"""
+        self.stage_duration = Histogram(
+            "omni_stage_duration_seconds",
+            "Time spent in each orchestration stage",
+            self.STAGE_LABELS,
+        )
+        self.stage_errors = Counter(
+            "omni_stage_errors_total",
+            "Orchestration stages that raised an exception",
+            self.STAGE_LABELS,
+        )
+        self.tasks = Counter(
+            "omni_tasks_total",
+            "Tasks finished by final status",
+            ("status",),
+        )
+        self._metrics = (self.stage_duration, self.stage_errors, self.tasks)
+
+    @contextmanager
+    def time(self, stage: str, **labels):
+        """
+        統計代碼塊耗時（異常時同時計入錯誤數）
+
+        Args:
+            stage: 階段名
+            **labels: executor / model / system_state
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.stage_errors.inc(stage=stage, **labels)
+            raise
+        finally:
+            self.stage_duration.observe(time.perf_counter() - started, stage=stage, **labels)
+
+    def render(self) -> str:
+        """
+        輸出 Prometheus 文本格式
+
+        Returns:
+            指標文本
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """
+        輸出結構化指標（供 get_metrics 使用）
+
+        Returns:
+            指標名 → 樣本列表
+        """
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+
+class MetricsServer:
+    """本地 HTTP 指標端口（僅提供 GET /metrics）"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        """
+        初始化指標端口
+
+        Args:
+            registry: 指標註冊表
+            host: 監聽地址（默認僅本機）
+            port: 監聽端口（0 表示隨機端口）
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @classmethod
+    def from_config(
+        cls, registry: MetricsRegistry, section: Optional[Dict]
+    ) -> Optional["MetricsServer"]:
+        """
+        根據配置段創建指標端口
+
+        Args:
+            registry: 指標註冊表
+            section: config.yaml 中的 metrics 配置
+
+        Returns:
+            MetricsServer 實例，未啟用時返回 None
+        """
+        if not isinstance(section, Mapping) or not section.get("enabled", False):
+            return None
+
+        return cls(
+            registry,
+            host=str(section.get("host", "127.0.0.1")),
+            port=int(section.get("port", 9464)),
+        )
+
+    async def start(self):
+        """開始監聽（端口不可用時記錄警告，不影響主服務）"""
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            logger.warning("指標端口啟動失敗 %s:%d: %s", self.host, self.port, e)
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("指標端口已啟動: http://%s:%d/metrics", self.host, self.port)
+
+    async def stop(self):
+        """停止監聽"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """處理單個 HTTP 請求"""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # 丟棄請求頭
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            if len(request_line) >= 2 and request_line[0] == "GET" and (
+                request_line[1].split("?")[0] == "/metrics"
+            ):
+                status = "200 OK"
+                body = self.registry.render().encode("utf-8")
+            else:
+                status = "404 Not Found"
+                body = b"Not Found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
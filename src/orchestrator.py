@@ -5,21 +5,77 @@ Main Orchestrator module
 - 整合所有模塊的協調器
 - 處理完整的任務生命週期
 - 健康監控與故障恢復
+- 子任務扇出：按依賴圖並行執行子任務並匯總結果
 """
 
 import asyncio
-from typing import Dict, Optional
-from unittest.mock import MagicMock
-from src.config import Config
-from src.state_manager import StateManager, TaskState
-from src.mcp_client import MCPClient
+import ipaddress
+import logging
+import time
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Optional, Set
+from src.config import Config, ConfigWatcher, changed_sections
+from src.conversation_store import ConversationStore, message_text
+from src.state_manager import StateManager, TaskRecord, TaskState
+from src.mcp_client import MCPClient, MCPClientRegistry
 from src.fault_handler import FaultHandler, SystemState
+from src.fault_state import FaultStateStore, HealthMonitor
+from src.lease_keeper import LeaseKeeper
+from src.metrics import MetricsRegistry, MetricsServer
+from src.profiler import SamplingProfiler
+from src.recovery import CrashRecovery, RecoveryAction
+from src.response_cache import ResponseCache
+from src.result_cache import ResultCache, SingleFlight, encode_default, request_key
+from src.result_store import ResultStore
+from src.retry_scheduler import RetryScheduler
 from src.router_decision import RouterDecision
+from src.scheduler import PriorityClass, TaskScheduler
+from src.task_graph import SubtaskPlan, TaskGraph, parse_subtasks
+from src.traffic_capture import TrafficRecorder
+from src.usage_ledger import UsageLedger, extract_usage
+
+logger = logging.getLogger(__name__)
+
+# 終態：不可再取消
+TERMINAL_STATES = {
+    TaskState.COMPLETED,
+    TaskState.FAILED,
+    TaskState.CANCELLED,
+}
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """截止時間剩餘秒數（無截止時間返回 None）"""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+class _StaticLiteLLMRouter:
+    """固定模型的 LiteLLM 路由器佔位實現"""
+
+    def route(self, task: Dict) -> Dict:
+        return {"model": "gpt-4", "provider": "openai"}
+
+    def get_lightweight_model(self) -> str:
+        return "gpt-3.5-turbo"
+
+    def get_model(self) -> str:
+        return "gpt-4"
 
 
 class Orchestrator:
     """主協調器類"""
 
+    # 轉發取消請求給執行器的超時（秒）
+    CANCEL_FORWARD_TIMEOUT = 5.0
+
+    # 排空時等待在途任務完成的默認超時（秒）
+    DEFAULT_DRAIN_TIMEOUT = 30.0
+
+    # 僅允許本機客戶端調用的管理方法
+    ADMIN_METHODS = {"profile", "get_connections"}
+
     def __init__(self, config_path: str = "config.yaml"):
         """
         初始化協調器
@@ -30,7 +86,7 @@ class Orchestrator:
         self.config = Config(config_path)
 
         # 初始化各個模塊
-        self.state_manager = StateManager()
+        self.state_manager = StateManager.from_config(self._section("state_manager"))
         self.mcp_client = MCPClient(
             server_url=self.config.config.get("mcp_server_url", "ws://127.0.0.1:18789")
         )
@@ -38,80 +94,1021 @@ class Orchestrator:
             lite_llm_url=self.config.config.get("lite_llm_url", "http://localhost:4000"),
             github_key=self.config.config.get("github_key"),
         )
+        self.fault_handler.apply_config(self._section("fault_handler"))
+        # 故障狀態持久化到狀態數據庫，多實例共享；只有選舉出的實例執行健康探測
+        self.fault_state = FaultStateStore(
+            self.state_manager.conn, self.state_manager.instance_id
+        )
+        self.fault_handler.attach_store(self.fault_state)
+        self.health_monitor = HealthMonitor.from_config(
+            self.fault_handler, self.fault_state, self._section("fault_handler")
+        )
+        # 降級模式下直連 API 的響應緩存（重啟後保留）
+        self.fault_handler.response_cache = ResponseCache.from_config(
+            self.state_manager.conn, self._section("response_cache")
+        )
         self.router = RouterDecision(
             mcp_client=self.mcp_client,
             lite_llm_router=self._create_lite_llm_router(),
             backup_api_key=self.config.config.get("github_key"),
         )
+        self.router.apply_config(self._section("router"))
+        # 按執行器配置的 MCP 連接（未配置的執行器使用默認連接）
+        self.mcp_clients = MCPClientRegistry(self._section("mcp_servers"))
+        self.scheduler = TaskScheduler.from_config(self.config.config.get("scheduler"))
+
+        # 重複任務合併與結果緩存
+        cache_config = self.config.config.get("result_cache")
+        if not isinstance(cache_config, Mapping):
+            cache_config = {}
+        self.result_cache = ResultCache.from_config(self.state_manager.conn, cache_config)
+        self.single_flight = SingleFlight()
+        self.coalesce_inflight = bool(cache_config.get("coalesce_inflight", True))
+        # 任務結果持久化（與 tasks 表分開，按塊讀取）
+        self.result_store = ResultStore.from_config(
+            self.state_manager.conn, self._section("result_store")
+        )
+
+        # token 用量與成本賬本（預算接近上限時路由改用免費渠道）
+        self.usage_ledger = UsageLedger.from_config(
+            self.state_manager.conn, self._section("usage")
+        )
+        self.router.budget_guard = self.usage_ledger.near_budget
+
+        # 按會話存儲的對話歷史（路由複雜度與執行器上下文）
+        self.conversations = ConversationStore.from_config(
+            self.state_manager.conn, self._section("conversations")
+        )
+
+        # 集中式延遲重試隊列
+        self.retry_scheduler = RetryScheduler.from_config(
+            self.state_manager, self.config.config.get("retry")
+        )
+
+        # 本進程正在處理的任務（崩潰恢復時跳過）
+        self._running_tasks: Dict[str, asyncio.Task] = {}
+        # 排空狀態：停止接收新任務，超時未完成的任務存檔而非取消
+        self.accepting = True
+        self._checkpointing: Set[str] = set()
+        # 租約已被其他實例接管的任務（取消時不再寫入狀態）
+        self._lease_lost: Set[str] = set()
+        # 任務接收時間（perf_counter），用於統計接收到發出執行器調用的耗時
+        self._received_at: Dict[str, float] = {}
+        # 延遲狀態寫入的提交是否已排入事件循環
+        self._state_flush_scheduled = False
+        self.recovery = CrashRecovery.from_config(self, self.config.config.get("recovery"))
+        # 多實例：租約心跳與共享隊列拉取
+        self.lease_keeper = LeaseKeeper.from_config(self, self._section("leases"))
+        self.recovery_task: Optional[asyncio.Task] = None
+        self.recovery_report: Optional[Dict] = None
+        self.config_watcher: Optional[ConfigWatcher] = None
+
+        # 可選的流量錄製（traffic_replay 回放用）
+        self.traffic_recorder = TrafficRecorder.from_config(self._section("traffic_capture"))
+
+        # 各階段耗時指標（get_metrics 與可選的本地 HTTP 端口）
+        self.metrics = MetricsRegistry()
+        # 在線連接清單（由 MCPServer 注入）
+        self.connection_inventory: Optional[Callable[[], Dict]] = None
+        self.metrics_server = MetricsServer.from_config(self.metrics, self._section("metrics"))
+        # 按需採樣分析（管理方法觸發，未運行時無開銷）
+        self.profiler = SamplingProfiler.from_config(self._section("profiler"))
+
+    def _section(self, name: str) -> Mapping:
+        """讀取配置段（缺失或類型不符時返回空映射）"""
+        section = self.config.config.get(name)
+        return section if isinstance(section, Mapping) else {}
 
     def _create_lite_llm_router(self):
         """創建 LiteLLM 路由器（簡化版本）"""
-        # 這裡返回一個模擬的路由器
+        # 這裡返回一個固定模型的路由器
         # 實際實現中會連接到真實的 LiteLLM
-        return MagicMock(
-            route=lambda task: {"model": "gpt-4", "provider": "openai"},
-            get_lightweight_model=lambda: "gpt-3.5-turbo",
-            get_model=lambda: "gpt-4",
-        )
+        return _StaticLiteLLMRouter()
 
-    async def process_task(self, description: str) -> Dict:
+    async def process_task(
+        self,
+        description: str,
+        priority: Optional[str] = None,
+        deadline: Optional[float] = None,
+        session_id: Optional[str] = None,
+        deterministic: bool = True,
+        subtasks: Optional[SubtaskPlan] = None,
+    ) -> Dict:
         """
         處理任務的完整流程
 
         Args:
             description: 任務描述
+            priority: 客戶端指定的優先級（interactive / batch / 24/7）
+            deadline: 截止時間（Unix 時間戳），超時後任務失敗並通知執行器取消
+            session_id: 對話會話ID，提供時加載歷史並在完成後追加本輪對話
+            deterministic: 為 False 時繞過結果緩存與直連 API 響應緩存
+            subtasks: parse_subtasks() 解析的子任務計劃；提供時任務拆分為子任務並行執行
 
         Returns:
             處理結果
         """
+        if not self.accepting:
+            return {"status": "rejected", "error": "Server is draining"}
+
         # 1. 創建任務
-        task_id = self.state_manager.create_task(description)
+        received = time.perf_counter()
+        task_id = self.state_manager.create_task(
+            description, deadline=deadline, session_id=session_id
+        )
+        if subtasks:
+            self.state_manager.create_subtasks(task_id, subtasks)
+        self._received_at[task_id] = received
+        return await self._start_task(
+            task_id,
+            description,
+            priority,
+            deadline,
+            session_id,
+            deterministic,
+            fan_out=bool(subtasks),
+        )
+
+    def submit_task(
+        self,
+        description: str,
+        deadline: Optional[float] = None,
+        session_id: Optional[str] = None,
+        subtasks: Optional[SubtaskPlan] = None,
+    ) -> Dict:
+        """
+        將任務放入共享隊列（不等待結果），由有空閒容量的實例認領執行
+
+        Args:
+            description: 任務描述
+            deadline: 截止時間（Unix 時間戳）
+            session_id: 對話會話ID
+            subtasks: parse_subtasks() 解析的子任務計劃（隨父任務一同認領）
+
+        Returns:
+            {"task_id", "status": "queued"}
+        """
+        if not self.accepting:
+            return {"status": "rejected", "error": "Server is draining"}
+
+        task_id = self.state_manager.create_task(
+            description, deadline=deadline, session_id=session_id, claim=False
+        )
+        if subtasks:
+            self.state_manager.create_subtasks(task_id, subtasks)
+        return {"task_id": task_id, "status": "queued"}
+
+    async def resume_task(
+        self,
+        task_id: str,
+        description: str,
+        deadline: Optional[float] = None,
+        session_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        重新調度已存在的任務（崩潰恢復使用）
 
+        Args:
+            task_id: 任務ID
+            description: 任務描述
+            deadline: 截止時間（Unix 時間戳）
+            session_id: 對話會話ID
+
+        Returns:
+            處理結果
+        """
+        if not self.accepting:
+            # 保持原狀態並釋放租約，由其他實例或下次啟動恢復
+            self.state_manager.release_task(task_id)
+            return {"task_id": task_id, "status": "interrupted"}
+        return await self._start_task(
+            task_id,
+            description,
+            None,
+            deadline,
+            session_id,
+            fan_out=self.state_manager.has_subtasks(task_id),
+        )
+
+    def is_task_active(self, task_id: str) -> bool:
+        """任務是否正由本進程處理"""
+        return task_id in self._running_tasks
+
+    def owned_task_ids(self) -> List[str]:
+        """本實例持有租約的任務（處理中與已認領待處理）"""
+        return list(self._running_tasks.keys() | self.recovery.claimed)
+
+    def free_capacity(self) -> int:
+        """可從共享隊列拉取的任務數（執行槽上限減去本實例持有的任務）"""
+        return self.scheduler.max_concurrency - len(self.owned_task_ids())
+
+    def abandon_task(self, task_id: str):
+        """
+        放棄租約已被其他實例接管或已在其他實例取消的任務（取消本地執行，不寫入狀態）
+
+        Args:
+            task_id: 任務ID
+        """
+        self.recovery.claimed.discard(task_id)
+        run = self._running_tasks.get(task_id)
+        if run is not None and not run.done():
+            self._lease_lost.add(task_id)
+            run.cancel()
+
+    async def _start_task(
+        self,
+        task_id: str,
+        description: str,
+        priority: Optional[str],
+        deadline: Optional[float],
+        session_id: Optional[str] = None,
+        deterministic: bool = True,
+        fan_out: bool = False,
+    ) -> Dict:
+        """
+        在獨立的 asyncio.Task 中處理任務，以便 cancel_task 取消
+
+        Args:
+            task_id: 任務ID
+            description: 任務描述
+            priority: 客戶端指定的優先級
+            deadline: 截止時間（Unix 時間戳）
+            session_id: 對話會話ID
+            deterministic: 為 False 時繞過緩存
+            fan_out: 任務已拆分為子任務，按依賴圖執行子任務
+
+        Returns:
+            處理結果
+        """
+        started = self._received_at.setdefault(task_id, time.perf_counter())
+        run = asyncio.ensure_future(
+            self._run_task(
+                task_id, description, priority, deadline, session_id, deterministic, fan_out
+            )
+        )
+        self._running_tasks[task_id] = run
         try:
-            # 2. 檢查系統狀態
-            if self.fault_handler.system_state == SystemState.BRAINSTEM:
-                self.state_manager.update_state(task_id, TaskState.WAITING_FOR_CLOUD)
-                return {
-                    "task_id": task_id,
-                    "status": "suspended",
-                    "message": "Cloud unavailable, task suspended",
-                }
+            result = await run
+        finally:
+            self._running_tasks.pop(task_id, None)
+            self._received_at.pop(task_id, None)
 
-            # 3. 路由決策
-            self.state_manager.update_state(task_id, TaskState.DISPATCHING)
-            task = {"description": description, "conversation_history": []}
-            route = self.router.route_task(task)
+        self.metrics.tasks.inc(status=result.get("status", ""))
+        self.metrics.stage_duration.observe(
+            time.perf_counter() - started,
+            stage="total",
+            system_state=self.fault_handler.system_state.value,
+        )
+        return result
 
-            # 4. 執行任務
-            self.state_manager.update_state(task_id, TaskState.EXECUTING)
+    def _update_state(self, task_id: str, state: TaskState, defer: bool = False):
+        """
+        更新任務狀態並統計寫入耗時
 
-            # 根據系統狀態選擇執行方式
-            if self.fault_handler.system_state == SystemState.DEGRADED:
-                # 降級模式：使用直連 API
-                result = await self.fault_handler.fallback_to_direct_api(
-                    messages=[{"role": "user", "content": description}]
-                )
-            else:
-                # 正常模式：通過 MCP 調用執行器
-                await self.mcp_client.connect()
-                result = await self.mcp_client.call_tool(
-                    "execute_task",
-                    executor=route["executor"],
-                    model=route["model"],
-                    description=description,
+        Args:
+            task_id: 任務ID
+            state: 新狀態
+            defer: 為 True 時不阻塞調用方：狀態放入寫後緩衝，在下一輪事件循環中提交
+                （與執行器連接、排隊等待並行）
+        """
+        if not defer:
+            with self.metrics.time("state_write"):
+                self.state_manager.update_state(task_id, state)
+            return
+
+        self.state_manager.update_state(task_id, state, defer=True)
+        if not self._state_flush_scheduled:
+            self._state_flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_deferred_states)
+
+    def _flush_deferred_states(self):
+        """提交寫後緩衝中的狀態（同一輪延遲的寫入合併為一次事務）"""
+        self._state_flush_scheduled = False
+        with self.metrics.time("state_write"):
+            self.state_manager.flush_events()
+
+    def _warm_up(self, executor: str) -> asyncio.Future:
+        """
+        在後台獲取執行器的 MCP 會話，與緩存查詢、狀態寫入和排隊等待並行
+
+        Args:
+            executor: 執行器名稱
+
+        Returns:
+            連接完成的 Future（失敗時在 _execute 中拋出）
+        """
+        warmup = asyncio.ensure_future(self._client_for(executor).connect())
+        # 任務未走到執行階段（緩存命中、合併）時也要取走異常，避免未處理異常警告
+        warmup.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return warmup
+
+    def _record_dispatch(self, task_id: str, executor: str):
+        """
+        記錄從接收任務到發出執行器調用的耗時
+
+        Args:
+            task_id: 任務ID
+            executor: 執行器名稱
+        """
+        received = self._received_at.get(task_id)
+        if received is None:
+            return
+        elapsed = time.perf_counter() - received
+        self.metrics.stage_duration.observe(
+            elapsed,
+            stage="time_to_dispatch",
+            executor=executor,
+            system_state=self.fault_handler.system_state.value,
+        )
+        self.state_manager.record_event(
+            task_id, "dispatch", executor=executor, ms=round(elapsed * 1000, 3)
+        )
+
+    async def _run_task(
+        self,
+        task_id: str,
+        description: str,
+        priority: Optional[str],
+        deadline: Optional[float],
+        session_id: Optional[str] = None,
+        deterministic: bool = True,
+        fan_out: bool = False,
+    ) -> Dict:
+        """
+        執行已創建任務的路由與執行流程
+
+        Args:
+            task_id: 任務ID
+            description: 任務描述
+            priority: 客戶端指定的優先級
+            deadline: 截止時間（Unix 時間戳）
+            session_id: 對話會話ID
+            deterministic: 為 False 時繞過緩存
+            fan_out: 任務已拆分為子任務，按依賴圖執行子任務
+
+        Returns:
+            處理結果
+        """
+        run = self._fan_out if fan_out else self._dispatch_task
+        try:
+            async with asyncio.timeout(_remaining(deadline)):
+                return await run(
+                    task_id, description, priority, deadline, session_id, deterministic
                 )
 
-            # 5. 完成任務
-            self.state_manager.update_state(task_id, TaskState.COMPLETED)
+        except TimeoutError:
+            if fan_out:
+                self._cancel_subtasks(task_id)
+            self._update_state(task_id, TaskState.FAILED)
+            logger.warning(
+                "任務超過截止時間: %s", task_id, extra={"task_id": task_id, "stage": "deadline"}
+            )
+            return {"task_id": task_id, "status": "failed", "error": "Deadline exceeded"}
+
+        except asyncio.CancelledError:
+            if task_id in self._lease_lost:
+                # 租約已被接管或任務已在其他實例取消：狀態以數據庫記錄為準，不再寫入
+                self._lease_lost.discard(task_id)
+                task = self.state_manager.get_task(task_id)
+                if task is not None and task.state == TaskState.CANCELLED:
+                    return {"task_id": task_id, "status": "cancelled"}
+                return {"task_id": task_id, "status": "lease_lost"}
+            if task_id in self._checkpointing:
+                # 排空超時：存檔為可恢復狀態並釋放租約，由其他實例或重啟後重新調度
+                self._update_state(task_id, TaskState.IDLE)
+                self.state_manager.release_task(task_id)
+                return {"task_id": task_id, "status": "interrupted"}
+            if fan_out:
+                self._cancel_subtasks(task_id)
+            self._update_state(task_id, TaskState.CANCELLED)
+            return {"task_id": task_id, "status": "cancelled"}
+
+        except Exception as e:
+            self._update_state(task_id, TaskState.FAILED)
+            logger.warning(
+                "任務失敗 %s: %s", task_id, e, extra={"task_id": task_id, "stage": "execute"}
+            )
+            return {"task_id": task_id, "status": "failed", "error": str(e)}
+
+    async def _dispatch_task(
+        self,
+        task_id: str,
+        description: str,
+        priority: Optional[str],
+        deadline: Optional[float],
+        session_id: Optional[str] = None,
+        deterministic: bool = True,
+    ) -> Dict:
+        """
+        路由、查緩存並執行任務
+
+        Args:
+            task_id: 任務ID
+            description: 任務描述
+            priority: 客戶端指定的優先級
+            deadline: 截止時間（Unix 時間戳）
+            session_id: 對話會話ID
+            deterministic: 為 False 時繞過緩存
+
+        Returns:
+            處理結果
+        """
+        if deadline is not None and _remaining(deadline) <= 0:
+            raise TimeoutError()
+
+        # 2. 檢查系統狀態
+        if self.fault_handler.system_state == SystemState.BRAINSTEM:
+            self._update_state(task_id, TaskState.WAITING_FOR_CLOUD)
+            return {
+                "task_id": task_id,
+                "status": "suspended",
+                "message": "Cloud unavailable, task suspended",
+            }
+
+        # 3. 路由決策（DISPATCHING 寫入不阻塞路由）
+        self._update_state(task_id, TaskState.DISPATCHING, defer=True)
+        history = self.conversations.get(session_id) if session_id else []
+        task = TaskRecord(
+            task_id,
+            description,
+            TaskState.DISPATCHING,
+            deadline=deadline,
+            session_id=session_id,
+            conversation_history=history,
+        )
+        with self.metrics.time(
+            "route", system_state=self.fault_handler.system_state.value
+        ):
+            route = self.router.route_task(task)
+        # 執行器會話在緩存查詢與排隊期間並行建立
+        warmup = None
+        if self.fault_handler.system_state != SystemState.DEGRADED:
+            warmup = self._warm_up(route["executor"])
+        self.state_manager.record_event(
+            task_id,
+            "route",
+            executor=route.get("executor"),
+            model=route.get("model"),
+            complexity=route.get("complexity"),
+        )
+
+        # 4. 緩存命中直接返回（對話上下文按 token 預算截斷後參與緩存鍵）
+        context = self.conversations.context_for(history) if history else []
+        key = request_key(description, route, context)
+        cached = self.result_cache.get(key) if deterministic else None
+        if cached is not None:
+            source_task_id, content = cached
+            self.state_manager.record_result_source(task_id, "cache", source_task_id)
+            self._remember_turn(session_id, description, content)
+            self._update_state(task_id, TaskState.COMPLETED)
             return {
                 "task_id": task_id,
                 "status": "completed",
-                "result": result.content if hasattr(result, "content") else result,
+                "result": content,
+                "cached": True,
             }
 
+        # 5. 執行任務（相同請求合併為一次執行）
+        if self.coalesce_inflight and deterministic:
+            content, source_task_id = await self.single_flight.do(
+                key,
+                task_id,
+                lambda: self._execute(
+                    task_id,
+                    description,
+                    route,
+                    priority,
+                    deadline,
+                    context,
+                    deterministic,
+                    warmup,
+                ),
+            )
+        else:
+            content = await self._execute(
+                task_id, description, route, priority, deadline, context, deterministic, warmup
+            )
+            source_task_id = None
+
+        if source_task_id:
+            self.state_manager.record_result_source(task_id, "coalesced", source_task_id)
+        else:
+            self.result_store.put(task_id, content)
+            if deterministic:
+                self.result_cache.put(key, task_id, content)
+
+        # 6. 完成任務
+        self._remember_turn(session_id, description, content)
+        self._update_state(task_id, TaskState.COMPLETED)
+        return {
+            "task_id": task_id,
+            "status": "completed",
+            "result": content,
+        }
+
+    async def _fan_out(
+        self,
+        task_id: str,
+        description: str,
+        priority: Optional[str],
+        deadline: Optional[float],
+        session_id: Optional[str] = None,
+        deterministic: bool = True,
+    ) -> Dict:
+        """
+        按依賴圖執行子任務並匯總結果
+
+        父任務本身不路由；子任務各自經 RouterDecision 選擇執行器，依賴已完成的子任務
+        並行執行。子任務執行期間父任務保持 DISPATCHING（崩潰後可安全重新調度：
+        已完成的子任務不會重跑）。
+
+        Args:
+            task_id: 父任務ID
+            description: 任務描述
+            priority: 客戶端指定的優先級（子任務沿用）
+            deadline: 截止時間（Unix 時間戳）
+            session_id: 對話會話ID（匯總結果作為一輪對話記錄）
+            deterministic: 為 False 時子任務繞過緩存
+
+        Returns:
+            處理結果，result 為 {"subtasks": [各子任務結果]}
+        """
+        if deadline is not None and _remaining(deadline) <= 0:
+            raise TimeoutError()
+
+        if self.fault_handler.system_state == SystemState.BRAINSTEM:
+            self._update_state(task_id, TaskState.WAITING_FOR_CLOUD)
+            return {
+                "task_id": task_id,
+                "status": "suspended",
+                "message": "Cloud unavailable, task suspended",
+            }
+
+        self._update_state(task_id, TaskState.DISPATCHING)
+        graph = TaskGraph(
+            self.state_manager.get_subtasks(task_id),
+            run=lambda subtask: self._run_subtask(subtask, priority, deterministic),
+            skip=self._skip_subtask,
+        )
+        results = await graph.run()
+        content = {"subtasks": results}
+        self.result_store.put(task_id, content)
+
+        statuses = {result.get("status") for result in results}
+        if statuses == {"completed"}:
+            self._remember_turn(session_id, description, content)
+            self._update_state(task_id, TaskState.COMPLETED)
+            return {"task_id": task_id, "status": "completed", "result": content}
+        if statuses <= {"completed", "suspended"}:
+            # 腦幹模式下掛起的子任務恢復後由父任務重新調度
+            self._update_state(task_id, TaskState.WAITING_FOR_CLOUD)
+            return {"task_id": task_id, "status": "suspended", "result": content}
+
+        failed = sum(1 for result in results if result.get("status") != "completed")
+        self._update_state(task_id, TaskState.FAILED)
+        return {
+            "task_id": task_id,
+            "status": "failed",
+            "error": f"{failed} of {len(results)} subtasks did not complete",
+            "result": content,
+        }
+
+    async def _run_subtask(
+        self, subtask: TaskRecord, priority: Optional[str], deterministic: bool
+    ) -> Dict:
+        """
+        執行一個子任務（重新調度父任務時，已結束的子任務直接返回記錄的結果）
+
+        Args:
+            subtask: 子任務記錄
+            priority: 客戶端指定的優先級
+            deterministic: 為 False 時繞過緩存
+
+        Returns:
+            子任務結果
+        """
+        if subtask.state == TaskState.COMPLETED:
+            return {
+                "task_id": subtask.task_id,
+                "status": "completed",
+                "result": self.result_store.get(self._result_owner(subtask)),
+            }
+        if subtask.state in TERMINAL_STATES:
+            return {"task_id": subtask.task_id, "status": subtask.state.value}
+        if self.recovery.policy.get(subtask.state) == RecoveryAction.FAIL:
+            # 崩潰前已到達執行器的子任務按恢復策略處理（可能已有副作用）
+            self._update_state(subtask.task_id, TaskState.FAILED)
+            return {
+                "task_id": subtask.task_id,
+                "status": "failed",
+                "error": "Interrupted while executing",
+            }
+        return await self._start_task(
+            subtask.task_id,
+            subtask.description,
+            priority,
+            subtask.deadline,
+            deterministic=deterministic,
+        )
+
+    def _skip_subtask(self, subtask: TaskRecord) -> Dict:
+        """
+        跳過依賴未完成的子任務（記錄為已取消）
+
+        Args:
+            subtask: 子任務記錄
+
+        Returns:
+            子任務結果
+        """
+        if subtask.state not in TERMINAL_STATES:
+            self._update_state(subtask.task_id, TaskState.CANCELLED)
+        return {
+            "task_id": subtask.task_id,
+            "status": "skipped",
+            "error": "Dependency did not complete",
+        }
+
+    async def _execute(
+        self,
+        task_id: str,
+        description: str,
+        route: Dict,
+        priority: Optional[str],
+        deadline: Optional[float],
+        context: Optional[List[Dict]] = None,
+        deterministic: bool = True,
+        warmup: Optional[asyncio.Future] = None,
+    ):
+        """
+        排隊等待執行槽並調用執行器
+
+        Args:
+            task_id: 任務ID
+            description: 任務描述
+            route: 路由結果
+            priority: 客戶端指定的優先級
+            deadline: 截止時間（Unix 時間戳）
+            context: 截斷後的對話上下文
+            deterministic: 為 False 時繞過直連 API 響應緩存
+            warmup: 路由後已開始的執行器連接
+
+        Returns:
+            執行結果內容
+        """
+        priority_class = self.scheduler.classify(route, priority)
+        labels = {
+            "executor": route["executor"],
+            "model": route["model"],
+            "system_state": self.fault_handler.system_state.value,
+        }
+        wait = 0.0
+        called = None
+        try:
+            async with self.scheduler.slot(priority_class, route.get("complexity", 0)) as wait:
+                self.metrics.stage_duration.observe(wait, stage="queue_wait", **labels)
+                self._update_state(task_id, TaskState.EXECUTING, defer=True)
+
+                # 根據系統狀態選擇執行方式
+                if self.fault_handler.system_state == SystemState.DEGRADED:
+                    # 降級模式：使用直連 API
+                    executor = "direct_api"
+                    self._record_dispatch(task_id, executor)
+                    called = time.perf_counter()
+                    with self.metrics.time("direct_api", **labels):
+                        result = await self.fault_handler.fallback_to_direct_api(
+                            messages=(context or []) + [{"role": "user", "content": description}],
+                            deterministic=deterministic,
+                        )
+                else:
+                    # 正常模式：通過 MCP 調用執行器
+                    executor = route["executor"]
+                    client = self._client_for(executor)
+                    with self.metrics.time("connect", **labels):
+                        # 通常已在排隊期間完成；連接失敗時在此拋出
+                        await (warmup if warmup is not None else client.connect())
+                    arguments = {
+                        "executor": executor,
+                        "model": route["model"],
+                        "description": description,
+                        "task_id": task_id,
+                    }
+                    if deadline is not None:
+                        arguments["deadline"] = deadline
+                    if context:
+                        arguments["conversation_history"] = context
+                    self._record_dispatch(task_id, executor)
+                    called = time.perf_counter()
+                    try:
+                        with self.metrics.time("call_tool", **labels):
+                            result = await client.call_tool(
+                                "execute_task", timeout=_remaining(deadline), **arguments
+                            )
+                    except asyncio.CancelledError:
+                        # 通知執行器放棄該任務，釋放其工作槽
+                        await self._forward_cancel(client, task_id, executor)
+                        raise
         except Exception as e:
-            self.state_manager.update_state(task_id, TaskState.FAILED)
-            return {"task_id": task_id, "status": "failed", "error": str(e)}
+            if called is not None:
+                self.traffic_recorder.record_execution(
+                    task_id,
+                    description,
+                    route,
+                    executor,
+                    wait,
+                    time.perf_counter() - called,
+                    error=str(e),
+                )
+            raise
+
+        input_tokens, output_tokens, model = extract_usage(result)
+        if result is not None:
+            self.usage_ledger.record(
+                task_id,
+                model=model or route["model"],
+                executor=executor,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+            )
+        self.traffic_recorder.record_execution(
+            task_id,
+            description,
+            route,
+            executor,
+            wait,
+            time.perf_counter() - called,
+            input_tokens,
+            output_tokens,
+        )
+
+        return result.content if hasattr(result, "content") else result
+
+    def _remember_turn(self, session_id: Optional[str], description: str, content):
+        """
+        將本輪對話追加到會話歷史
+
+        Args:
+            session_id: 對話會話ID（None 時不記錄）
+            description: 用戶請求
+            content: 執行結果內容
+        """
+        if not session_id:
+            return
+        self.conversations.append(
+            session_id,
+            {"role": "user", "content": description},
+            {"role": "assistant", "content": message_text(content)},
+        )
+
+    def _result_owner(self, task: TaskRecord) -> str:
+        """
+        結果實際保存在哪個任務下（緩存命中與合併執行的任務共享原任務的結果）
+
+        Args:
+            task: 任務記錄
+
+        Returns:
+            任務ID
+        """
+        return task.source_task_id or task.task_id
+
+    def _client_for(self, executor: str) -> MCPClient:
+        """
+        獲取執行器對應的 MCP 客戶端
+
+        Args:
+            executor: 執行器名稱
+
+        Returns:
+            註冊表中的客戶端，未配置時返回默認客戶端
+        """
+        return self.mcp_clients.get(executor) or self.mcp_client
+
+    async def _forward_cancel(self, client: MCPClient, task_id: str, executor: str):
+        """
+        將取消請求轉發給執行器（盡力而為）
+
+        Args:
+            client: 執行任務的 MCP 客戶端
+            task_id: 任務ID
+            executor: 執行器名稱
+        """
+        try:
+            await asyncio.wait_for(
+                client.call_tool("cancel_task", executor=executor, task_id=task_id),
+                timeout=self.CANCEL_FORWARD_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning(
+                "轉發取消請求失敗 %s: %s",
+                task_id,
+                e,
+                extra={"task_id": task_id, "stage": "cancel", "executor": executor},
+            )
+
+    async def cancel_task(self, task_id: str) -> Dict:
+        """
+        取消任務
+
+        Args:
+            task_id: 任務ID
+
+        Returns:
+            取消結果
+        """
+        run = self._running_tasks.get(task_id)
+        if run is not None:
+            run.cancel()
+            return await asyncio.shield(run)
+
+        task = self.state_manager.get_task(task_id)
+        if task is None:
+            return {"task_id": task_id, "error": "Task not found"}
+
+        if task.state in TERMINAL_STATES:
+            return {
+                "task_id": task_id,
+                "error": f"Task already {task.state.value}",
+            }
+
+        # 未在本進程運行（如掛起中或已認領待恢復的任務）：直接記錄取消，
+        # 未結束的子任務一併取消；不再為其續約，恢復前的重新讀取會跳過它
+        self.recovery.claimed.discard(task_id)
+        self._cancel_subtasks(task_id)
+        self.state_manager.update_state(task_id, TaskState.CANCELLED)
+        return {"task_id": task_id, "status": "cancelled"}
+
+    def _cancel_subtasks(self, task_id: str):
+        """
+        將未結束的子任務記錄為已取消（父任務取消或超時後，尚未啟動的子任務不再由崩潰恢復重跑）
+
+        Args:
+            task_id: 父任務ID
+        """
+        for subtask in self.state_manager.get_subtasks(task_id):
+            if subtask.state not in TERMINAL_STATES:
+                self.state_manager.update_state(subtask.task_id, TaskState.CANCELLED)
+
+    async def drain(self, timeout: Optional[float] = None) -> Dict:
+        """
+        排空協調器：停止接收新任務，等待在途任務完成，超時的任務存檔
+
+        存檔的任務回到 IDLE 狀態，並通知執行器取消，下次啟動時由崩潰恢復重新調度。
+
+        Args:
+            timeout: 等待在途任務的時間（秒），默認讀取 shutdown.drain_timeout
+
+        Returns:
+            排空報告（完成數、存檔數、耗時）
+        """
+        started = time.perf_counter()
+        if timeout is None:
+            timeout = float(
+                self._section("shutdown").get("drain_timeout", self.DEFAULT_DRAIN_TIMEOUT)
+            )
+
+        self.accepting = False
+        if self.config_watcher:
+            self.config_watcher.stop()
+
+        in_flight = dict(self._running_tasks)
+        logger.info("開始排空: %d 個在途任務, 超時 %.1f 秒", len(in_flight), timeout)
+
+        pending = set()
+        if in_flight:
+            _, pending = await asyncio.wait(in_flight.values(), timeout=timeout)
+
+        checkpointed = [task_id for task_id, run in in_flight.items() if run in pending]
+        self._checkpointing.update(checkpointed)
+        for task_id in checkpointed:
+            in_flight[task_id].cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        report = {
+            "completed": len(in_flight) - len(checkpointed),
+            "checkpointed": len(checkpointed),
+            "duration_ms": (time.perf_counter() - started) * 1000,
+        }
+        logger.info(
+            "排空完成: 完成 %d, 存檔 %d, 耗時 %.1f ms",
+            report["completed"],
+            report["checkpointed"],
+            report["duration_ms"],
+        )
+        return report
+
+    def start_background_tasks(self):
+        """啟動後台任務：崩潰恢復、租約維護、配置熱重載與指標端口（服務開始監聽後調用）"""
+        self.start_recovery()
+
+        if self.lease_keeper is not None:
+            self.lease_keeper.start()
+
+        if self.health_monitor.interval > 0:
+            self.health_monitor.start()
+
+        if self.metrics_server is not None:
+            asyncio.create_task(self.metrics_server.start())
+
+        watch_config = self._section("config_watch")
+        if watch_config.get("enabled", True) and self.config_watcher is None:
+            self.config_watcher = ConfigWatcher(
+                self.config,
+                on_change=self.apply_config,
+                interval=float(watch_config.get("interval", 2.0)),
+            )
+            self.config_watcher.start()
+
+    async def apply_config(self, old_config: Mapping, new_config: Mapping) -> List[str]:
+        """
+        應用熱重載的配置，只重建受影響的組件
+
+        Args:
+            old_config: 舊配置快照
+            new_config: 新配置快照
+
+        Returns:
+            變更的頂層配置鍵
+        """
+        changed = set(changed_sections(old_config, new_config))
+        github_key = new_config.get("github_key")
+
+        if changed & {"fault_handler", "lite_llm_url", "github_key"}:
+            self.fault_handler.apply_config(
+                self._section("fault_handler"),
+                lite_llm_url=new_config.get("lite_llm_url"),
+                github_key=github_key,
+            )
+            self.health_monitor.interval = float(
+                self._section("fault_handler").get(
+                    "health_check_interval", self.health_monitor.interval
+                )
+            )
+
+        if changed & {"router", "github_key"}:
+            self.router.apply_config(self._section("router"), backup_api_key=github_key)
+
+        if "model_list" in changed:
+            self.router.lite_llm_router = self._create_lite_llm_router()
+
+        if "mcp_server_url" in changed:
+            old_client = self.mcp_client
+            self.mcp_client = MCPClient(
+                server_url=new_config.get("mcp_server_url", "ws://127.0.0.1:18789")
+            )
+            self.router.mcp_client = self.mcp_client
+            # 新任務使用新連接，舊連接在在途調用結束後斷開
+            self.mcp_clients.retire(old_client)
+
+        if "mcp_servers" in changed:
+            rebuilt = await self.mcp_clients.apply(self._section("mcp_servers"))
+            logger.info("已重建 MCP 連接: %s", rebuilt)
+
+        if "conversations" in changed:
+            self.conversations = ConversationStore.from_config(
+                self.state_manager.conn, self._section("conversations")
+            )
+
+        if "response_cache" in changed:
+            self.fault_handler.response_cache.flush()
+            self.fault_handler.response_cache = ResponseCache.from_config(
+                self.state_manager.conn, self._section("response_cache")
+            )
+
+        if "traffic_capture" in changed:
+            self.traffic_recorder.close()
+            self.traffic_recorder = TrafficRecorder.from_config(self._section("traffic_capture"))
+
+        if "usage" in changed:
+            self.usage_ledger.flush()
+            self.usage_ledger = UsageLedger.from_config(
+                self.state_manager.conn, self._section("usage")
+            )
+            self.router.budget_guard = self.usage_ledger.near_budget
+
+        return sorted(changed)
+
+    def start_recovery(self) -> asyncio.Task:
+        """
+        在後台啟動崩潰恢復（服務開始監聽後調用）
+
+        Returns:
+            恢復任務
+        """
+        if self.recovery_task is None:
+            self.recovery_task = asyncio.create_task(self.recover_inflight_tasks())
+        return self.recovery_task
+
+    async def recover_inflight_tasks(self) -> Dict:
+        """
+        恢復崩潰前遺留的進行中任務
+
+        Returns:
+            恢復報告
+        """
+        self.recovery_report = await self.recovery.run()
+        return self.recovery_report
 
     async def enter_brainstem_mode(self):
         """進入腦幹模式"""
@@ -120,10 +1117,8 @@ class Orchestrator:
         # 掛起所有正在執行的任務
         pending_tasks = self.state_manager.get_pending_tasks()
         for task in pending_tasks:
-            if task["state"] in [TaskState.EXECUTING.value, TaskState.DISPATCHING.value]:
-                self.state_manager.update_state(
-                    task["task_id"], TaskState.WAITING_FOR_CLOUD
-                )
+            if task.state in (TaskState.EXECUTING, TaskState.DISPATCHING):
+                self.state_manager.update_state(task.task_id, TaskState.WAITING_FOR_CLOUD)
 
     async def recover_from_brainstem(self):
         """從腦幹模式恢復"""
@@ -132,8 +1127,8 @@ class Orchestrator:
         # 恢復所有掛起的任務
         pending_tasks = self.state_manager.get_pending_tasks()
         for task in pending_tasks:
-            if task["state"] == TaskState.WAITING_FOR_CLOUD.value:
-                self.state_manager.update_state(task["task_id"], TaskState.IDLE)
+            if task.state == TaskState.WAITING_FOR_CLOUD:
+                self.state_manager.update_state(task.task_id, TaskState.IDLE)
 
     async def monitor_health(self) -> Dict:
         """
@@ -152,15 +1147,17 @@ class Orchestrator:
         }
 
     async def execute_with_retry(
-        self, task_id: str, max_retries: int = 3, base_delay: float = 1.0
+        self, task_id: str, max_retries: int = 3, base_delay: Optional[float] = None
     ) -> Dict:
         """
         帶重試的任務執行
 
+        退避延遲由集中式重試隊列調度（全抖動），重試受全局重試預算限制。
+
         Args:
             task_id: 任務 ID
-            max_retries: 最大重試次數
-            base_delay: 基礎延遲（秒）
+            max_retries: 最大嘗試次數
+            base_delay: 基礎延遲（秒），默認使用配置值
 
         Returns:
             執行結果
@@ -169,10 +1166,13 @@ class Orchestrator:
         if not task:
             return {"status": "failed", "error": "Task not found"}
 
+        budget = self.retry_scheduler.budget
+        budget.record_request()
+
         for attempt in range(max_retries):
             try:
                 result = await self.mcp_client.call_tool(
-                    "execute_task", description=task["description"]
+                    "execute_task", description=task.description
                 )
 
                 self.state_manager.update_state(task_id, TaskState.COMPLETED)
@@ -182,29 +1182,100 @@ class Orchestrator:
                 }
 
             except Exception as e:
-                if attempt < max_retries - 1:
-                    # 指數退避
-                    delay = base_delay * (2**attempt)
-                    await asyncio.sleep(delay)
-                else:
+                if attempt >= max_retries - 1:
                     self.state_manager.update_state(task_id, TaskState.FAILED)
                     return {"status": "failed", "error": str(e)}
 
+                if not budget.try_acquire():
+                    # 重試預算耗盡：快速失敗，避免放大故障
+                    self.state_manager.update_state(task_id, TaskState.FAILED)
+                    return {
+                        "status": "failed",
+                        "error": str(e),
+                        "retry_budget_exhausted": True,
+                    }
+
+                delay = self.retry_scheduler.backoff(attempt, base_delay)
+                await self.retry_scheduler.wait(task_id, attempt + 1, delay, str(e))
+
     async def shutdown(self):
         """關閉協調器並清理資源"""
+        # 停止配置監視、崩潰恢復與等待中的重試
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.recovery_task and not self.recovery_task.done():
+            self.recovery_task.cancel()
+            await asyncio.gather(self.recovery_task, return_exceptions=True)
+        if self.lease_keeper is not None:
+            await self.lease_keeper.stop()
+        await self.health_monitor.stop()
+        self.retry_scheduler.close()
+
         # 斷開 MCP 連接
         if self.mcp_client.session:
             await self.mcp_client.disconnect()
+        await self.mcp_clients.close()
+
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+
+        # 提交並關閉狀態數據庫
+        self.traffic_recorder.close()
+        self.usage_ledger.flush()
+        self.fault_handler.response_cache.flush()
+        self.state_manager.close()
+
+    @staticmethod
+    def _is_local_peer(peer) -> bool:
+        """
+        客戶端是否來自本機
 
-        # 保持狀態管理器連接（用於持久化）
-        # 實際實現中可能需要顯式關閉
+        Args:
+            peer: 客戶端地址 (host, port)；None 表示進程內調用
+
+        Returns:
+            是否為本機
+        """
+        if peer is None:
+            return True
+
+        host = peer[0] if isinstance(peer, (tuple, list)) else str(peer)
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return host == "localhost"
+        mapped = getattr(address, "ipv4_mapped", None)
+        return (mapped or address).is_loopback
+
+    async def process_mcp_message(self, message: str, peer=None) -> str:
+        """
+        處理 MCP 消息（啟用流量錄製時記錄請求與結果）
+
+        Args:
+            message: MCP 協議消息 (JSON 字符串)
+            peer: 客戶端地址 (host, port)，用於限制管理方法；None 表示進程內調用
+
+        Returns:
+            str: MCP 響應消息 (JSON 字符串)
+        """
+        if not self.traffic_recorder.enabled:
+            return await self._handle_mcp_message(message, peer)
+
+        received_at = time.time()
+        started = time.perf_counter()
+        response = await self._handle_mcp_message(message, peer)
+        self.traffic_recorder.record_request(
+            received_at, message, response, time.perf_counter() - started
+        )
+        return response
 
-    async def process_mcp_message(self, message: str) -> str:
+    async def _handle_mcp_message(self, message: str, peer=None) -> str:
         """
-        處理 MCP 消息
+        分派 MCP 消息
 
         Args:
             message: MCP 協議消息 (JSON 字符串)
+            peer: 客戶端地址 (host, port)
 
         Returns:
             str: MCP 響應消息 (JSON 字符串)
@@ -217,22 +1288,210 @@ class Orchestrator:
 
         method = data.get("method")
 
+        if method in self.ADMIN_METHODS and not self._is_local_peer(peer):
+            return json.dumps({"error": f"Method {method} is restricted to localhost"})
+
         if method == "ping":
             return json.dumps({"result": "pong"})
 
         elif method == "create_task":
-            description = data.get("params", {}).get("description", "")
+            params = data.get("params", {})
+            description = params.get("description", "")
             if not description:
                 return json.dumps({"error": "Missing description"})
-            result = await self.process_task(description)
-            return json.dumps({"result": result})
+            if not self.accepting:
+                return json.dumps({"error": "Server is draining"})
+            priority = params.get("priority")
+            if priority is not None:
+                try:
+                    PriorityClass(priority)
+                except ValueError:
+                    return json.dumps({"error": f"Invalid priority: {priority}"})
+            # 截止時間：timeout（相對秒數）優先於 deadline（Unix 時間戳）
+            try:
+                deadline = params.get("deadline")
+                if params.get("timeout") is not None:
+                    deadline = time.time() + float(params["timeout"])
+                elif deadline is not None:
+                    deadline = float(deadline)
+            except (TypeError, ValueError):
+                return json.dumps({"error": "Invalid timeout or deadline"})
+            session_id = params.get("session_id")
+            if session_id is not None and not isinstance(session_id, str):
+                return json.dumps({"error": "Invalid session_id"})
+            deterministic = params.get("deterministic", True)
+            if not isinstance(deterministic, bool):
+                return json.dumps({"error": "Invalid deterministic"})
+            subtasks = None
+            if params.get("subtasks") is not None:
+                try:
+                    subtasks = parse_subtasks(params["subtasks"])
+                except ValueError as e:
+                    return json.dumps({"error": f"Invalid subtasks: {e}"})
+            if params.get("wait", True) is False:
+                # 放入共享隊列，立即返回；通過 get_task_status / get_task_result 查詢
+                result = self.submit_task(
+                    description, deadline=deadline, session_id=session_id, subtasks=subtasks
+                )
+                return json.dumps({"result": result})
+            result = await self.process_task(
+                description,
+                priority=priority,
+                deadline=deadline,
+                session_id=session_id,
+                deterministic=deterministic,
+                subtasks=subtasks,
+            )
+            # 執行器返回的 MCP 內容塊需轉換為可 JSON 編碼的字典
+            return json.dumps({"result": result}, default=encode_default)
+
+        elif method == "cancel_task":
+            task_id = data.get("params", {}).get("task_id", "")
+            if not task_id:
+                return json.dumps({"error": "Missing task_id"})
+            result = await self.cancel_task(task_id)
+            return json.dumps({"result": result}, default=encode_default)
 
         elif method == "get_task_status":
             task_id = data.get("params", {}).get("task_id", "")
             if not task_id:
                 return json.dumps({"error": "Missing task_id"})
-            result = self.state_manager.get_task(task_id)
-            return json.dumps({"result": result or {"error": "Task not found"}})
+            task = self.state_manager.get_task(task_id)
+            if task is None:
+                return json.dumps({"result": {"error": "Task not found"}})
+            result = task.to_dict()
+            info = self.result_store.get_info(self._result_owner(task))
+            if info is not None:
+                result["result_info"] = info
+            return json.dumps({"result": result})
+
+        elif method == "get_task_tree":
+            task_id = data.get("params", {}).get("task_id", "")
+            if not task_id:
+                return json.dumps({"error": "Missing task_id"})
+            tree = self.state_manager.get_task_tree(task_id)
+            if tree is None:
+                return json.dumps({"result": {"error": "Task not found"}})
+            return json.dumps({"result": tree})
+
+        elif method == "get_task_result":
+            params = data.get("params", {})
+            task_id = params.get("task_id", "")
+            if not task_id:
+                return json.dumps({"error": "Missing task_id"})
+            try:
+                chunk = int(params.get("chunk", 0))
+            except (TypeError, ValueError):
+                return json.dumps({"error": "Invalid chunk"})
+            task = self.state_manager.get_task(task_id)
+            if task is None:
+                return json.dumps({"error": "Task not found"})
+            owner = self._result_owner(task)
+            info = self.result_store.get_info(owner)
+            text = self.result_store.get_chunk(owner, chunk) if info else None
+            if text is None:
+                return json.dumps({"error": "Result not found"})
+            return json.dumps(
+                {
+                    "result": {
+                        "task_id": task_id,
+                        "chunk": chunk,
+                        "chunks": info["chunks"],
+                        "size": info["size"],
+                        "data": text,
+                    }
+                }
+            )
+
+        elif method == "get_task_timeline":
+            task_id = data.get("params", {}).get("task_id", "")
+            if not task_id:
+                return json.dumps({"error": "Missing task_id"})
+            return json.dumps({"result": self.state_manager.get_task_events(task_id)})
+
+        elif method == "get_slowest_tasks":
+            params = data.get("params", {})
+            try:
+                result = self.state_manager.get_slowest_stages(
+                    stage=params.get("stage"),
+                    window_seconds=float(params.get("window_seconds", 3600)),
+                    limit=int(params.get("limit", 10)),
+                )
+            except (TypeError, ValueError):
+                return json.dumps({"error": "Invalid window_seconds or limit"})
+            return json.dumps({"result": result})
+
+        elif method == "profile":
+            try:
+                seconds = float(data.get("params", {}).get("seconds", 10))
+            except (TypeError, ValueError):
+                return json.dumps({"error": "Invalid seconds"})
+            try:
+                result = await self.profiler.run(seconds)
+            except RuntimeError as e:
+                return json.dumps({"error": str(e)})
+            return json.dumps({"result": result})
+
+        elif method == "get_recovery_status":
+            return json.dumps(
+                {
+                    "result": self.recovery_report
+                    or {"status": "running" if self.recovery_task else "not_started"}
+                }
+            )
+
+        elif method == "get_scheduler_stats":
+            return json.dumps(
+                {
+                    "result": {
+                        **self.scheduler.get_stats(),
+                        "retries": self.retry_scheduler.get_stats(),
+                    }
+                }
+            )
+
+        elif method == "get_cache_stats":
+            return json.dumps({"result": self.fault_handler.response_cache.get_stats()})
+
+        elif method == "get_conversation":
+            session_id = data.get("params", {}).get("session_id", "")
+            if not session_id:
+                return json.dumps({"error": "Missing session_id"})
+            return json.dumps({"result": self.conversations.get(session_id)})
+
+        elif method == "get_usage":
+            params = data.get("params", {})
+            try:
+                result = self.usage_ledger.get_summary(
+                    window_seconds=float(params.get("window_seconds", 3600)),
+                    per_minute=bool(params.get("per_minute", False)),
+                )
+            except (TypeError, ValueError):
+                return json.dumps({"error": "Invalid window_seconds"})
+            return json.dumps({"result": result})
+
+        elif method == "get_fault_state":
+            try:
+                limit = int(data.get("params", {}).get("limit", 20))
+            except (TypeError, ValueError):
+                return json.dumps({"error": "Invalid limit"})
+            return json.dumps(
+                {
+                    "result": {
+                        **self.fault_state.load(),
+                        "is_prober": self.health_monitor.is_prober,
+                        "history": self.fault_state.get_history(limit),
+                    }
+                }
+            )
+
+        elif method == "get_connections":
+            if self.connection_inventory is None:
+                return json.dumps({"error": "Connection inventory unavailable"})
+            return json.dumps({"result": self.connection_inventory()})
+
+        elif method == "get_metrics":
+            return json.dumps({"result": self.metrics.snapshot()})
 
         else:
             return json.dumps({"error": f"Unknown method: {method}"})
@@ -0,0 +1,217 @@
+"""
+Profiler module
+
+功能:
+- 按需啟動的採樣分析器（後台線程採樣事件循環線程的調用棧）
+- 事件循環延遲統計
+- 慢回調報告（由循環延遲與同時段的採樣棧得出，不啟用 asyncio 調試模式）
+- 輸出 collapsed-stack 文件（可直接用 flamegraph.pl / speedscope 打開），並隨報告返回
+
+未運行時不安裝任何鉤子，零開銷。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    """棧幀標籤：限定名 (文件名)"""
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)})"
+
+
+class SamplingProfiler:
+    """採樣分析器類"""
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        slow_callback: float = 0.1,
+        max_seconds: float = 60.0,
+        output_dir: Optional[str] = None,
+        max_stacks: int = 200,
+    ):
+        """
+        初始化採樣分析器
+
+        Args:
+            interval: 採樣間隔（秒）
+            slow_callback: 慢回調閾值（秒）
+            max_seconds: 單次分析的最長時間（秒）
+            output_dir: collapsed-stack 文件目錄，默認系統臨時目錄
+            max_stacks: 報告中返回的 collapsed-stack 行數上限（文件中保留全部）
+        """
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.max_seconds = max_seconds
+        self.output_dir = output_dir or tempfile.gettempdir()
+        self.max_stacks = max_stacks
+        self.running = False
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict]) -> "SamplingProfiler":
+        """
+        根據配置段創建採樣分析器
+
+        Args:
+            section: config.yaml 中的 profiler 配置
+
+        Returns:
+            SamplingProfiler 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            interval=float(section.get("interval_ms", 5)) / 1000,
+            slow_callback=float(section.get("slow_callback_ms", 100)) / 1000,
+            max_seconds=float(section.get("max_seconds", 60)),
+            output_dir=section.get("output_dir") or None,
+            max_stacks=int(section.get("max_stacks", 200)),
+        )
+
+    async def run(self, seconds: float) -> Dict:
+        """
+        在當前事件循環上分析指定時長
+
+        Args:
+            seconds: 分析時長（秒），不超過 max_seconds
+
+        Returns:
+            分析報告（採樣數、熱點棧、collapsed-stack 行、循環延遲、慢回調、輸出文件路徑）
+
+        Raises:
+            RuntimeError: 已有分析在運行
+        """
+        if self.running:
+            raise RuntimeError("Profiler already running")
+
+        seconds = max(0.0, min(float(seconds), self.max_seconds))
+        stacks: Counter = Counter()
+        timeline: List[Tuple[float, str]] = []
+        lags: List[float] = []
+        stalls: List[Tuple[float, float]] = []
+        stop = threading.Event()
+
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), stacks, timeline, stop),
+            name="profiler-sampler",
+            daemon=True,
+        )
+
+        self.running = True
+        started = time.perf_counter()
+        try:
+            sampler.start()
+            await self._measure_lag(lags, stalls, started + seconds)
+        finally:
+            stop.set()
+            if sampler.is_alive():
+                sampler.join()
+            self.running = False
+
+        duration = time.perf_counter() - started
+        path = self._write_collapsed(stacks)
+        lags.sort()
+        ranked = stacks.most_common()
+        report = {
+            "duration_s": duration,
+            "samples": sum(stacks.values()),
+            "output": path,
+            "top_stacks": [{"stack": stack, "samples": count} for stack, count in ranked[:10]],
+            "collapsed": [f"{stack} {count}" for stack, count in ranked[: self.max_stacks]],
+            "collapsed_truncated": max(0, len(ranked) - self.max_stacks),
+            "loop_lag_ms": {
+                "p50": lags[len(lags) // 2] * 1000 if lags else 0.0,
+                "p99": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000 if lags else 0.0,
+                "max": lags[-1] * 1000 if lags else 0.0,
+            },
+            "slow_callbacks": self._slow_callbacks(stalls, timeline),
+        }
+        logger.info(
+            "採樣分析完成: %d 個樣本, 耗時 %.1f 秒, 輸出 %s",
+            report["samples"],
+            duration,
+            path,
+        )
+        return report
+
+    def _sample(
+        self,
+        thread_id: int,
+        stacks: Counter,
+        timeline: List[Tuple[float, str]],
+        stop: threading.Event,
+    ):
+        """後台線程：定期採樣事件循環線程的調用棧"""
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                stack = ";".join(reversed(labels))
+                stacks[stack] += 1
+                timeline.append((time.perf_counter(), stack))
+
+    async def _measure_lag(
+        self, lags: List[float], stalls: List[Tuple[float, float]], until: float
+    ):
+        """測量事件循環延遲：定時休眠的超出時間，超過慢回調閾值時記錄阻塞區間"""
+        while time.perf_counter() < until:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            resumed = time.perf_counter()
+            lag = max(0.0, resumed - expected)
+            lags.append(lag)
+            if lag >= self.slow_callback:
+                stalls.append((expected, resumed))
+
+    def _slow_callbacks(
+        self, stalls: List[Tuple[float, float]], timeline: List[Tuple[float, str]], limit: int = 100
+    ) -> List[Dict]:
+        """
+        為每個阻塞區間找出期間採樣最多的調用棧
+
+        Args:
+            stalls: 阻塞區間 (開始, 結束) 列表
+            timeline: 按時間排列的 (採樣時刻, 調用棧) 列表
+            limit: 最多返回的條數
+
+        Returns:
+            慢回調列表，每項包含阻塞時長與調用棧
+        """
+        records = []
+        for begin, end in stalls[:limit]:
+            window = Counter(stack for at, stack in timeline if begin <= at <= end)
+            records.append(
+                {
+                    "lag_ms": (end - begin) * 1000,
+                    "stack": window.most_common(1)[0][0] if window else "",
+                }
+            )
+        return records
+
+    def _write_collapsed(self, stacks: Counter) -> str:
+        """寫出 collapsed-stack 文件"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(
+            self.output_dir, f"omni-profile-{os.getpid()}-{time.time_ns() // 1_000_000}.txt"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,217 @@
+"""
+Crash recovery module
+
+功能:
+- 啟動時查找崩潰前遺留的進行中任務 (IDLE / DISPATCHING / EXECUTING)
+- 通過租約原子認領任務，多實例共享數據庫時不會重複處理
+- 按狀態策略重新調度或標記失敗
+- 崩潰前等待重試的任務按重試計劃的到期時間重新調度，清理遺留的重試計劃
+- 有界併發恢復，不阻塞服務啟動
+- 恢復前重新讀取任務，認領後已被取消或接管的任務不再處理
+- 報告恢復耗時與任務數
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Mapping
+from enum import Enum
+from typing import Any, Dict, List, Optional, Set
+
+from src.state_manager import TaskRecord, TaskState
+
+logger = logging.getLogger(__name__)
+
+
+class RecoveryAction(Enum):
+    """恢復動作枚舉"""
+
+    REDISPATCH = "redispatch"  # 重新路由並執行
+    FAIL = "fail"  # 標記為失敗
+
+
+class CrashRecovery:
+    """崩潰恢復類"""
+
+    # 默認策略：未到達執行器的任務（含排空時存檔的任務）可安全重跑；
+    # 執行中的任務可能有副作用，標記失敗
+    DEFAULT_POLICY = {
+        TaskState.IDLE: RecoveryAction.REDISPATCH,
+        TaskState.DISPATCHING: RecoveryAction.REDISPATCH,
+        TaskState.EXECUTING: RecoveryAction.FAIL,
+    }
+
+    def __init__(
+        self,
+        orchestrator: Any,
+        policy: Optional[Dict[TaskState, RecoveryAction]] = None,
+        concurrency: int = 4,
+    ):
+        """
+        初始化崩潰恢復器
+
+        Args:
+            orchestrator: Orchestrator 實例
+            policy: 狀態 → 恢復動作
+            concurrency: 同時重新調度的任務上限
+        """
+        self.orchestrator = orchestrator
+        self.policy = dict(self.DEFAULT_POLICY)
+        if policy:
+            self.policy.update(policy)
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 已認領、尚未交給協調器處理的任務（需要心跳續約）
+        self.claimed: Set[str] = set()
+
+    @classmethod
+    def from_config(cls, orchestrator: Any, section: Optional[Dict]) -> "CrashRecovery":
+        """
+        根據配置段創建崩潰恢復器
+
+        Args:
+            orchestrator: Orchestrator 實例
+            section: config.yaml 中的 recovery 配置
+
+        Returns:
+            CrashRecovery 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        policy = {
+            TaskState(state): RecoveryAction(action)
+            for state, action in (section.get("policy") or {}).items()
+        }
+        return cls(
+            orchestrator,
+            policy=policy,
+            concurrency=int(section.get("concurrency", 4)),
+        )
+
+    def claim(self, limit: Optional[int] = None, include_own: bool = False) -> List[TaskRecord]:
+        """
+        認領可恢復的任務（策略中的狀態、無主或租約已過期）
+
+        Args:
+            limit: 最多認領的任務數，默認不限
+            include_own: 同時認領本實例 ID 遺留的任務（僅啟動時）
+
+        Returns:
+            認領到的任務列表（已在本進程處理中的任務除外）
+        """
+        tasks = [
+            task
+            for task in self.orchestrator.state_manager.claim_tasks(
+                list(self.policy), limit=limit, include_own=include_own
+            )
+            if not self.orchestrator.is_task_active(task.task_id)
+        ]
+        self.claimed.update(task.task_id for task in tasks)
+        return tasks
+
+    def _resumable(self, task_id: str) -> bool:
+        """
+        認領後任務是否仍可恢復（等待期間可能已被取消或被其他實例接管）
+
+        Args:
+            task_id: 任務ID
+
+        Returns:
+            任務仍處於策略中的狀態且租約屬於本實例時為 True
+        """
+        state_manager = self.orchestrator.state_manager
+        task = state_manager.get_task(task_id)
+        return (
+            task is not None
+            and task.state in self.policy
+            and task.owner == state_manager.instance_id
+        )
+
+    async def recover(self, tasks: List[TaskRecord]) -> Dict[str, int]:
+        """
+        按策略處理已認領的任務（有界併發）
+
+        Args:
+            tasks: claim() 返回的任務
+
+        Returns:
+            各動作的任務數（retried 為按重試計劃重新調度的任務數，
+            skipped 為認領後已被取消或接管、不再處理的任務數）
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        state_manager = self.orchestrator.state_manager
+        counts = {action.value: 0 for action in RecoveryAction}
+        counts["retried"] = 0
+        counts["skipped"] = 0
+        retries = {retry["task_id"]: retry for retry in state_manager.get_retry_schedule()}
+
+        async def recover_one(task: TaskRecord):
+            retry = retries.get(task.task_id)
+            # 等待重試的任務上一次嘗試已結束，可安全重跑（不受狀態策略限制）
+            action = RecoveryAction.REDISPATCH if retry else self.policy[task.state]
+            try:
+                if retry is not None:
+                    await asyncio.sleep(max(0.0, retry["due_at"] - time.time()))
+                    state_manager.delete_retry(task.task_id)
+
+                if action == RecoveryAction.FAIL:
+                    if not self._resumable(task.task_id):
+                        counts["skipped"] += 1
+                        return
+                    counts[action.value] += 1
+                    state_manager.update_state(task.task_id, TaskState.FAILED)
+                    return
+
+                async with self._semaphore:
+                    # 等待重試或執行槽期間任務可能已被取消：重新讀取，不覆蓋終態
+                    if not self._resumable(task.task_id):
+                        counts["skipped"] += 1
+                        return
+                    counts[action.value] += 1
+                    if retry is not None:
+                        counts["retried"] += 1
+                    self.claimed.discard(task.task_id)
+                    await self.orchestrator.resume_task(
+                        task.task_id,
+                        task.description,
+                        deadline=task.deadline,
+                        session_id=task.session_id,
+                    )
+            finally:
+                self.claimed.discard(task.task_id)
+
+        await asyncio.gather(*(recover_one(task) for task in tasks))
+        return counts
+
+    async def run(self) -> Dict:
+        """
+        執行啟動時的恢復
+
+        Returns:
+            恢復報告（任務數、各動作數量、清理的重試計劃數、耗時）
+        """
+        started = time.perf_counter()
+        stale_retries = self.orchestrator.state_manager.purge_retries()
+        orphans = self.claim(include_own=True)
+        counts = await self.recover(orphans)
+
+        report = {
+            "recovered": len(orphans),
+            **counts,
+            "stale_retries": stale_retries,
+            "duration_ms": (time.perf_counter() - started) * 1000,
+        }
+        logger.info(
+            "斷點恢復完成: %d 個任務 (重新調度 %d, 其中待重試 %d, 標記失敗 %d, 跳過 %d), "
+            "清理重試計劃 %d, 耗時 %.1f ms",
+            report["recovered"],
+            counts[RecoveryAction.REDISPATCH.value],
+            counts["retried"],
+            counts[RecoveryAction.FAIL.value],
+            counts["skipped"],
+            stale_retries,
+            report["duration_ms"],
+        )
+        return report
@@ -0,0 +1,272 @@
+"""
+Response cache module
+
+功能:
+- 直連 API 響應的精確匹配緩存，鍵為 (model, messages, params) 的哈希
+- 內存 LRU + SQLite 持久化（重啟後仍有效）
+- 按 TTL、條目數與總字節數淘汰
+- 命中率與節省的 token 統計（按條目命中次數持久化）
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Tuple
+
+
+def response_key(model: str, messages: Any, params: Optional[Dict] = None) -> str:
+    """
+    計算直連 API 請求的緩存鍵
+
+    Args:
+        model: 模型名稱
+        messages: 消息列表
+        params: 其他請求參數（max_tokens、temperature 等）
+
+    Returns:
+        SHA-256 十六進制字符串
+    """
+    payload = json.dumps(
+        [model, messages, params or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage_tokens(response: Any) -> Tuple[int, int]:
+    """響應中的輸入/輸出 token 數"""
+    usage = response.get("usage") if isinstance(response, Mapping) else None
+    if not isinstance(usage, Mapping):
+        return 0, 0
+    return int(usage.get("input_tokens", 0) or 0), int(usage.get("output_tokens", 0) or 0)
+
+
+class ResponseCache:
+    """直連 API 響應緩存類"""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        enabled: bool = True,
+        max_entries: int = 1000,
+        max_bytes: int = 50 * 1024 * 1024,
+        memory_entries: int = 128,
+        ttl_seconds: float = 3600.0,
+    ):
+        """
+        初始化響應緩存
+
+        Args:
+            conn: SQLite 連接（通常與 StateManager 共用）
+            enabled: 是否啟用緩存
+            max_entries: 磁盤最大條目數
+            max_bytes: 磁盤緩存總字節上限
+            memory_entries: 內存中保留的熱條目數
+            ttl_seconds: 緩存有效期（秒）
+        """
+        self.conn = conn
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = max(0, memory_entries)
+        self.ttl_seconds = ttl_seconds
+        # 熱條目：鍵 → (創建時間, 響應)
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # 尚未寫入磁盤的命中：鍵 → (次數, 最近使用時間)
+        self._pending_hits: Dict[str, Tuple[int, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            self._init_db()
+
+    @classmethod
+    def from_config(cls, conn: sqlite3.Connection, section: Optional[Dict]) -> "ResponseCache":
+        """
+        根據配置段創建響應緩存
+
+        Args:
+            conn: SQLite 連接
+            section: config.yaml 中的 response_cache 配置
+
+        Returns:
+            ResponseCache 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            conn,
+            enabled=bool(section.get("enabled", True)),
+            max_entries=int(section.get("max_entries", 1000)),
+            max_bytes=int(section.get("max_bytes", 50 * 1024 * 1024)),
+            memory_entries=int(section.get("memory_entries", 128)),
+            ttl_seconds=float(section.get("ttl_seconds", 3600)),
+        )
+
+    def _init_db(self):
+        """初始化緩存表"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_last_used "
+            "ON response_cache (last_used_at)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        讀取緩存響應
+
+        Args:
+            key: response_key() 計算的鍵
+
+        Returns:
+            響應（帶 "cached": True 標記）或 None
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and now - entry[0] <= self.ttl_seconds:
+            self._memory.move_to_end(key)
+            response = entry[1]
+        else:
+            self._memory.pop(key, None)
+            row = self.conn.execute(
+                "SELECT response, created_at FROM response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            response = json.loads(row[0])
+            self._remember(key, row[1], response)
+
+        self.hits += 1
+        count, _ = self._pending_hits.get(key, (0, now))
+        self._pending_hits[key] = (count + 1, now)
+        return {**response, "cached": True} if isinstance(response, Mapping) else response
+
+    def put(self, key: str, response: Any):
+        """
+        寫入響應並按 TTL / 條目數 / 總字節數淘汰
+
+        Args:
+            key: response_key() 計算的鍵
+            response: API 響應（需可 JSON 編碼）
+        """
+        if not self.enabled or response is None:
+            return
+
+        now = time.time()
+        encoded = json.dumps(response, ensure_ascii=False, separators=(",", ":"))
+        input_tokens, output_tokens = _usage_tokens(response)
+        self._remember(key, now, response)
+        self._write_hits()
+
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO response_cache "
+            "(cache_key, response, size, input_tokens, output_tokens, hits, created_at, "
+            "last_used_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+            (key, encoded, len(encoded.encode("utf-8")), input_tokens, output_tokens, now, now),
+        )
+        cursor.execute(
+            "DELETE FROM response_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        # 按最近使用排序，超出條目數或累計字節數上限的條目被淘汰
+        cursor.execute(
+            """
+            DELETE FROM response_cache WHERE cache_key IN (
+                SELECT cache_key FROM (
+                    SELECT cache_key,
+                           ROW_NUMBER() OVER (ORDER BY last_used_at DESC) AS position,
+                           SUM(size) OVER (
+                               ORDER BY last_used_at DESC ROWS UNBOUNDED PRECEDING
+                           ) AS running_size
+                    FROM response_cache
+                )
+                WHERE position > ? OR running_size > ?
+            )
+            RETURNING cache_key
+        """,
+            (self.max_entries, self.max_bytes),
+        )
+        for (evicted,) in cursor.fetchall():
+            self._memory.pop(evicted, None)
+        self.conn.commit()
+
+    def flush(self):
+        """寫入緩衝的命中次數與使用時間"""
+        if self._pending_hits:
+            self._write_hits()
+            self.conn.commit()
+
+    def get_stats(self) -> Dict:
+        """
+        緩存統計
+
+        Returns:
+            本進程命中率，以及持久化的條目數、字節數與累計節省的 token
+        """
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+        if not self.enabled:
+            return stats
+
+        self.flush()
+        row = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), "
+            "COALESCE(SUM(hits * input_tokens), 0), COALESCE(SUM(hits * output_tokens), 0) "
+            "FROM response_cache"
+        ).fetchone()
+        stats.update(
+            entries=row[0],
+            bytes=row[1],
+            saved_input_tokens=row[2],
+            saved_output_tokens=row[3],
+        )
+        return stats
+
+    def _write_hits(self):
+        """在當前事務中寫入緩衝的命中（由調用方提交）"""
+        if not self._pending_hits:
+            return
+        self.conn.executemany(
+            "UPDATE response_cache SET hits = hits + ?, last_used_at = MAX(last_used_at, ?) "
+            "WHERE cache_key = ?",
+            [(count, used_at, key) for key, (count, used_at) in self._pending_hits.items()],
+        )
+        self._pending_hits = {}
+
+    def _remember(self, key: str, created_at: float, response: Any):
+        """放入內存 LRU"""
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,249 @@
+"""
+Result cache module
+
+功能:
+- 重複任務的單飛合併 (single-flight)：相同請求只執行一次
+- 已完成結果的 SQLite 緩存（可選，按數量與 TTL 淘汰）
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Mapping
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def request_key(description: str, route: Dict, context: Optional[List[Dict]] = None) -> str:
+    """
+    計算請求的規範化鍵
+
+    描述中的空白會被合併，相同執行器與模型的相同描述得到相同的鍵。
+    帶有對話上下文的請求只與上下文相同的請求共享鍵。
+
+    Args:
+        description: 任務描述
+        route: 路由結果
+        context: 發送給執行器的對話上下文
+
+    Returns:
+        SHA-256 十六進制字符串
+    """
+    normalized = " ".join(description.split())
+    parts = [normalized, str(route.get("executor")), str(route.get("model"))]
+    if context:
+        parts.append(context)
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode_default(value: Any) -> Any:
+    """JSON 編碼兜底：支持 pydantic 模型（MCP 內容塊）"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class _Call:
+    """進行中的共享執行"""
+
+    def __init__(self, owner: str, task: asyncio.Task):
+        self.owner = owner
+        self.task = task
+        # 等待中的調用方任務ID（按加入順序）
+        self.waiters: List[str] = []
+
+
+class SingleFlight:
+    """單飛合併類：相同鍵的併發調用共享一次執行"""
+
+    def __init__(self):
+        """初始化單飛合併器"""
+        self._calls: Dict[str, _Call] = {}
+
+    async def do(
+        self, key: str, owner: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        執行或加入相同鍵的執行
+
+        共享執行在獨立的 asyncio.Task 中運行，單個等待者被取消不會影響其他等待者；
+        所有等待者都離開後才取消共享執行。結果所有者在結果返回前離開（取消或超時）時，
+        由最早加入的剩餘等待者接替，負責保存結果。
+
+        Args:
+            key: 請求鍵
+            owner: 調用方任務ID
+            fn: 實際執行函數
+
+        Returns:
+            (結果, 共享來源任務ID)；自己是結果所有者時來源為 None
+        """
+        call = self._calls.get(key)
+
+        if call is None:
+            call = _Call(owner, asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters.append(owner)
+        try:
+            result = await asyncio.shield(call.task)
+        except BaseException:
+            call.waiters.remove(owner)
+            if call.owner == owner and call.waiters:
+                call.owner = call.waiters[0]
+            raise
+        else:
+            call.waiters.remove(owner)
+        finally:
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+        return result, (None if call.owner == owner else call.owner)
+
+    def _forget(self, key: str, call: _Call):
+        """共享執行結束後移除記錄"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        """進行中的共享執行數"""
+        return len(self._calls)
+
+
+class ResultCache:
+    """結果緩存類（SQLite 持久化）"""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        enabled: bool = False,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600.0,
+    ):
+        """
+        初始化結果緩存
+
+        Args:
+            conn: SQLite 連接（通常與 StateManager 共用）
+            enabled: 是否啟用緩存
+            max_entries: 最大緩存條目數
+            ttl_seconds: 緩存有效期（秒）
+        """
+        self.conn = conn
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        if self.enabled:
+            self._init_db()
+
+    @classmethod
+    def from_config(cls, conn: sqlite3.Connection, section: Optional[Dict]) -> "ResultCache":
+        """
+        根據配置段創建結果緩存
+
+        Args:
+            conn: SQLite 連接
+            section: config.yaml 中的 result_cache 配置
+
+        Returns:
+            ResultCache 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            conn,
+            enabled=bool(section.get("enabled", False)),
+            max_entries=int(section.get("max_entries", 1000)),
+            ttl_seconds=float(section.get("ttl_seconds", 3600)),
+        )
+
+    def _init_db(self):
+        """初始化緩存表"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS result_cache (
+                cache_key TEXT PRIMARY KEY,
+                task_id TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_result_cache_last_used "
+            "ON result_cache (last_used_at)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Any]]:
+        """
+        讀取緩存結果
+
+        Args:
+            key: 請求鍵
+
+        Returns:
+            (原始任務ID, 結果) 或 None
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT task_id, result, created_at FROM result_cache WHERE cache_key = ?",
+            (key,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        if now - row[2] > self.ttl_seconds:
+            cursor.execute("DELETE FROM result_cache WHERE cache_key = ?", (key,))
+            self.conn.commit()
+            return None
+
+        cursor.execute(
+            "UPDATE result_cache SET last_used_at = ? WHERE cache_key = ?", (now, key)
+        )
+        self.conn.commit()
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, task_id: str, result: Any):
+        """
+        寫入緩存結果並按 TTL / 數量淘汰
+
+        Args:
+            key: 請求鍵
+            task_id: 產生結果的任務ID
+            result: 任務結果（需可 JSON 編碼）
+        """
+        if not self.enabled or result is None:
+            return
+
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO result_cache "
+            "(cache_key, task_id, result, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+            (key, task_id, json.dumps(result, default=encode_default), now, now),
+        )
+        cursor.execute(
+            "DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        cursor.execute(
+            """
+            DELETE FROM result_cache WHERE cache_key IN (
+                SELECT cache_key FROM result_cache
+                ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+        """,
+            (self.max_entries,),
+        )
+        self.conn.commit()
@@ -0,0 +1,226 @@
+"""
+Result store module
+
+功能:
+- 持久化任務結果（緊湊 JSON，大結果按塊 zlib 壓縮）
+- 結果與 tasks 表分開存儲，get_task 不讀取大字段
+- 按塊讀取，客戶端可分塊拉取多 MB 的執行器輸出
+"""
+
+import json
+import sqlite3
+import time
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+from src.result_cache import encode_default
+
+ENCODING_PLAIN = "json"
+ENCODING_ZLIB = "json+zlib"
+
+
+class ResultStore:
+    """任務結果存儲類（SQLite 持久化）"""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        chunk_size: int = 65536,
+        compress_threshold: int = 1024,
+    ):
+        """
+        初始化結果存儲
+
+        Args:
+            conn: SQLite 連接（通常與 StateManager 共用）
+            chunk_size: 每塊的字符數
+            compress_threshold: 序列化後超過該字符數的結果按塊壓縮
+        """
+        self.conn = conn
+        self.chunk_size = max(1, chunk_size)
+        self.compress_threshold = compress_threshold
+        self._init_db()
+
+    @classmethod
+    def from_config(cls, conn: sqlite3.Connection, section: Optional[Dict]) -> "ResultStore":
+        """
+        根據配置段創建結果存儲
+
+        Args:
+            conn: SQLite 連接
+            section: config.yaml 中的 result_store 配置
+
+        Returns:
+            ResultStore 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            conn,
+            chunk_size=int(section.get("chunk_size", 65536)),
+            compress_threshold=int(section.get("compress_threshold", 1024)),
+        )
+
+    def _init_db(self):
+        """初始化結果元數據表與分塊表"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_results (
+                task_id TEXT PRIMARY KEY,
+                encoding TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                chunks INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_result_chunks (
+                task_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (task_id, seq)
+            )
+        """
+        )
+        self.conn.commit()
+
+    def put(self, task_id: str, content: Any) -> Dict:
+        """
+        保存任務結果（覆蓋已有結果）
+
+        Args:
+            task_id: 任務ID
+            content: 結果內容（可 JSON 編碼，支持 MCP 內容塊）
+
+        Returns:
+            結果元數據
+        """
+        text = json.dumps(
+            content, ensure_ascii=False, separators=(",", ":"), default=encode_default
+        )
+        encoding = ENCODING_ZLIB if len(text) > self.compress_threshold else ENCODING_PLAIN
+
+        chunks = []
+        for seq, start in enumerate(range(0, max(len(text), 1), self.chunk_size)):
+            data = text[start : start + self.chunk_size].encode("utf-8")
+            if encoding == ENCODING_ZLIB:
+                data = zlib.compress(data)
+            chunks.append((task_id, seq, data))
+
+        info = {
+            "encoding": encoding,
+            "size": len(text),
+            "stored_size": sum(len(chunk[2]) for chunk in chunks),
+            "chunks": len(chunks),
+        }
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM task_result_chunks WHERE task_id = ?", (task_id,))
+        cursor.executemany(
+            "INSERT INTO task_result_chunks (task_id, seq, data) VALUES (?, ?, ?)", chunks
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO task_results "
+            "(task_id, encoding, size, stored_size, chunks, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                task_id,
+                info["encoding"],
+                info["size"],
+                info["stored_size"],
+                info["chunks"],
+                time.time(),
+            ),
+        )
+        self.conn.commit()
+        return info
+
+    def get_info(self, task_id: str) -> Optional[Dict]:
+        """
+        讀取結果元數據（不讀取結果內容）
+
+        Args:
+            task_id: 任務ID
+
+        Returns:
+            {encoding, size, stored_size, chunks} 或 None
+        """
+        row = self.conn.execute(
+            "SELECT encoding, size, stored_size, chunks FROM task_results WHERE task_id = ?",
+            (task_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"encoding": row[0], "size": row[1], "stored_size": row[2], "chunks": row[3]}
+
+    def get_chunk(self, task_id: str, seq: int) -> Optional[str]:
+        """
+        讀取單個結果塊
+
+        Args:
+            task_id: 任務ID
+            seq: 塊序號（從 0 開始）
+
+        Returns:
+            序列化結果的一段文本，不存在時返回 None
+        """
+        row = self.conn.execute(
+            "SELECT r.encoding, c.data FROM task_result_chunks c "
+            "JOIN task_results r ON r.task_id = c.task_id "
+            "WHERE c.task_id = ? AND c.seq = ?",
+            (task_id, seq),
+        ).fetchone()
+        if row is None:
+            return None
+        data = zlib.decompress(row[1]) if row[0] == ENCODING_ZLIB else row[1]
+        return data.decode("utf-8")
+
+    def iter_chunks(self, task_id: str) -> Iterator[str]:
+        """
+        逐塊讀取結果（每次只在內存中保留一塊）
+
+        Args:
+            task_id: 任務ID
+
+        Yields:
+            序列化結果的文本片段
+        """
+        info = self.get_info(task_id)
+        if info is None:
+            return
+        for seq in range(info["chunks"]):
+            chunk = self.get_chunk(task_id, seq)
+            if chunk is None:
+                return
+            yield chunk
+
+    def get(self, task_id: str) -> Any:
+        """
+        讀取完整結果
+
+        Args:
+            task_id: 任務ID
+
+        Returns:
+            反序列化的結果內容，不存在時返回 None
+        """
+        if self.get_info(task_id) is None:
+            return None
+        return json.loads("".join(self.iter_chunks(task_id)))
+
+    def delete(self, task_id: str):
+        """
+        刪除任務結果
+
+        Args:
+            task_id: 任務ID
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM task_result_chunks WHERE task_id = ?", (task_id,))
+        cursor.execute("DELETE FROM task_results WHERE task_id = ?", (task_id,))
+        self.conn.commit()
@@ -0,0 +1,235 @@
+"""
+Retry scheduler module
+
+功能:
+- 集中式延遲重試隊列（最小堆 + 單個定時器）
+- 全抖動 (full jitter) 指數退避
+- 全局重試預算（按重試比例限制，防止重試放大故障）
+- 重試計劃持久化到 StateManager（崩潰後由 CrashRecovery 按到期時間重新調度）
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+
+class RetryBudget:
+    """重試預算類：滑動窗口內重試數不超過請求數 × 比例（外加最低配額）"""
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_retries_per_second: float = 1.0,
+        window_seconds: float = 10.0,
+    ):
+        """
+        初始化重試預算
+
+        Args:
+            ratio: 允許的重試比例（重試數 / 請求數）
+            min_retries_per_second: 低流量時的最低重試配額
+            window_seconds: 統計窗口（秒）
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window_seconds = window_seconds
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+
+    def _prune(self, now: float):
+        """移除窗口外的記錄"""
+        cutoff = now - self.window_seconds
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+
+    def record_request(self):
+        """記錄一次原始請求"""
+        self._requests.append(time.monotonic())
+
+    def try_acquire(self) -> bool:
+        """
+        嘗試消耗一次重試配額
+
+        Returns:
+            是否允許重試
+        """
+        now = time.monotonic()
+        self._prune(now)
+
+        allowed = (
+            self.ratio * len(self._requests)
+            + self.min_retries_per_second * self.window_seconds
+        )
+        if len(self._retries) >= allowed:
+            return False
+
+        self._retries.append(now)
+        return True
+
+    def get_stats(self) -> Dict:
+        """
+        獲取預算使用情況
+
+        Returns:
+            窗口內請求數與重試數
+        """
+        self._prune(time.monotonic())
+        return {"requests": len(self._requests), "retries": len(self._retries)}
+
+
+class RetryScheduler:
+    """延遲重試調度類"""
+
+    def __init__(
+        self,
+        state_manager: Any = None,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        初始化重試調度器
+
+        Args:
+            state_manager: StateManager 實例（用於持久化重試計劃）
+            base_delay: 基礎延遲（秒）
+            max_delay: 最大延遲（秒）
+            budget: 重試預算
+        """
+        self.state_manager = state_manager
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_due: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, state_manager: Any, section: Optional[Dict]) -> "RetryScheduler":
+        """
+        根據配置段創建重試調度器
+
+        Args:
+            state_manager: StateManager 實例
+            section: config.yaml 中的 retry 配置
+
+        Returns:
+            RetryScheduler 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            state_manager,
+            base_delay=float(section.get("base_delay", 1.0)),
+            max_delay=float(section.get("max_delay", 30.0)),
+            budget=RetryBudget(
+                ratio=float(section.get("budget_ratio", 0.1)),
+                min_retries_per_second=float(section.get("min_retries_per_second", 1.0)),
+                window_seconds=float(section.get("budget_window_seconds", 10.0)),
+            ),
+        )
+
+    def backoff(self, attempt: int, base_delay: Optional[float] = None) -> float:
+        """
+        計算全抖動退避延遲: uniform(0, min(max_delay, base × 2^attempt))
+
+        Args:
+            attempt: 已失敗的次數（從 0 開始）
+            base_delay: 覆蓋默認基礎延遲
+
+        Returns:
+            延遲（秒）
+        """
+        base = self.base_delay if base_delay is None else base_delay
+        return random.uniform(0, min(self.max_delay, base * (2**attempt)))
+
+    async def wait(self, task_id: str, attempt: int, delay: float, error: str = ""):
+        """
+        登記重試計劃並等待到期
+
+        Args:
+            task_id: 任務ID
+            attempt: 下一次嘗試序號
+            delay: 延遲（秒）
+            error: 上一次失敗原因
+        """
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        future = loop.create_future()
+
+        if self.state_manager is not None:
+            self.state_manager.save_retry(task_id, attempt, time.time() + delay, error)
+
+        heapq.heappush(self._heap, (due, next(self._seq), future))
+        self._arm(loop)
+
+        try:
+            await future
+        finally:
+            if self.state_manager is not None:
+                self.state_manager.delete_retry(task_id)
+
+    def _arm(self, loop: asyncio.AbstractEventLoop):
+        """按最早到期時間設置唯一的定時器"""
+        while self._heap and self._heap[0][2].done():
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            return
+
+        due = self._heap[0][0]
+        if self._timer is not None and self._timer_due is not None and self._timer_due <= due:
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(due, self._fire, loop)
+        self._timer_due = due
+
+    def _fire(self, loop: asyncio.AbstractEventLoop):
+        """喚醒所有已到期的重試"""
+        self._timer = None
+        self._timer_due = None
+        now = loop.time()
+
+        while self._heap and self._heap[0][0] <= now:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+
+        self._arm(loop)
+
+    def pending(self) -> int:
+        """等待中的重試數"""
+        return sum(1 for entry in self._heap if not entry[2].done())
+
+    def close(self):
+        """取消定時器和所有等待中的重試"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_due = None
+
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.cancel()
+
+    def get_stats(self) -> Dict:
+        """
+        獲取重試調度指標
+
+        Returns:
+            等待中的重試數與預算使用情況
+        """
+        return {"pending": self.pending(), "budget": self.budget.get_stats()}
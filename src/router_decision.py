@@ -7,7 +7,32 @@ Router decision module
 - 處理降級模式下的路由
 """
 
-from typing import Dict, Optional, Any
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Optional, Union
+
+from src.state_manager import TaskRecord
+
+# 路由輸入：任務記錄（協調器使用），或字典（兼容直接調用）
+Task = Union[TaskRecord, Mapping]
+
+
+def _task_field(task: Task, name: str, default: Any = None) -> Any:
+    """
+    讀取任務字段
+
+    Args:
+        task: 任務記錄或字典
+        name: 字段名
+        default: 缺省值
+
+    Returns:
+        字段值
+    """
+    if isinstance(task, TaskRecord):
+        value = getattr(task, name, None)
+        return default if value is None else value
+    return task.get(name, default)
 
 
 class RouterDecision:
@@ -21,6 +46,9 @@ class RouterDecision:
     # 任務複雜度閾值
     COMPLEXITY_THRESHOLD = 50
 
+    # 截止時間剩餘少於該值（秒）時改用輕量級模型
+    TIGHT_DEADLINE_SECONDS = 30
+
     def __init__(
         self,
         mcp_client: Any,
@@ -38,18 +66,38 @@ class RouterDecision:
         self.mcp_client = mcp_client
         self.lite_llm_router = lite_llm_router
         self.backup_api_key = backup_api_key
+        self.complexity_threshold = self.COMPLEXITY_THRESHOLD
+        # 成本預算接近上限時改用的免費渠道模型（未配置時不切換）
+        self.free_model: Optional[str] = None
+        # 返回預算是否接近上限的回調（由協調器接入用量賬本）
+        self.budget_guard: Optional[Callable[[], bool]] = None
 
-    def select_executor(self, task: Dict) -> str:
+    def apply_config(self, section: Mapping, backup_api_key: Optional[str] = None):
+        """
+        應用新配置（熱重載）
+
+        Args:
+            section: config.yaml 中的 router 配置
+            backup_api_key: 備用 API Key
+        """
+        self.complexity_threshold = section.get(
+            "complexity_threshold", self.COMPLEXITY_THRESHOLD
+        )
+        self.free_model = section.get("free_model") or None
+        if backup_api_key:
+            self.backup_api_key = backup_api_key
+
+    def select_executor(self, task: Task) -> str:
         """
         選擇執行器
 
         Args:
-            task: 任務字典
+            task: 任務記錄或字典
 
         Returns:
             執行器名稱
         """
-        task_type = task.get("type", "general")
+        task_type = _task_field(task, "type", "general")
 
         # 編程任務 → Claude Code
         if task_type == "programming" or self._is_programming_task(task):
@@ -62,7 +110,7 @@ class RouterDecision:
         # 通用任務 → OpenClaw
         return self.EXECUTOR_OPENCLAW
 
-    def _is_programming_task(self, task: Dict) -> bool:
+    def _is_programming_task(self, task: Task) -> bool:
         """判斷是否為編程任務"""
         programming_keywords = [
             "implement",
@@ -75,15 +123,15 @@ class RouterDecision:
             "bug",
             "fix",
         ]
-        description = task.get("description", "").lower()
+        description = _task_field(task, "description", "").lower()
         return any(keyword in description for keyword in programming_keywords)
 
-    def select_model(self, task: Dict, mode: str = "normal") -> Optional[Dict]:
+    def select_model(self, task: Task, mode: str = "normal") -> Optional[Dict]:
         """
         選擇模型
 
         Args:
-            task: 任務字典
+            task: 任務記錄或字典
             mode: 運行模式 (normal, degraded, brainstem)
 
         Returns:
@@ -105,19 +153,19 @@ class RouterDecision:
         # 正常模式：LiteLLM 路由
         return self.lite_llm_router.route(task)
 
-    def calculate_complexity(self, task: Dict) -> int:
+    def calculate_complexity(self, task: Task) -> int:
         """
         計算任務複雜度
 
         Args:
-            task: 任務字典
+            task: 任務記錄或字典
 
         Returns:
             複雜度分數 (0-100)
         """
         score = 0
-        description = task.get("description", "")
-        history = task.get("conversation_history", [])
+        description = _task_field(task, "description", "")
+        history = _task_field(task, "conversation_history", [])
 
         # 消息長度
         if len(description) > 100:
@@ -152,12 +200,12 @@ class RouterDecision:
 
         return max(0, min(100, score + 50))  # 標準化到 0-100
 
-    def route_task(self, task: Dict) -> Dict:
+    def route_task(self, task: Task) -> Dict:
         """
         完整路由決策
 
         Args:
-            task: 任務字典
+            task: 任務記錄或字典
 
         Returns:
             路由配置
@@ -165,14 +213,31 @@ class RouterDecision:
         complexity = self.calculate_complexity(task)
         executor = self.select_executor(task)
 
-        # 簡單任務使用輕量級模型
-        if complexity < self.COMPLEXITY_THRESHOLD:
+        deadline = _task_field(task, "deadline")
+        remaining = deadline - time.time() if deadline is not None else None
+
+        # 簡單任務或截止時間緊迫時使用輕量級模型
+        if complexity < self.complexity_threshold or (
+            remaining is not None and remaining < self.TIGHT_DEADLINE_SECONDS
+        ):
             model = self.lite_llm_router.get_lightweight_model()
         else:
             model = self.lite_llm_router.get_model()
 
-        return {
+        # 成本預算接近上限時引導到免費渠道
+        budget_limited = bool(
+            self.free_model and self.budget_guard is not None and self.budget_guard()
+        )
+        if budget_limited:
+            model = self.free_model
+
+        route = {
             "executor": executor,
             "model": model,
             "complexity": complexity,
         }
+        if budget_limited:
+            route["budget_limited"] = True
+        if remaining is not None:
+            route["remaining_seconds"] = remaining
+        return route
@@ -0,0 +1,275 @@
+"""
+Task scheduler module
+
+功能:
+- 任務優先級分類 (interactive / batch / 24/7)
+- 加權公平排隊 (WFQ) + 老化機制防止飢餓
+- 可選最短預期作業優先 (SJF，基於複雜度分數)
+- 各類別排隊等待指標
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Dict, List, Optional
+
+from src.router_decision import RouterDecision
+
+
+class PriorityClass(Enum):
+    """任務優先級類別枚舉"""
+
+    INTERACTIVE = "interactive"  # 交互式任務：用戶正在等待
+    BATCH = "batch"  # 批處理任務：可延後
+    ALWAYS_ON = "24/7"  # 24/7 任務：Moltworker 長駐任務
+
+
+class TaskScheduler:
+    """任務調度器類"""
+
+    # 各類別默認權重（越大分到的執行槽越多）
+    DEFAULT_WEIGHTS = {
+        PriorityClass.INTERACTIVE: 8.0,
+        PriorityClass.BATCH: 2.0,
+        PriorityClass.ALWAYS_ON: 1.0,
+    }
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        weights: Optional[Dict[PriorityClass, float]] = None,
+        aging_rate: float = 0.5,
+        shortest_job_first: bool = False,
+        sjf_seconds_per_point: float = 0.05,
+    ):
+        """
+        初始化任務調度器
+
+        Args:
+            max_concurrency: 同時執行的任務上限
+            weights: 各類別權重
+            aging_rate: 老化速率（每等待一秒抵扣的虛擬時間）
+            shortest_job_first: 類別內是否按複雜度優先調度短任務
+            sjf_seconds_per_point: SJF 模式下每個複雜度分數折算的排隊秒數
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        if weights:
+            self.weights.update(weights)
+        self.aging_rate = aging_rate
+        self.shortest_job_first = shortest_job_first
+        self.sjf_seconds_per_point = sjf_seconds_per_point
+
+        self._queues: Dict[PriorityClass, List] = {cls: [] for cls in PriorityClass}
+        self._virtual_finish: Dict[PriorityClass, float] = {
+            cls: 0.0 for cls in PriorityClass
+        }
+        self._virtual_clock = 0.0
+        self._running = 0
+        self._seq = itertools.count()
+        self._stats: Dict[PriorityClass, Dict] = {
+            cls: {"dispatched": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for cls in PriorityClass
+        }
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict]) -> "TaskScheduler":
+        """
+        根據配置段創建調度器
+
+        Args:
+            section: config.yaml 中的 scheduler 配置
+
+        Returns:
+            TaskScheduler 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        weights = {
+            PriorityClass(name): float(weight)
+            for name, weight in (section.get("weights") or {}).items()
+        }
+        return cls(
+            max_concurrency=int(section.get("max_concurrency", 4)),
+            weights=weights,
+            aging_rate=float(section.get("aging_rate", 0.5)),
+            shortest_job_first=bool(section.get("shortest_job_first", False)),
+            sjf_seconds_per_point=float(section.get("sjf_seconds_per_point", 0.05)),
+        )
+
+    def classify(self, route: Dict, priority: Optional[str] = None) -> PriorityClass:
+        """
+        根據路由結果和客戶端優先級確定任務類別
+
+        Args:
+            route: RouterDecision.route_task 的結果
+            priority: 客戶端指定的優先級（可選）
+
+        Returns:
+            優先級類別
+
+        Raises:
+            ValueError: 優先級無效
+        """
+        if priority:
+            return PriorityClass(priority)
+
+        if route.get("executor") == RouterDecision.EXECUTOR_MOLTWORKER:
+            return PriorityClass.ALWAYS_ON
+
+        return PriorityClass.INTERACTIVE
+
+    async def acquire(self, priority_class: PriorityClass, complexity: float = 0) -> float:
+        """
+        申請執行槽，必要時排隊等待
+
+        Args:
+            priority_class: 任務類別
+            complexity: 任務複雜度分數 (0-100)
+
+        Returns:
+            排隊等待時間（秒）
+        """
+        enqueued_at = time.monotonic()
+
+        if self._running < self.max_concurrency and not self._has_waiters():
+            self._running += 1
+            self._record_dispatch(priority_class, 0.0)
+            return 0.0
+
+        key = enqueued_at
+        if self.shortest_job_first:
+            key += float(complexity) * self.sjf_seconds_per_point
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queues[priority_class], (key, next(self._seq), enqueued_at, future)
+        )
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配執行槽但調用方被取消，歸還執行槽
+                self.release()
+            raise
+
+        return future.result()
+
+    def release(self):
+        """歸還執行槽並調度下一個任務"""
+        self._running = max(0, self._running - 1)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority_class: PriorityClass, complexity: float = 0):
+        """
+        執行槽上下文管理器
+
+        Args:
+            priority_class: 任務類別
+            complexity: 任務複雜度分數
+
+        Yields:
+            排隊等待時間（秒）
+        """
+        wait = await self.acquire(priority_class, complexity)
+        try:
+            yield wait
+        finally:
+            self.release()
+
+    def _has_waiters(self) -> bool:
+        """是否有排隊中的任務"""
+        return any(self._queues.values())
+
+    def _dispatch(self):
+        """按加權公平排隊分配空閒執行槽"""
+        while self._running < self.max_concurrency:
+            now = time.monotonic()
+            priority_class = self._select_class(now)
+            if priority_class is None:
+                return
+
+            _, _, enqueued_at, future = heapq.heappop(self._queues[priority_class])
+
+            # 更新虛擬時間：每次調度消耗 1 / weight
+            start = max(self._virtual_finish[priority_class], self._virtual_clock)
+            self._virtual_clock = start
+            self._virtual_finish[priority_class] = start + 1.0 / self.weights[priority_class]
+
+            wait = now - enqueued_at
+            self._running += 1
+            self._record_dispatch(priority_class, wait)
+            future.set_result(wait)
+
+    def _select_class(self, now: float) -> Optional[PriorityClass]:
+        """
+        選擇下一個調度的類別
+
+        虛擬完成時間最小者優先，隊首等待越久抵扣越多（老化）。
+
+        Args:
+            now: 當前時間 (monotonic)
+
+        Returns:
+            類別或 None（無等待任務）
+        """
+        best_class = None
+        best_key = None
+
+        for priority_class, queue in self._queues.items():
+            # 清理已取消的等待者
+            while queue and queue[0][3].cancelled():
+                heapq.heappop(queue)
+            if not queue:
+                continue
+
+            head_wait = now - queue[0][2]
+            start = max(self._virtual_finish[priority_class], self._virtual_clock)
+            key = start - self.aging_rate * head_wait
+
+            if best_key is None or key < best_key:
+                best_class = priority_class
+                best_key = key
+
+        return best_class
+
+    def _record_dispatch(self, priority_class: PriorityClass, wait: float):
+        """記錄調度等待指標"""
+        stats = self._stats[priority_class]
+        stats["dispatched"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+
+    def get_stats(self) -> Dict:
+        """
+        獲取各類別排隊指標
+
+        Returns:
+            指標字典
+        """
+        classes = {}
+        for priority_class, stats in self._stats.items():
+            dispatched = stats["dispatched"]
+            classes[priority_class.value] = {
+                "queued": sum(
+                    1 for entry in self._queues[priority_class] if not entry[3].cancelled()
+                ),
+                "dispatched": dispatched,
+                "avg_wait_ms": (
+                    stats["total_wait"] / dispatched * 1000 if dispatched else 0.0
+                ),
+                "max_wait_ms": stats["max_wait"] * 1000,
+            }
+
+        return {
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "classes": classes,
+        }
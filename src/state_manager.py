@@ -5,12 +5,22 @@ State management module
 - SQLite 狀態存儲
 - 任務狀態機 (IDLE → DISPATCHING → EXECUTING → COMPLETED/FAILED)
 - 斷點恢復
+- 任務事件日誌（狀態轉換時間、路由決策、重試；批量寫入）
+- 多實例租約：原子認領任務、心跳續約、接管過期租約
+- 緊湊的任務記錄（TaskRecord，__slots__），由查詢行直接構造
+- 子任務：父子關係與同級依賴，子任務隨父任務認領與續約
 """
 
+import json
+import os
+import socket
 import sqlite3
+import time
 import uuid
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 
 class TaskState(Enum):
@@ -22,21 +32,195 @@ class TaskState(Enum):
     WAITING_FOR_CLOUD = "waiting"  # 雲端故障，任務已掛起（腦幹模式）
     COMPLETED = "completed"  # 任務成功完成
     FAILED = "failed"  # 任務失敗
+    CANCELLED = "cancelled"  # 任務被客戶端取消
+
+
+# 狀態值 → 枚舉（構造記錄時避免 Enum 的值查找開銷）
+_STATES_BY_VALUE = {state.value: state for state in TaskState}
+
+_COMPACT_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+@dataclass(slots=True)
+class TaskRecord:
+    """
+    任務記錄（字段順序與 StateManager._SELECT_COLUMNS 一致）
+
+    conversation_history 不持久化，僅在路由時攜帶會話歷史。
+    """
+
+    task_id: str
+    description: str
+    state: TaskState
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    result_source: Optional[str] = None
+    source_task_id: Optional[str] = None
+    deadline: Optional[float] = None
+    session_id: Optional[str] = None
+    owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+    parent_id: Optional[str] = None
+    depends_on: Tuple[str, ...] = ()
+    conversation_history: Sequence[Dict] = field(default=(), compare=False, repr=False)
+
+    # 持久化字段（to_dict / to_json 輸出）
+    FIELDS = (
+        "task_id",
+        "description",
+        "state",
+        "created_at",
+        "updated_at",
+        "result_source",
+        "source_task_id",
+        "deadline",
+        "session_id",
+        "owner",
+        "lease_expires_at",
+        "heartbeat_at",
+        "parent_id",
+        "depends_on",
+    )
+
+    @classmethod
+    def from_row(cls, cursor: Optional[sqlite3.Cursor], row: Tuple) -> "TaskRecord":
+        """
+        由查詢行構造（可直接用作 sqlite3 的 row_factory）
+
+        Args:
+            cursor: 數據庫游標（未使用，row_factory 簽名要求）
+            row: 按 _SELECT_COLUMNS 順序的查詢行
+
+        Returns:
+            TaskRecord 實例
+        """
+        return cls(
+            row[0],
+            row[1],
+            _STATES_BY_VALUE[row[2]],
+            row[3],
+            row[4],
+            row[5],
+            row[6],
+            row[7],
+            row[8],
+            row[9],
+            row[10],
+            row[11],
+            row[12],
+            tuple(json.loads(row[13])) if row[13] else (),
+        )
+
+    def to_dict(self) -> Dict:
+        """轉換為可 JSON 編碼的字典（狀態輸出為字符串值）"""
+        return {
+            "task_id": self.task_id,
+            "description": self.description,
+            "state": self.state.value,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result_source": self.result_source,
+            "source_task_id": self.source_task_id,
+            "deadline": self.deadline,
+            "session_id": self.session_id,
+            "owner": self.owner,
+            "lease_expires_at": self.lease_expires_at,
+            "heartbeat_at": self.heartbeat_at,
+            "parent_id": self.parent_id,
+            "depends_on": list(self.depends_on),
+        }
+
+    def to_json(self) -> str:
+        """緊湊 JSON 編碼（復用同一編碼器，不逐次構造）"""
+        return _COMPACT_ENCODER.encode(self.to_dict())
 
 
 class StateManager:
     """狀態管理類"""
 
-    def __init__(self, db_path: str = "state.db"):
+    # 後續版本新增的列（舊數據庫啟動時自動補齊）
+    TASK_COLUMNS = {
+        "result_source": "TEXT",  # 結果來源：cache / coalesced（審計用）
+        "source_task_id": "TEXT",  # 提供結果的原始任務 ID
+        "deadline": "REAL",  # 客戶端指定的截止時間（Unix 時間戳）
+        "session_id": "TEXT",  # 所屬對話會話（崩潰恢復時重新加載上下文）
+        "owner": "TEXT",  # 持有租約的實例 ID
+        "lease_expires_at": "REAL",  # 租約到期時間（Unix 時間戳），過期後可被接管
+        "heartbeat_at": "REAL",  # 最近一次續約時間
+        "parent_id": "TEXT",  # 父任務 ID（子任務由父任務調度，不單獨認領）
+        "depends_on": "TEXT",  # 依賴的同級子任務 ID（JSON 數組）
+    }
+
+    # 讀取任務時的列順序（與 TaskRecord 字段對應）
+    _SELECT_COLUMNS = (
+        "task_id, description, state, created_at, updated_at, "
+        "result_source, source_task_id, deadline, session_id, "
+        "owner, lease_expires_at, heartbeat_at, parent_id, depends_on"
+    )
+
+    def __init__(
+        self,
+        db_path: str = "state.db",
+        event_batch_size: int = 64,
+        event_flush_interval: float = 1.0,
+        instance_id: Optional[str] = None,
+        lease_seconds: float = 30.0,
+        busy_timeout: float = 5.0,
+    ):
         """
         初始化狀態管理器
 
         Args:
             db_path: SQLite 數據庫路徑
+            event_batch_size: 事件緩衝達到該數量時寫入
+            event_flush_interval: 事件緩衝最長保留時間（秒）
+            instance_id: 本實例 ID（租約所有者），默認 主機名:進程號:隨機後綴
+            lease_seconds: 租約時長（秒），未續約的任務過期後可被其他實例接管
+            busy_timeout: 數據庫被其他連接鎖定時的最長等待時間（秒），
+                等待期間阻塞事件循環
         """
-        self.conn = sqlite3.connect(db_path)
+        # 服務啟動時在工作線程中構建，之後只在事件循環線程中使用
+        self.conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False)
+        # 多實例 / 批量導入共享同一數據庫：WAL 下讀寫互不阻塞，寫鎖等待有明確上限
+        self.conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.instance_id = (
+            instance_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.lease_seconds = lease_seconds
+        self.event_batch_size = max(1, event_batch_size)
+        self.event_flush_interval = event_flush_interval
+        # 待寫入的事件：(task_id, at, kind, data)
+        self._pending_events: List[tuple] = []
+        # 延遲寫入的狀態（寫後緩衝）：task_id → state，與事件在同一事務中提交
+        self._pending_states: Dict[str, str] = {}
+        self._last_event_flush = time.monotonic()
         self._init_db()
 
+    @classmethod
+    def from_config(cls, section: Optional[Dict]) -> "StateManager":
+        """
+        根據配置段創建狀態管理器
+
+        Args:
+            section: config.yaml 中的 state_manager 配置
+
+        Returns:
+            StateManager 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            db_path=str(section.get("db_path", "state.db")),
+            event_batch_size=int(section.get("event_batch_size", 64)),
+            event_flush_interval=float(section.get("event_flush_interval", 1.0)),
+            instance_id=section.get("instance_id") or None,
+            lease_seconds=float(section.get("lease_seconds", 30.0)),
+            busy_timeout=float(section.get("busy_timeout", 5.0)),
+        )
+
     def _init_db(self):
         """初始化數據庫表"""
         cursor = self.conn.cursor()
@@ -51,43 +235,137 @@ class StateManager:
             )
         """
         )
+        self._migrate_columns(cursor, "tasks", self.TASK_COLUMNS)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, updated_at)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks (parent_id)")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS retry_schedule (
+                task_id TEXT PRIMARY KEY,
+                attempt INTEGER NOT NULL,
+                due_at REAL NOT NULL,
+                last_error TEXT
+            )
+        """
+        )
+        # 僅追加的任務事件日誌；data 為緊湊 JSON
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_events (
+                task_id TEXT NOT NULL,
+                at REAL NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events (task_id, at)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_events_at ON task_events (at)")
         self.conn.commit()
 
-    def create_task(self, description: str) -> str:
+    def _migrate_columns(self, cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]):
+        """
+        為已有數據庫補齊新增的列
+
+        Args:
+            cursor: 數據庫游標
+            table: 表名
+            columns: 列名 → 列定義
+        """
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def create_task(
+        self,
+        description: str,
+        deadline: Optional[float] = None,
+        session_id: Optional[str] = None,
+        claim: bool = True,
+    ) -> str:
         """
         創建新任務
 
         Args:
             description: 任務描述
+            deadline: 截止時間（Unix 時間戳，可選）
+            session_id: 對話會話ID（可選）
+            claim: 是否由本實例持有租約；False 時進入共享隊列，由任一實例認領
 
         Returns:
             task_id: 任務ID
         """
         task_id = str(uuid.uuid4())
+        now = time.time()
+        owner, expires_at = (self.instance_id, now + self.lease_seconds) if claim else (None, None)
+        self._append_event(task_id, "state", {"state": TaskState.IDLE.value})
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT INTO tasks (task_id, description, state) VALUES (?, ?, ?)",
-            (task_id, description, TaskState.IDLE.value),
+            "INSERT INTO tasks (task_id, description, state, deadline, session_id, "
+            "owner, lease_expires_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                task_id,
+                description,
+                TaskState.IDLE.value,
+                deadline,
+                session_id,
+                owner,
+                expires_at,
+                now if claim else None,
+            ),
         )
+        self._write_events(cursor)
         self.conn.commit()
         return task_id
 
-    def update_state(self, task_id: str, state: TaskState):
+    def update_state(self, task_id: str, state: TaskState, defer: bool = False):
         """
         更新任務狀態
 
         Args:
             task_id: 任務ID
             state: 新狀態
+            defer: 為 True 時只放入寫後緩衝，隨下一次寫入或 flush_events 提交（不阻塞調用方）
         """
+        self._append_event(task_id, "state", {"state": state.value})
+        if defer:
+            self._pending_states[task_id] = state.value
+            return
+        self._pending_states.pop(task_id, None)
         cursor = self.conn.cursor()
         cursor.execute(
             "UPDATE tasks SET state = ?, updated_at = CURRENT_TIMESTAMP WHERE task_id = ?",
             (state.value, task_id),
         )
+        # 緩衝中的事件與狀態更新在同一事務中提交
+        self._write_events(cursor)
+        self.conn.commit()
+
+    def record_result_source(self, task_id: str, source: str, source_task_id: str):
+        """
+        記錄任務結果的來源（緩存命中或合併執行）
+
+        Args:
+            task_id: 任務ID
+            source: 來源類型 (cache / coalesced)
+            source_task_id: 實際執行的任務ID
+        """
+        self._append_event(task_id, "result", {"source": source, "task": source_task_id})
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE tasks SET result_source = ?, source_task_id = ? WHERE task_id = ?",
+            (source, source_task_id, task_id),
+        )
+        self._write_events(cursor)
         self.conn.commit()
 
-    def get_task(self, task_id: str) -> Optional[Dict]:
+    def get_task(self, task_id: str) -> Optional[TaskRecord]:
         """
         獲取任務信息
 
@@ -95,44 +373,467 @@ class StateManager:
             task_id: 任務ID
 
         Returns:
-            任務字典或 None
+            任務記錄或 None
+        """
+        self._flush_states()
+        cursor = self._task_cursor()
+        cursor.execute(
+            f"SELECT {self._SELECT_COLUMNS} FROM tasks WHERE task_id = ?", (task_id,)
+        )
+        return cursor.fetchone()
+
+    def get_pending_tasks(self) -> List[TaskRecord]:
+        """
+        獲取待處理的任務（非 COMPLETED 狀態）
+
+        Returns:
+            任務列表
+        """
+        self._flush_states()
+        cursor = self._task_cursor()
+        cursor.execute(
+            f"SELECT {self._SELECT_COLUMNS} FROM tasks WHERE state != ? "
+            "ORDER BY created_at DESC",
+            (TaskState.COMPLETED.value,),
+        )
+        return cursor.fetchall()
+
+    def get_tasks_by_states(self, states: List[TaskState]) -> List[TaskRecord]:
+        """
+        按狀態查詢任務（使用 state 索引）
+
+        Args:
+            states: 狀態列表
+
+        Returns:
+            任務列表（按更新時間升序）
+        """
+        if not states:
+            return []
+
+        self._flush_states()
+        placeholders = ", ".join("?" for _ in states)
+        cursor = self._task_cursor()
+        cursor.execute(
+            f"SELECT {self._SELECT_COLUMNS} FROM tasks WHERE state IN ({placeholders}) "
+            "ORDER BY updated_at",
+            [state.value for state in states],
+        )
+        return cursor.fetchall()
+
+    def create_subtasks(
+        self, parent_id: str, subtasks: Sequence[Tuple[str, Sequence[int]]]
+    ) -> List[str]:
+        """
+        為任務創建子任務（同一事務；截止時間與租約沿用父任務）
+
+        Args:
+            parent_id: 父任務ID
+            subtasks: [(描述, 依賴的子任務下標)]，見 task_graph.parse_subtasks
+
+        Returns:
+            子任務ID列表（與 subtasks 順序一致）
+
+        Raises:
+            ValueError: 父任務不存在
         """
+        parent = self.conn.execute(
+            "SELECT deadline, owner, lease_expires_at, heartbeat_at FROM tasks "
+            "WHERE task_id = ?",
+            (parent_id,),
+        ).fetchone()
+        if parent is None:
+            raise ValueError(f"Unknown parent task: {parent_id}")
+
+        task_ids = [str(uuid.uuid4()) for _ in subtasks]
+        rows = []
+        for task_id, (description, depends_on) in zip(task_ids, subtasks):
+            dependencies = [task_ids[index] for index in depends_on]
+            self._append_event(task_id, "state", {"state": TaskState.IDLE.value})
+            rows.append(
+                (
+                    task_id,
+                    description,
+                    TaskState.IDLE.value,
+                    *parent,
+                    parent_id,
+                    json.dumps(dependencies) if dependencies else None,
+                )
+            )
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,))
-        row = cursor.fetchone()
+        cursor.executemany(
+            "INSERT INTO tasks (task_id, description, state, deadline, owner, "
+            "lease_expires_at, heartbeat_at, parent_id, depends_on) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._write_events(cursor)
+        self.conn.commit()
+        return task_ids
+
+    def get_subtasks(self, parent_id: str) -> List[TaskRecord]:
+        """
+        獲取任務的直接子任務
 
-        if row is None:
+        Args:
+            parent_id: 父任務ID
+
+        Returns:
+            子任務列表（按創建順序）
+        """
+        self._flush_states()
+        cursor = self._task_cursor()
+        cursor.execute(
+            f"SELECT {self._SELECT_COLUMNS} FROM tasks WHERE parent_id = ? ORDER BY rowid",
+            (parent_id,),
+        )
+        return cursor.fetchall()
+
+    def has_subtasks(self, task_id: str) -> bool:
+        """任務是否有子任務"""
+        row = self.conn.execute(
+            "SELECT 1 FROM tasks WHERE parent_id = ? LIMIT 1", (task_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_task_tree(self, task_id: str) -> Optional[Dict]:
+        """
+        獲取任務及其全部子孫任務（一次遞歸查詢）
+
+        Args:
+            task_id: 任務ID
+
+        Returns:
+            任務字典，子任務在 "subtasks" 中按創建順序嵌套；任務不存在時返回 None
+        """
+        task = self.get_task(task_id)
+        if task is None:
             return None
 
-        return {
-            "task_id": row[0],
-            "description": row[1],
-            "state": row[2],
-            "created_at": row[3],
-            "updated_at": row[4],
-        }
+        cursor = self._task_cursor()
+        cursor.execute(
+            f"""
+            WITH RECURSIVE tree(task_id) AS (
+                SELECT task_id FROM tasks WHERE parent_id = ?
+                UNION ALL
+                SELECT tasks.task_id FROM tasks JOIN tree ON tasks.parent_id = tree.task_id
+            )
+            SELECT {self._SELECT_COLUMNS} FROM tasks
+            WHERE task_id IN (SELECT task_id FROM tree) ORDER BY rowid
+        """,
+            (task_id,),
+        )
+        nodes = {task_id: {**task.to_dict(), "subtasks": []}}
+        for record in cursor.fetchall():
+            nodes[record.task_id] = {**record.to_dict(), "subtasks": []}
+        for node in list(nodes.values())[1:]:
+            nodes[node["parent_id"]]["subtasks"].append(node)
+        return nodes[task_id]
 
-    def get_pending_tasks(self) -> List[Dict]:
+    def save_retry(self, task_id: str, attempt: int, due_at: float, error: str = ""):
         """
-        獲取待處理的任務（非 COMPLETED 狀態）
+        持久化任務的下一次重試計劃
+
+        Args:
+            task_id: 任務ID
+            attempt: 下一次嘗試序號
+            due_at: 到期時間（Unix 時間戳）
+            error: 上一次失敗原因
+        """
+        self._append_event(
+            task_id, "retry", {"attempt": attempt, "due_at": due_at, "error": error}
+        )
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO retry_schedule (task_id, attempt, due_at, last_error) "
+            "VALUES (?, ?, ?, ?)",
+            (task_id, attempt, due_at, error),
+        )
+        self._write_events(cursor)
+        self.conn.commit()
+
+    def delete_retry(self, task_id: str):
+        """
+        刪除任務的重試計劃
+
+        Args:
+            task_id: 任務ID
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM retry_schedule WHERE task_id = ?", (task_id,))
+        self.conn.commit()
+
+    def get_retry_schedule(self) -> List[Dict]:
+        """
+        獲取所有待執行的重試計劃
 
         Returns:
-            任務列表
+            重試計劃列表（按到期時間升序）
         """
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT * FROM tasks WHERE state != ? ORDER BY created_at DESC",
-            (TaskState.COMPLETED.value,),
+            "SELECT task_id, attempt, due_at, last_error FROM retry_schedule ORDER BY due_at"
         )
-        rows = cursor.fetchall()
+        return [
+            {"task_id": row[0], "attempt": row[1], "due_at": row[2], "last_error": row[3]}
+            for row in cursor.fetchall()
+        ]
+
+    def purge_retries(self) -> int:
+        """
+        刪除已結束或已不存在的任務的重試計劃（崩潰遺留）
+
+        Returns:
+            刪除的重試計劃數
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "DELETE FROM retry_schedule WHERE task_id NOT IN "
+            "(SELECT task_id FROM tasks WHERE state NOT IN (?, ?, ?))",
+            (TaskState.COMPLETED.value, TaskState.FAILED.value, TaskState.CANCELLED.value),
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def claim_tasks(
+        self,
+        states: List[TaskState],
+        limit: Optional[int] = None,
+        include_own: bool = False,
+    ) -> List[TaskRecord]:
+        """
+        原子認領無主或租約已過期的任務（多實例共享數據庫時只有一個實例能認領成功）
+
+        Args:
+            states: 可認領的狀態
+            limit: 最多認領的任務數，默認不限
+            include_own: 同時認領本實例 ID 仍持有的任務（僅啟動時使用：
+                固定 instance_id 重啟後，上一次運行遺留的租約仍屬於本實例）
+
+        Returns:
+            本實例認領到的任務列表（按創建時間升序）
+        """
+        if not states or (limit is not None and limit <= 0):
+            return []
+
+        now = time.time()
+        placeholders = ", ".join("?" for _ in states)
+        self._flush_states()
+        # 先取得寫鎖，使查詢與更新在同一事務中完成
+        if self.conn.in_transaction:
+            self.conn.commit()
+        cursor = self._task_cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(
+                f"""
+                UPDATE tasks SET owner = ?, lease_expires_at = ?, heartbeat_at = ?
+                WHERE task_id IN (
+                    SELECT task_id FROM tasks
+                    WHERE state IN ({placeholders}) AND parent_id IS NULL
+                      AND (owner IS NULL OR lease_expires_at IS NULL
+                           OR lease_expires_at < ? OR owner = ?)
+                    ORDER BY created_at, rowid
+                    LIMIT ?
+                )
+                RETURNING {self._SELECT_COLUMNS}
+            """,
+                [self.instance_id, now + self.lease_seconds, now]
+                + [state.value for state in states]
+                + [
+                    now,
+                    self.instance_id if include_own else None,
+                    -1 if limit is None else limit,
+                ],
+            )
+            tasks = cursor.fetchall()
+            if tasks:
+                # 子任務隨父任務一同認領
+                task_ids = [task.task_id for task in tasks]
+                cursor.execute(
+                    f"UPDATE tasks SET owner = ?, lease_expires_at = ?, heartbeat_at = ? "
+                    f"WHERE parent_id IN ({', '.join('?' for _ in task_ids)})",
+                    [self.instance_id, now + self.lease_seconds, now] + task_ids,
+                )
+            for task in tasks:
+                self._append_event(task.task_id, "lease", {"owner": self.instance_id})
+            self._write_events(cursor)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        return sorted(tasks, key=lambda task: (task.created_at, task.task_id))
+
+    def renew_leases(self, task_ids: Iterable[str]) -> List[str]:
+        """
+        為本實例持有的任務續約（心跳），子任務隨父任務續約；已取消的任務不再續約
+
+        Args:
+            task_ids: 任務ID
+
+        Returns:
+            續約成功的任務ID（含子任務）；缺失的任務租約已被其他實例接管或已被取消
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
 
+        now = time.time()
+        placeholders = ", ".join("?" for _ in task_ids)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"UPDATE tasks SET lease_expires_at = ?, heartbeat_at = ? "
+            f"WHERE owner = ? AND state != ? "
+            f"AND (task_id IN ({placeholders}) OR parent_id IN ({placeholders})) "
+            f"RETURNING task_id",
+            [now + self.lease_seconds, now, self.instance_id, TaskState.CANCELLED.value]
+            + task_ids
+            + task_ids,
+        )
+        renewed = [row[0] for row in cursor.fetchall()]
+        self.conn.commit()
+        return renewed
+
+    def release_task(self, task_id: str):
+        """
+        釋放本實例持有的租約（任務及其子任務可立即被其他實例認領）
+
+        Args:
+            task_id: 任務ID
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE tasks SET owner = NULL, lease_expires_at = NULL "
+            "WHERE (task_id = ? OR parent_id = ?) AND owner = ?",
+            (task_id, task_id, self.instance_id),
+        )
+        self.conn.commit()
+
+    def record_event(self, task_id: str, kind: str, **data: Any):
+        """
+        追加任務事件（緩衝，隨下一次狀態寫入或按數量/時間批量寫入）
+
+        Args:
+            task_id: 任務ID
+            kind: 事件類型 (route / retry 等)
+            **data: 事件數據（需可 JSON 編碼）
+        """
+        self._append_event(task_id, kind, data)
+        if (
+            len(self._pending_events) >= self.event_batch_size
+            or time.monotonic() - self._last_event_flush >= self.event_flush_interval
+        ):
+            self.flush_events()
+
+    def _append_event(self, task_id: str, kind: str, data: Optional[Dict]):
+        """將事件加入緩衝"""
+        encoded = json.dumps(data, separators=(",", ":"), default=str) if data else None
+        self._pending_events.append((task_id, time.time(), kind, encoded))
+
+    def _write_events(self, cursor: sqlite3.Cursor):
+        """在當前事務中寫入緩衝的事件與延遲的狀態（由調用方提交）"""
+        if self._pending_states:
+            cursor.executemany(
+                "UPDATE tasks SET state = ?, updated_at = CURRENT_TIMESTAMP WHERE task_id = ?",
+                [(state, task_id) for task_id, state in self._pending_states.items()],
+            )
+            self._pending_states = {}
+        if not self._pending_events:
+            return
+        cursor.executemany(
+            "INSERT INTO task_events (task_id, at, kind, data) VALUES (?, ?, ?, ?)",
+            self._pending_events,
+        )
+        self._pending_events = []
+        self._last_event_flush = time.monotonic()
+
+    def flush_events(self):
+        """立即寫入緩衝的事件與延遲的狀態"""
+        if self._pending_events:
+            self._write_events(self.conn.cursor())
+            self.conn.commit()
+
+    def _flush_states(self):
+        """讀取任務前提交延遲的狀態，保證讀到自己的寫入"""
+        if self._pending_states:
+            self.flush_events()
+
+    def get_task_events(self, task_id: str) -> List[Dict]:
+        """
+        獲取任務的事件時間線
+
+        Args:
+            task_id: 任務ID
+
+        Returns:
+            事件列表（按時間升序）
+        """
+        self.flush_events()
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT at, kind, data FROM task_events WHERE task_id = ? ORDER BY at, rowid",
+            (task_id,),
+        )
         return [
-            {
-                "task_id": row[0],
-                "description": row[1],
-                "state": row[2],
-                "created_at": row[3],
-                "updated_at": row[4],
-            }
-            for row in rows
+            {"at": row[0], "kind": row[1], **(json.loads(row[2]) if row[2] else {})}
+            for row in cursor.fetchall()
         ]
+
+    def get_slowest_stages(
+        self,
+        stage: Optional[str] = None,
+        window_seconds: float = 3600.0,
+        limit: int = 10,
+    ) -> List[Dict]:
+        """
+        查詢時間窗口內耗時最長的任務階段
+
+        階段耗時為進入某狀態到進入下一狀態的時間（終態沒有耗時）。
+
+        Args:
+            stage: 只查詢指定狀態（如 executing），默認所有狀態
+            window_seconds: 時間窗口（秒），默認最近一小時
+            limit: 返回條數
+
+        Returns:
+            [{task_id, stage, started_at, duration_ms}]，按耗時降序
+        """
+        self.flush_events()
+        query = """
+            SELECT task_id, stage, started_at, (ended_at - started_at) * 1000 AS duration_ms
+            FROM (
+                SELECT task_id,
+                       json_extract(data, '$.state') AS stage,
+                       at AS started_at,
+                       LEAD(at) OVER (PARTITION BY task_id ORDER BY at, rowid) AS ended_at
+                FROM task_events
+                WHERE kind = 'state' AND at >= ?
+            )
+            WHERE ended_at IS NOT NULL
+        """
+        params: List[Any] = [time.time() - window_seconds]
+        if stage is not None:
+            query += " AND stage = ?"
+            params.append(stage)
+        query += " ORDER BY duration_ms DESC LIMIT ?"
+        params.append(limit)
+
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return [
+            {"task_id": row[0], "stage": row[1], "started_at": row[2], "duration_ms": row[3]}
+            for row in cursor.fetchall()
+        ]
+
+    def close(self):
+        """寫入緩衝的事件，提交未完成的事務並關閉數據庫連接"""
+        self.flush_events()
+        self.conn.commit()
+        self.conn.close()
+
+    def _task_cursor(self) -> sqlite3.Cursor:
+        """查詢行直接構造為 TaskRecord 的游標"""
+        cursor = self.conn.cursor()
+        cursor.row_factory = TaskRecord.from_row
+        return cursor
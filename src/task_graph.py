@@ -0,0 +1,180 @@
+"""
+Task graph module
+
+功能:
+- 解析客戶端提交的子任務列表（描述與依賴），拒絕未知依賴與循環依賴
+- 按依賴關係執行子任務：依賴均已完成的子任務並行執行
+- 依賴失敗的子任務直接跳過，不再執行
+"""
+
+import asyncio
+import logging
+from collections.abc import Mapping
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from src.state_manager import TaskRecord
+
+logger = logging.getLogger(__name__)
+
+# 子任務計劃：(描述, 依賴的子任務下標)
+SubtaskPlan = List[Tuple[str, List[int]]]
+
+
+def parse_subtasks(specs: Any) -> SubtaskPlan:
+    """
+    解析子任務列表
+
+    每項為 {"description": ..., "id": 可選的引用名, "depends_on": [引用名或下標]}
+
+    Args:
+        specs: 客戶端提交的子任務列表
+
+    Returns:
+        子任務計劃（與輸入順序一致）
+
+    Raises:
+        ValueError: 缺少描述、重複引用名、未知依賴或循環依賴
+    """
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("subtasks must be a non-empty list")
+
+    keys: Dict[str, int] = {}
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, Mapping):
+            raise ValueError(f"Subtask {index} must be an object")
+        description = spec.get("description")
+        if not isinstance(description, str) or not description:
+            raise ValueError(f"Subtask {index} is missing a description")
+        key = spec.get("id")
+        if key is None:
+            continue
+        if not isinstance(key, str) or key in keys:
+            raise ValueError(f"Subtask {index} has an invalid or duplicate id: {key!r}")
+        keys[key] = index
+
+    plan: SubtaskPlan = []
+    for index, spec in enumerate(specs):
+        depends_on = spec.get("depends_on") or []
+        if not isinstance(depends_on, list):
+            raise ValueError(f"Subtask {index} depends_on must be a list")
+        dependencies: List[int] = []
+        for ref in depends_on:
+            dependency = keys.get(ref) if isinstance(ref, str) else ref
+            if (
+                isinstance(dependency, bool)
+                or not isinstance(dependency, int)
+                or not 0 <= dependency < len(specs)
+                or dependency == index
+            ):
+                raise ValueError(f"Subtask {index} has an invalid dependency: {ref!r}")
+            if dependency not in dependencies:
+                dependencies.append(dependency)
+        plan.append((spec["description"], dependencies))
+
+    if len(_topological_order(plan)) != len(plan):
+        raise ValueError("Subtask dependencies contain a cycle")
+    return plan
+
+
+def _topological_order(plan: SubtaskPlan) -> List[int]:
+    """按依賴排序的子任務下標（存在循環時結果不完整）"""
+    remaining = {index: len(dependencies) for index, (_, dependencies) in enumerate(plan)}
+    dependents: Dict[int, List[int]] = {index: [] for index in remaining}
+    for index, (_, dependencies) in enumerate(plan):
+        for dependency in dependencies:
+            dependents[dependency].append(index)
+
+    ready = [index for index, count in remaining.items() if count == 0]
+    order = []
+    while ready:
+        index = ready.pop()
+        order.append(index)
+        for dependent in dependents[index]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    return order
+
+
+class TaskGraph:
+    """子任務依賴圖執行類"""
+
+    def __init__(
+        self,
+        tasks: Sequence[TaskRecord],
+        run: Callable[[TaskRecord], Awaitable[Dict]],
+        skip: Callable[[TaskRecord], Dict],
+    ):
+        """
+        初始化依賴圖
+
+        Args:
+            tasks: 子任務記錄（depends_on 為同級子任務 ID）
+            run: 執行一個子任務，返回 {"task_id", "status", ...}
+            skip: 依賴未完成時跳過一個子任務，返回同樣格式的結果
+        """
+        self.tasks = list(tasks)
+        self._run = run
+        self._skip = skip
+
+    async def run(self) -> List[Dict]:
+        """
+        執行全部子任務：依賴均已完成的子任務並行執行，依賴失敗的子任務跳過
+
+        被取消時同時取消執行中的子任務
+
+        Returns:
+            各子任務的結果（與子任務順序一致）
+        """
+        known = {task.task_id for task in self.tasks}
+        pending = {task.task_id: task for task in self.tasks}
+        results: Dict[str, Dict] = {}
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while pending or running:
+                progressed = False
+                for task_id, task in list(pending.items()):
+                    dependencies = [results.get(dependency) for dependency in task.depends_on]
+                    blocked = any(
+                        dependency not in known for dependency in task.depends_on
+                    ) or any(
+                        result is not None and result.get("status") != "completed"
+                        for result in dependencies
+                    )
+                    if blocked:
+                        del pending[task_id]
+                        results[task_id] = self._skip(task)
+                        progressed = True
+                    elif all(result is not None for result in dependencies):
+                        del pending[task_id]
+                        running[asyncio.ensure_future(self._run(task))] = task_id
+                        progressed = True
+                if not running:
+                    if not progressed:
+                        # 剩餘子任務相互依賴（數據庫中的循環依賴），無法執行
+                        for task_id, task in pending.items():
+                            results[task_id] = self._skip(task)
+                        pending.clear()
+                    # 跳過的子任務會傳遞給依賴它的子任務，重新檢查
+                    continue
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task_id = running.pop(future)
+                    try:
+                        results[task_id] = future.result()
+                    except Exception as e:
+                        logger.warning(
+                            "子任務失敗 %s: %s",
+                            task_id,
+                            e,
+                            extra={"task_id": task_id, "stage": "subtask"},
+                        )
+                        results[task_id] = {"task_id": task_id, "status": "failed", "error": str(e)}
+        finally:
+            for future in running:
+                future.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return [results[task.task_id] for task in self.tasks]
@@ -0,0 +1,229 @@
+"""
+Traffic capture module
+
+功能:
+- 可選錄製 MCP 請求（到達時間、方法、參數、結果狀態、耗時）
+- 錄製每次執行器調用的路由決策、排隊等待、調用延遲與 token 用量
+- 緊湊 JSONL（短字段名；文件名以 .gz 結尾時 gzip 壓縮），供 traffic_replay 回放
+- 未指定文件時保存在內存中（回放時記錄新配置下的結果）
+
+記錄格式（每行一個 JSON 對象）:
+    {"k": "req", "t": 到達時間, "m": 方法, "p": 參數, "task": 任務ID, "s": 狀態, "ms": 耗時}
+    {"k": "exec", "t": 調用時間, "task": 任務ID, "d": 描述, "e": 執行器, "mo": 模型,
+     "c": 複雜度, "w": 排隊等待毫秒, "ms": 調用毫秒, "in": 輸入 token, "out": 輸出 token,
+     "err": 錯誤（僅失敗時）}
+"""
+
+import gzip
+import json
+import logging
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.result_cache import encode_default
+
+logger = logging.getLogger(__name__)
+
+_COMPACT_ENCODER = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"), default=encode_default
+)
+
+
+def _open(path: str, mode: str):
+    """打開錄製文件（.gz 後綴時使用 gzip）"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def load_capture(path: str) -> Tuple[List[Dict], List[Dict]]:
+    """
+    讀取錄製文件
+
+    Args:
+        path: 錄製文件路徑
+
+    Returns:
+        (請求記錄, 執行記錄)，均按時間升序
+    """
+    requests: List[Dict] = []
+    executions: List[Dict] = []
+    with _open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("k") == "req":
+                requests.append(record)
+            elif record.get("k") == "exec":
+                executions.append(record)
+    requests.sort(key=lambda record: record["t"])
+    executions.sort(key=lambda record: record["t"])
+    return requests, executions
+
+
+class TrafficRecorder:
+    """MCP 請求與執行器調用錄製類（默認關閉）"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        enabled: bool = False,
+        methods: Iterable[str] = ("create_task",),
+        max_bytes: int = 100 * 1024 * 1024,
+        flush_every: int = 64,
+    ):
+        """
+        初始化錄製器
+
+        Args:
+            path: 錄製文件（追加寫入），None 時記錄保存在 records 中
+            enabled: 是否錄製
+            methods: 錄製的 MCP 方法
+            max_bytes: 寫入的未壓縮字節上限，超出後停止錄製
+            flush_every: 緩衝多少條記錄後寫入文件
+        """
+        self.path = path
+        self.enabled = enabled
+        self.methods = set(methods)
+        self.max_bytes = max_bytes
+        self.flush_every = max(1, flush_every)
+        # 內存模式下的全部記錄
+        self.records: List[Dict] = []
+        self._buffer: List[str] = []
+        self._written = 0
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict]) -> "TrafficRecorder":
+        """
+        根據配置段創建錄製器
+
+        Args:
+            section: config.yaml 中的 traffic_capture 配置
+
+        Returns:
+            TrafficRecorder 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        return cls(
+            path=str(section.get("path", "traffic.jsonl.gz")),
+            enabled=bool(section.get("enabled", False)),
+            methods=section.get("methods") or ("create_task",),
+            max_bytes=int(section.get("max_bytes", 100 * 1024 * 1024)),
+            flush_every=int(section.get("flush_every", 64)),
+        )
+
+    def record_request(self, received_at: float, message: str, response: str, elapsed: float):
+        """
+        記錄一個 MCP 請求（處理完成後調用，時間為到達時間）
+
+        Args:
+            received_at: 到達時間（Unix 時間戳）
+            message: 請求 JSON
+            response: 響應 JSON
+            elapsed: 處理耗時（秒）
+        """
+        if not self.enabled:
+            return
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if not isinstance(data, Mapping) or data.get("method") not in self.methods:
+            return
+
+        record = {
+            "k": "req",
+            "t": round(received_at, 6),
+            "m": data["method"],
+            "p": data.get("params") or {},
+            "ms": round(elapsed * 1000, 3),
+        }
+        try:
+            result = json.loads(response).get("result")
+        except (ValueError, AttributeError):
+            result = None
+        if isinstance(result, Mapping):
+            record["task"] = result.get("task_id")
+            record["s"] = result.get("status")
+        self._append(record)
+
+    def record_execution(
+        self,
+        task_id: str,
+        description: str,
+        route: Mapping,
+        executor: str,
+        wait: float,
+        latency: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        error: Optional[str] = None,
+    ):
+        """
+        記錄一次執行器調用
+
+        Args:
+            task_id: 任務ID
+            description: 任務描述（回放時按描述匹配延遲）
+            route: 路由結果
+            executor: 實際調用的執行器（降級時為 direct_api）
+            wait: 排隊等待（秒）
+            latency: 調用耗時（秒）
+            input_tokens: 輸入 token 數
+            output_tokens: 輸出 token 數
+            error: 失敗原因
+        """
+        if not self.enabled:
+            return
+        record = {
+            "k": "exec",
+            "t": round(time.time() - latency, 6),
+            "task": task_id,
+            "d": description,
+            "e": executor,
+            "mo": route.get("model"),
+            "c": route.get("complexity"),
+            "w": round(wait * 1000, 3),
+            "ms": round(latency * 1000, 3),
+            "in": input_tokens,
+            "out": output_tokens,
+        }
+        if error is not None:
+            record["err"] = error
+        self._append(record)
+
+    def _append(self, record: Dict):
+        """緩衝一條記錄"""
+        if self.path is None:
+            self.records.append(record)
+            return
+        self._buffer.append(_COMPACT_ENCODER.encode(record) + "\n")
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """寫入緩衝的記錄（超出字節上限時停止錄製）"""
+        if not self._buffer or self.path is None:
+            return
+        data = "".join(self._buffer)
+        self._buffer = []
+        self._written += len(data.encode("utf-8"))
+        try:
+            with _open(self.path, "a") as f:
+                f.write(data)
+        except OSError as e:
+            logger.error("流量錄製寫入失敗，停止錄製: %s", e)
+            self.enabled = False
+            return
+        if self._written >= self.max_bytes:
+            logger.warning("流量錄製達到字節上限，停止錄製: %s", self.path)
+            self.enabled = False
+
+    def close(self):
+        """寫入剩餘記錄"""
+        self.flush()
@@ -0,0 +1,305 @@
+# src/traffic_replay.py
+"""
+Omni-Orchestrator 流量回放
+
+将 traffic_capture 录制的请求按原始时间间隔（或加速）重新发送给协调器，
+执行器替换为按录制延迟与 token 用量响应的桩，比较新配置下的：
+
+- 路由决策：执行器/模型分布，以及同一请求路由结果的变化数
+- 排队等待与端到端耗时（p50/p95/max，回放耗时按倍速换算回原始时间尺度；
+  协调器自身的处理开销不随倍速缩短，加速回放时端到端耗时偏高）
+- 成本：录制与回放的 token 均按当前配置的价格表计算
+- 任务结果状态分布
+
+回放使用临时状态数据库，不影响线上数据；共享队列提交（wait: false）按同步执行回放。
+
+用法:
+    python -m src.traffic_replay traffic.jsonl.gz --config config.yaml --speed 10 [-o report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import yaml
+
+from src.traffic_capture import TrafficRecorder, load_capture
+
+
+class ReplayExecutor:
+    """执行器桩：按任务描述依次取出录制的调用，休眠录制延迟后返回相同的 token 用量"""
+
+    session = None
+
+    def __init__(self, executions: List[Dict], speed: float = 1.0):
+        """
+        Args:
+            executions: 录制的执行记录
+            speed: 回放倍速（延迟按倍速缩短）
+        """
+        self.speed = speed
+        self._by_description: Dict[str, deque] = defaultdict(deque)
+        for record in executions:
+            self._by_description[record.get("d")].append(record)
+        latencies = sorted(record["ms"] for record in executions)
+        # 未录制到的请求（如原先命中缓存）使用录制延迟的中位数
+        self._default = {"ms": latencies[len(latencies) // 2] if latencies else 0.0}
+
+    async def connect(self):
+        """无需连接"""
+
+    async def close(self):
+        """无需断开"""
+
+    def get(self, name: str) -> "ReplayExecutor":
+        """充当 MCPClientRegistry：所有执行器共用同一个桩"""
+        return self
+
+    async def call_tool(self, name: str, timeout: Optional[float] = None, **arguments):
+        """按录制延迟响应 execute_task；cancel_task 立即确认"""
+        if name != "execute_task":
+            return None
+        queue = self._by_description.get(arguments.get("description"))
+        record = queue.popleft() if queue else self._default
+        await asyncio.sleep(record["ms"] / 1000 / self.speed)
+        if record.get("err"):
+            raise RuntimeError(record["err"])
+        return SimpleNamespace(
+            content="replayed",
+            usage={"input_tokens": record.get("in", 0), "output_tokens": record.get("out", 0)},
+        )
+
+
+def replay_config(config_path: Optional[str], workdir: str) -> str:
+    """
+    生成回放配置：沿用路由、调度与价格配置，状态写入临时数据库，关闭多实例与录制
+
+    Returns:
+        临时配置文件路径
+    """
+    config = {}
+    if config_path and os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    config["state_manager"] = {
+        **(config.get("state_manager") or {}),
+        "db_path": os.path.join(workdir, "replay.db"),
+        "instance_id": "replay",
+    }
+    config["leases"] = {"enabled": False}
+    config["traffic_capture"] = {"enabled": False}
+    path = os.path.join(workdir, "replay.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def replay_message(record: Dict, speed: float) -> str:
+    """
+    还原请求消息：绝对截止时间换算为相对超时（按倍速缩短），共享队列提交改为同步执行
+
+    Args:
+        record: 录制的请求
+        speed: 回放倍速
+
+    Returns:
+        MCP 请求 JSON
+    """
+    params = dict(record.get("p") or {})
+    params.pop("wait", None)
+    deadline = params.pop("deadline", None)
+    if params.get("timeout") is not None:
+        params["timeout"] = float(params["timeout"]) / speed
+    elif deadline is not None:
+        params["timeout"] = (float(deadline) - record["t"]) / speed
+    return json.dumps({"method": record["m"], "params": params}, ensure_ascii=False)
+
+
+async def replay(orchestrator, requests: List[Dict], speed: float = 1.0) -> List[Dict]:
+    """
+    按录制的到达间隔发送请求
+
+    Args:
+        orchestrator: Orchestrator 实例（执行器已替换为桩）
+        requests: 录制的请求（按时间升序）
+        speed: 回放倍速
+
+    Returns:
+        各请求的响应结果
+    """
+    if not requests:
+        return []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first = requests[0]["t"]
+    running = []
+    for record in requests:
+        delay = (record["t"] - first) / speed - (loop.time() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = replay_message(record, speed)
+        running.append(asyncio.create_task(orchestrator.process_mcp_message(message)))
+    responses = await asyncio.gather(*running)
+    return [json.loads(response).get("result") or {} for response in responses]
+
+
+def _summary(values: List[float]) -> Dict:
+    """分布摘要"""
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": values[len(values) // 2],
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1],
+    }
+
+
+def _routes(executions: List[Dict]) -> Counter:
+    """执行器/模型分布"""
+    return Counter(f"{record.get('e')}/{record.get('mo')}" for record in executions)
+
+
+def _routing_changes(recorded: List[Dict], replayed: List[Dict]) -> Dict:
+    """按任务描述配对录制与回放的调用，统计路由变化"""
+    by_description: Dict[str, deque] = defaultdict(deque)
+    for record in replayed:
+        by_description[record.get("d")].append(record)
+    compared = changed = 0
+    for record in recorded:
+        queue = by_description.get(record.get("d"))
+        if not queue:
+            continue
+        other = queue.popleft()
+        compared += 1
+        if (record.get("e"), record.get("mo")) != (other.get("e"), other.get("mo")):
+            changed += 1
+    return {"compared": compared, "changed": changed}
+
+
+def build_report(
+    orchestrator,
+    requests: List[Dict],
+    recorded: List[Dict],
+    results: List[Dict],
+    replayed_requests: List[Dict],
+    replayed: List[Dict],
+    speed: float = 1.0,
+) -> Dict:
+    """
+    汇总录制与回放的差异
+
+    Args:
+        orchestrator: 回放使用的 Orchestrator（价格表）
+        requests: 录制的请求
+        recorded: 录制的执行记录
+        results: 回放的响应结果
+        replayed_requests: 回放时记录的请求
+        replayed: 回放时记录的执行记录
+        speed: 回放倍速
+
+    Returns:
+        报告（routing / queue_wait_ms / end_to_end_ms / cost / status）
+    """
+
+    def cost(executions: List[Dict]) -> float:
+        return sum(
+            orchestrator.usage_ledger.cost_of(
+                record.get("mo"), record.get("in", 0), record.get("out", 0)
+            )
+            for record in executions
+        )
+
+    return {
+        "requests": len(requests),
+        "routing": {
+            "recorded": dict(_routes(recorded)),
+            "replayed": dict(_routes(replayed)),
+            **_routing_changes(recorded, replayed),
+        },
+        "queue_wait_ms": {
+            "recorded": _summary([record["w"] for record in recorded]),
+            "replayed": _summary([record["w"] * speed for record in replayed]),
+        },
+        "end_to_end_ms": {
+            "recorded": _summary([record["ms"] for record in requests]),
+            "replayed": _summary([record["ms"] * speed for record in replayed_requests]),
+        },
+        "cost": {"recorded": cost(recorded), "replayed": cost(replayed)},
+        "status": {
+            "recorded": dict(Counter(record.get("s") for record in requests)),
+            "replayed": dict(Counter(result.get("status") for result in results)),
+        },
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.traffic_replay", description="录制流量回放"
+    )
+    parser.add_argument("capture", help="traffic_capture 录制文件")
+    parser.add_argument("--config", default="config.yaml", help="待评估的配置文件")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速（默认按原始速度）")
+    parser.add_argument("-o", "--output", help="报告 JSON 文件（默认输出到 stdout）")
+    return parser
+
+
+async def main(argv=None) -> int:
+    """回放入口"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    logging.basicConfig(level=logging.WARNING)
+    requests, executions = load_capture(args.capture)
+
+    from src.orchestrator import Orchestrator
+
+    with tempfile.TemporaryDirectory() as workdir:
+        orchestrator = Orchestrator(config_path=replay_config(args.config, workdir))
+        stub = ReplayExecutor(executions, args.speed)
+        orchestrator.mcp_client = stub
+        orchestrator.mcp_clients = stub
+        # 回放结果记录在内存中，与录制记录格式相同
+        orchestrator.traffic_recorder = TrafficRecorder(
+            enabled=True, methods=orchestrator.traffic_recorder.methods
+        )
+        started = time.perf_counter()
+        try:
+            results = await replay(orchestrator, requests, args.speed)
+        finally:
+            await orchestrator.shutdown()
+
+    recorder = orchestrator.traffic_recorder
+    report = build_report(
+        orchestrator,
+        requests,
+        executions,
+        results,
+        [record for record in recorder.records if record["k"] == "req"],
+        [record for record in recorder.records if record["k"] == "exec"],
+        args.speed,
+    )
+    report.update(speed=args.speed, duration_s=time.perf_counter() - started)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,334 @@
+"""
+Usage ledger module
+
+功能:
+- 記錄每個任務的輸入/輸出 token 與成本（按模型、執行器）
+- 批量寫入 SQLite，並預聚合為每分鐘匯總，儀表盤查詢只讀匯總表
+- 可配置的成本預算，接近上限時引導路由使用免費渠道
+"""
+
+import sqlite3
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _get(value: Any, key: str) -> Any:
+    """從字典或對象讀取字段"""
+    if isinstance(value, Mapping):
+        return value.get(key)
+    return getattr(value, key, None)
+
+
+def extract_usage(result: Any) -> Tuple[int, int, Optional[str]]:
+    """
+    從執行結果中提取 token 用量
+
+    支持 Anthropic (input_tokens / output_tokens)、OpenAI (prompt_tokens /
+    completion_tokens) 格式，以及 MCP 結果 structuredContent / meta 中的 usage。
+
+    Args:
+        result: 直連 API 響應或 MCP 工具結果
+
+    Returns:
+        (輸入 token, 輸出 token, 響應中的模型名或 None)
+    """
+    if result is None:
+        return 0, 0, None
+    if _get(result, "cached") is True:
+        # 響應緩存命中不產生新的用量
+        return 0, 0, None
+
+    usage = _get(result, "usage")
+    for container in ("structuredContent", "meta"):
+        if usage is None:
+            usage = _get(_get(result, container) or {}, "usage")
+
+    model = _get(result, "model")
+    if not isinstance(usage, Mapping):
+        return 0, 0, model if isinstance(model, str) else None
+
+    input_tokens = usage.get("input_tokens", usage.get("prompt_tokens", 0)) or 0
+    output_tokens = usage.get("output_tokens", usage.get("completion_tokens", 0)) or 0
+    return int(input_tokens), int(output_tokens), model if isinstance(model, str) else None
+
+
+class UsageLedger:
+    """用量賬本類（SQLite 持久化）"""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        prices: Optional[Dict[str, Dict]] = None,
+        budgets: Optional[Dict[str, Dict]] = None,
+        budget_threshold: float = 0.8,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ):
+        """
+        初始化用量賬本
+
+        Args:
+            conn: SQLite 連接（通常與 StateManager 共用）
+            prices: 模型 → {"input": 每百萬輸入 token 價格, "output": 每百萬輸出 token 價格}
+            budgets: 預算名 → {"window_seconds": 窗口, "limit": 成本上限}
+            budget_threshold: 花費達到上限的該比例時視為接近上限
+            batch_size: 緩衝達到該數量時寫入
+            flush_interval: 緩衝最長保留時間（秒）
+        """
+        self.conn = conn
+        self.prices = dict(prices or {})
+        self.budgets = dict(budgets or {})
+        self.budget_threshold = budget_threshold
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        # 待寫入的記錄：(task_id, at, model, executor, input_tokens, output_tokens, cost)
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._init_db()
+
+    @classmethod
+    def from_config(cls, conn: sqlite3.Connection, section: Optional[Dict]) -> "UsageLedger":
+        """
+        根據配置段創建用量賬本
+
+        Args:
+            conn: SQLite 連接
+            section: config.yaml 中的 usage 配置
+
+        Returns:
+            UsageLedger 實例
+        """
+        if not isinstance(section, Mapping):
+            section = {}
+
+        prices = {
+            model: {"input": float(price.get("input", 0)), "output": float(price.get("output", 0))}
+            for model, price in (section.get("prices") or {}).items()
+        }
+        budgets = {
+            name: {
+                "window_seconds": float(budget.get("window_seconds", 86400)),
+                "limit": float(budget["limit"]),
+            }
+            for name, budget in (section.get("budgets") or {}).items()
+        }
+        return cls(
+            conn,
+            prices=prices,
+            budgets=budgets,
+            budget_threshold=float(section.get("budget_threshold", 0.8)),
+            batch_size=int(section.get("batch_size", 100)),
+            flush_interval=float(section.get("flush_interval", 1.0)),
+        )
+
+    def _init_db(self):
+        """初始化明細表與每分鐘匯總表"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage_ledger (
+                task_id TEXT NOT NULL,
+                at REAL NOT NULL,
+                model TEXT NOT NULL,
+                executor TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                cost REAL NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_usage_ledger_task ON usage_ledger (task_id)"
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage_rollup (
+                minute INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                executor TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                cost REAL NOT NULL,
+                PRIMARY KEY (minute, model, executor)
+            )
+        """
+        )
+        self.conn.commit()
+
+    def cost_of(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        """
+        按價格表計算成本（未配置價格的模型視為免費）
+
+        Args:
+            model: 模型名稱
+            input_tokens: 輸入 token 數
+            output_tokens: 輸出 token 數
+
+        Returns:
+            成本
+        """
+        price = self.prices.get(model)
+        if price is None:
+            return 0.0
+        return (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000
+
+    def record(
+        self,
+        task_id: str,
+        model: str,
+        executor: str,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cost: Optional[float] = None,
+    ) -> float:
+        """
+        記錄一次調用的用量（緩衝，按數量/時間批量寫入）
+
+        Args:
+            task_id: 任務ID
+            model: 模型名稱
+            executor: 執行器名稱（直連 API 為 direct_api）
+            input_tokens: 輸入 token 數
+            output_tokens: 輸出 token 數
+            cost: 成本，默認按價格表計算
+
+        Returns:
+            本次成本
+        """
+        if cost is None:
+            cost = self.cost_of(model, input_tokens, output_tokens)
+
+        self._pending.append(
+            (task_id, time.time(), str(model), str(executor), input_tokens, output_tokens, cost)
+        )
+        if (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+        return cost
+
+    def flush(self):
+        """寫入緩衝的明細並更新每分鐘匯總（同一事務）"""
+        if not self._pending:
+            return
+
+        rollups: Dict[Tuple[int, str, str], List] = {}
+        for _, at, model, executor, input_tokens, output_tokens, cost in self._pending:
+            bucket = rollups.setdefault((int(at // 60), model, executor), [0, 0, 0, 0.0])
+            bucket[0] += 1
+            bucket[1] += input_tokens
+            bucket[2] += output_tokens
+            bucket[3] += cost
+
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "INSERT INTO usage_ledger "
+            "(task_id, at, model, executor, input_tokens, output_tokens, cost) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self._pending,
+        )
+        cursor.executemany(
+            """
+            INSERT INTO usage_rollup
+                (minute, model, executor, requests, input_tokens, output_tokens, cost)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (minute, model, executor) DO UPDATE SET
+                requests = requests + excluded.requests,
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cost = cost + excluded.cost
+        """,
+            [key + tuple(values) for key, values in rollups.items()],
+        )
+        self.conn.commit()
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def spent(self, window_seconds: float) -> float:
+        """
+        窗口內的總成本（按分鐘匯總，含未寫入的緩衝）
+
+        Args:
+            window_seconds: 時間窗口（秒）
+
+        Returns:
+            成本
+        """
+        since = time.time() - window_seconds
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT COALESCE(SUM(cost), 0) FROM usage_rollup WHERE minute >= ?",
+            (int(since // 60),),
+        )
+        total = cursor.fetchone()[0]
+        return total + sum(entry[6] for entry in self._pending if entry[1] >= since)
+
+    def budget_status(self) -> List[Dict]:
+        """
+        各預算的使用情況
+
+        Returns:
+            [{name, window_seconds, limit, spent, ratio}]
+        """
+        status = []
+        for name, budget in self.budgets.items():
+            spent = self.spent(budget["window_seconds"])
+            status.append(
+                {
+                    "name": name,
+                    "window_seconds": budget["window_seconds"],
+                    "limit": budget["limit"],
+                    "spent": spent,
+                    "ratio": spent / budget["limit"] if budget["limit"] > 0 else 1.0,
+                }
+            )
+        return status
+
+    def near_budget(self) -> bool:
+        """任一預算是否接近上限"""
+        return any(
+            status["ratio"] >= self.budget_threshold for status in self.budget_status()
+        )
+
+    def get_summary(self, window_seconds: float = 3600.0, per_minute: bool = False) -> Dict:
+        """
+        查詢用量匯總（只讀每分鐘匯總表）
+
+        Args:
+            window_seconds: 時間窗口（秒）
+            per_minute: 是否返回每分鐘明細
+
+        Returns:
+            {"totals": [...], "budgets": [...], "minutes": [...]}
+        """
+        self.flush()
+        since_minute = int((time.time() - window_seconds) // 60)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            SELECT model, executor, SUM(requests), SUM(input_tokens),
+                   SUM(output_tokens), SUM(cost)
+            FROM usage_rollup WHERE minute >= ?
+            GROUP BY model, executor ORDER BY SUM(cost) DESC
+        """,
+            (since_minute,),
+        )
+        columns = ("model", "executor", "requests", "input_tokens", "output_tokens", "cost")
+        summary = {
+            "totals": [dict(zip(columns, row)) for row in cursor.fetchall()],
+            "budgets": self.budget_status(),
+        }
+
+        if per_minute:
+            cursor.execute(
+                "SELECT minute * 60, model, executor, requests, input_tokens, output_tokens, cost "
+                "FROM usage_rollup WHERE minute >= ? ORDER BY minute",
+                (since_minute,),
+            )
+            summary["minutes"] = [
+                dict(zip(("at",) + columns, row)) for row in cursor.fetchall()
+            ]
+        return summary
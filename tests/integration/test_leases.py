@@ -0,0 +1,110 @@
+"""
+Multi-instance lease tests: several local processes share one database file
+"""
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from src.state_manager import StateManager, TaskState
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Worker process: wait for the start signal, then claim and finish tasks until the queue is empty
+WORKER = """
+import json, os, sys, time
+from src.state_manager import StateManager, TaskState
+
+db_path, instance_id, go_file, lease_seconds, finish = sys.argv[1:6]
+manager = StateManager(db_path, instance_id=instance_id, lease_seconds=float(lease_seconds))
+while not os.path.exists(go_file):
+    time.sleep(0.005)
+
+claimed = []
+while True:
+    tasks = manager.claim_tasks([TaskState.IDLE], limit=2)
+    if not tasks:
+        break
+    for task in tasks:
+        claimed.append(task.task_id)
+        if finish == "1":
+            time.sleep(0.01)
+            manager.update_state(task.task_id, TaskState.COMPLETED)
+    if finish != "1":
+        break
+print(json.dumps(claimed))
+"""
+
+
+def _start_workers(db_path, go_file, count, lease_seconds=30, finish=True):
+    return [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                WORKER,
+                str(db_path),
+                f"worker-{i}",
+                str(go_file),
+                str(lease_seconds),
+                "1" if finish else "0",
+            ],
+            cwd=REPO_ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for i in range(count)
+    ]
+
+
+def _collect(workers):
+    results = []
+    for worker in workers:
+        output, _ = worker.communicate(timeout=60)
+        assert worker.returncode == 0
+        results.append(json.loads(output))
+    return results
+
+
+def test_processes_claim_each_task_once(tmp_path):
+    """Should hand every queued task to exactly one of several processes"""
+    db_path = tmp_path / "state.db"
+    go_file = tmp_path / "go"
+    manager = StateManager(str(db_path))
+    task_ids = {manager.create_task(f"Task {i}", claim=False) for i in range(40)}
+
+    workers = _start_workers(db_path, go_file, count=4)
+    time.sleep(0.5)
+    go_file.touch()
+    results = _collect(workers)
+
+    claimed = [task_id for result in results for task_id in result]
+    assert sorted(claimed) == sorted(task_ids)
+    assert sum(1 for result in results if result) > 1
+    assert {task.state for task in map(manager.get_task, task_ids)} == {TaskState.COMPLETED}
+
+
+def test_expired_leases_are_taken_over(tmp_path):
+    """Should let a live process take over tasks left behind by a crashed one"""
+    db_path = tmp_path / "state.db"
+    go_file = tmp_path / "go"
+    go_file.touch()
+    manager = StateManager(str(db_path))
+    task_ids = {manager.create_task(f"Task {i}", claim=False) for i in range(2)}
+
+    # The first process claims both tasks with a short lease and exits without finishing
+    (crashed,) = _collect(
+        _start_workers(db_path, go_file, count=1, lease_seconds=0.3, finish=False)
+    )
+    assert set(crashed) == task_ids
+
+    survivor = StateManager(str(db_path), instance_id="survivor")
+    assert survivor.claim_tasks([TaskState.IDLE]) == []
+
+    time.sleep(0.35)
+    taken_over = survivor.claim_tasks([TaskState.IDLE])
+
+    assert {task.task_id for task in taken_over} == task_ids
+    assert {task.owner for task in taken_over} == {"survivor"}
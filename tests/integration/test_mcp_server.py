@@ -1,8 +1,9 @@
 # tests/integration/test_mcp_server.py
 """Test MCP Server integration"""
+import asyncio
 import pytest
 import json
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 
 @pytest.mark.asyncio
@@ -48,3 +49,202 @@ async def test_process_mcp_invalid_json():
         response = json.loads(await orchestrator.process_mcp_message(message))
 
         assert "error" in response
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_create_task_invalid_priority():
+    """测试无效的优先级"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        orchestrator.process_task = AsyncMock()
+
+        message = json.dumps({
+            "method": "create_task",
+            "params": {"description": "Test task", "priority": "urgent"}
+        })
+        response = json.loads(await orchestrator.process_mcp_message(message))
+
+        assert "error" in response
+        orchestrator.process_task.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_get_scheduler_stats():
+    """测试获取调度器指标"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        message = json.dumps({"method": "get_scheduler_stats"})
+        response = json.loads(await orchestrator.process_mcp_message(message))
+
+        assert set(response["result"]["classes"]) == {"interactive", "batch", "24/7"}
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_get_metrics(tmp_path):
+    """测试获取各阶段耗时指标"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+        from src.state_manager import StateManager
+
+        orchestrator = Orchestrator()
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.mcp_client = MagicMock()
+        orchestrator.mcp_client.connect = AsyncMock()
+        orchestrator.mcp_client.call_tool = AsyncMock(return_value="ok")
+        await orchestrator.process_task("Search for news")
+
+        message = json.dumps({"method": "get_metrics"})
+        response = json.loads(await orchestrator.process_mcp_message(message))
+
+        stages = {
+            sample["labels"]["stage"]
+            for sample in response["result"]["omni_stage_duration_seconds"]
+        }
+        assert {"state_write", "route", "queue_wait", "connect", "call_tool", "total"} <= stages
+        assert response["result"]["omni_tasks_total"][0]["labels"] == {"status": "completed"}
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_create_task_with_content_blocks():
+    """测试执行器返回 MCP 内容块时可正常序列化"""
+    from mcp.types import TextContent
+
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        orchestrator.process_task = AsyncMock(
+            return_value={
+                "task_id": "task-1",
+                "status": "completed",
+                "result": [TextContent(type="text", text="done")],
+            }
+        )
+
+        message = json.dumps({"method": "create_task", "params": {"description": "Test"}})
+        response = json.loads(await orchestrator.process_mcp_message(message))
+
+        assert response["result"]["result"][0]["text"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_task_timeline_and_slowest_tasks(tmp_path):
+    """测试查询任务事件时间线与最慢阶段"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+        from src.state_manager import StateManager
+
+        orchestrator = Orchestrator()
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.mcp_client = MagicMock()
+        orchestrator.mcp_client.connect = AsyncMock()
+        orchestrator.mcp_client.call_tool = AsyncMock(return_value="ok")
+        result = await orchestrator.process_task("Search for news")
+
+        message = json.dumps(
+            {"method": "get_task_timeline", "params": {"task_id": result["task_id"]}}
+        )
+        timeline = json.loads(await orchestrator.process_mcp_message(message))["result"]
+        route = next(event for event in timeline if event["kind"] == "route")
+        assert route["executor"] == "openclaw"
+
+        message = json.dumps({"method": "get_slowest_tasks", "params": {"stage": "executing"}})
+        slowest = json.loads(await orchestrator.process_mcp_message(message))["result"]
+        assert slowest[0]["task_id"] == result["task_id"]
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_profile_restricted_to_localhost(tmp_path):
+    """测试 profile 管理方法仅允许本机调用"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        orchestrator.profiler.output_dir = str(tmp_path)
+        message = json.dumps({"method": "profile", "params": {"seconds": 0.05}})
+
+        remote = json.loads(
+            await orchestrator.process_mcp_message(message, peer=("10.0.0.5", 50000))
+        )
+        local = json.loads(
+            await orchestrator.process_mcp_message(message, peer=("127.0.0.1", 50000))
+        )
+
+        assert "restricted to localhost" in remote["error"]
+        assert local["result"]["output"].startswith(str(tmp_path))
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_get_task_result_chunks(tmp_path):
+    """测试任务结果持久化并可分块读取"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+        from src.result_store import ResultStore
+        from src.state_manager import StateManager
+
+        orchestrator = Orchestrator()
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.result_store = ResultStore(
+            orchestrator.state_manager.conn, chunk_size=100, compress_threshold=100
+        )
+        output = "x" * 250
+        orchestrator.mcp_client = MagicMock()
+        orchestrator.mcp_client.connect = AsyncMock()
+        orchestrator.mcp_client.call_tool = AsyncMock(return_value=output)
+        result = await orchestrator.process_task("Search for news")
+
+        message = json.dumps(
+            {"method": "get_task_status", "params": {"task_id": result["task_id"]}}
+        )
+        status = json.loads(await orchestrator.process_mcp_message(message))["result"]
+        assert status["result_info"]["chunks"] == 3
+
+        data = ""
+        for chunk in range(status["result_info"]["chunks"]):
+            message = json.dumps(
+                {
+                    "method": "get_task_result",
+                    "params": {"task_id": result["task_id"], "chunk": chunk},
+                }
+            )
+            data += json.loads(await orchestrator.process_mcp_message(message))["result"]["data"]
+        assert json.loads(data) == output
+
+        message = json.dumps(
+            {"method": "get_task_result", "params": {"task_id": result["task_id"], "chunk": 3}}
+        )
+        assert json.loads(await orchestrator.process_mcp_message(message))["error"] == (
+            "Result not found"
+        )
+
+
+@pytest.mark.asyncio
+async def test_process_mcp_create_task_queued(tmp_path):
+    """测试不等待结果的任务进入共享队列，由有空闲容量的实例认领执行"""
+    with patch("src.orchestrator.Config"):
+        from src.orchestrator import Orchestrator
+        from src.state_manager import StateManager
+
+        orchestrator = Orchestrator()
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.mcp_client = MagicMock()
+        orchestrator.mcp_client.connect = AsyncMock()
+        orchestrator.mcp_client.call_tool = AsyncMock(return_value="ok")
+
+        message = json.dumps(
+            {"method": "create_task", "params": {"description": "Search for news", "wait": False}}
+        )
+        queued = json.loads(await orchestrator.process_mcp_message(message))["result"]
+        assert queued["status"] == "queued"
+        assert orchestrator.state_manager.get_task(queued["task_id"]).owner is None
+
+        assert len(orchestrator.lease_keeper.pull()) == 1
+        await asyncio.gather(*orchestrator.lease_keeper._pulls)
+
+        task = orchestrator.state_manager.get_task(queued["task_id"])
+        assert task.state.value == "completed"
+        assert task.owner == orchestrator.state_manager.instance_id
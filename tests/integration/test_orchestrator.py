@@ -5,7 +5,7 @@ Integration tests for main orchestrator
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from src.orchestrator import Orchestrator
-from src.state_manager import TaskState
+from src.state_manager import TaskRecord, TaskState
 from src.fault_handler import SystemState
 
 
@@ -37,10 +37,9 @@ class TestOrchestrator:
                         "complexity": 30,
                     }
                     mock_state.create_task.return_value = "task_123"
-                    mock_state.get_task.return_value = {
-                        "task_id": "task_123",
-                        "state": TaskState.IDLE.value,
-                    }
+                    mock_state.get_task.return_value = TaskRecord(
+                        "task_123", "List files in directory", TaskState.IDLE, 0.0, 0.0
+                    )
 
                     # Process task
                     result = await orchestrator.process_task("List files in directory")
@@ -76,8 +75,8 @@ class TestOrchestrator:
             with patch.object(orchestrator, "state_manager") as mock_state:
                 mock_fault.system_state = SystemState.BRAINSTEM
                 mock_state.get_pending_tasks.return_value = [
-                    {"task_id": "task_1", "state": TaskState.EXECUTING.value},
-                    {"task_id": "task_2", "state": TaskState.DISPATCHING.value},
+                    TaskRecord("task_1", "Task 1", TaskState.EXECUTING, 0.0, 0.0),
+                    TaskRecord("task_2", "Task 2", TaskState.DISPATCHING, 0.0, 0.0),
                 ]
 
                 await orchestrator.enter_brainstem_mode()
@@ -92,7 +91,7 @@ class TestOrchestrator:
             with patch.object(orchestrator, "state_manager") as mock_state:
                 mock_fault.system_state = SystemState.NORMAL
                 mock_state.get_pending_tasks.return_value = [
-                    {"task_id": "task_1", "state": TaskState.WAITING_FOR_CLOUD.value},
+                    TaskRecord("task_1", "Task 1", TaskState.WAITING_FOR_CLOUD, 0.0, 0.0),
                 ]
 
                 await orchestrator.recover_from_brainstem()
@@ -129,11 +128,9 @@ class TestOrchestrator:
                         MagicMock(content="Success"),
                     ]
                 )
-                mock_state.get_task.return_value = {
-                    "task_id": "task_123",
-                    "state": TaskState.EXECUTING.value,
-                    "description": "Test task",
-                }
+                mock_state.get_task.return_value = TaskRecord(
+                    "task_123", "Test task", TaskState.EXECUTING, 0.0, 0.0
+                )
 
                 result = await orchestrator.execute_with_retry(
                     "task_123", max_retries=2, base_delay=0.01
@@ -158,3 +155,720 @@ class TestOrchestrator:
                 mock_mcp.disconnect.assert_called_once()
                 # State manager should persist state
                 assert mock_state.conn is not None
+
+    @pytest.mark.asyncio
+    async def test_duplicate_tasks_share_one_execution(self, orchestrator, tmp_path):
+        """Should execute identical concurrent requests once and audit the share"""
+        import asyncio
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+
+        async def slow_call(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            return MagicMock(content="Shared result")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=slow_call)
+
+            results = await asyncio.gather(
+                orchestrator.process_task("Search for Python news"),
+                orchestrator.process_task("Search  for Python news"),
+            )
+
+        assert mock_mcp.call_tool.call_count == 1
+        assert all(r["result"] == "Shared result" for r in results)
+        follower = orchestrator.state_manager.get_task(results[1]["task_id"])
+        assert follower.result_source == "coalesced"
+        assert follower.source_task_id == results[0]["task_id"]
+
+    @pytest.mark.asyncio
+    async def test_follower_keeps_shared_result_when_owner_cancelled(
+        self, orchestrator, tmp_path
+    ):
+        """Should store the shared result under a follower whose owner was cancelled"""
+        import asyncio
+        import json
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def call_tool(tool_name, **kwargs):
+            started.set()
+            await release.wait()
+            return MagicMock(content="Shared result")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            owner = asyncio.create_task(orchestrator.process_task("Search for Python news"))
+            await started.wait()
+            owner_id = next(iter(orchestrator._running_tasks))
+            follower = asyncio.create_task(orchestrator.process_task("Search for Python news"))
+            # Wait for the duplicate to join the shared execution
+            calls = orchestrator.single_flight._calls
+            while not calls or len(next(iter(calls.values())).waiters) < 2:
+                await asyncio.sleep(0.001)
+
+            assert (await orchestrator.cancel_task(owner_id))["status"] == "cancelled"
+            release.set()
+            result = await follower
+            await owner
+
+        assert mock_mcp.call_tool.call_count == 1
+        assert result["status"] == "completed"
+        task = orchestrator.state_manager.get_task(result["task_id"])
+        assert task.source_task_id is None
+        response = json.loads(
+            await orchestrator.process_mcp_message(
+                json.dumps(
+                    {"method": "get_task_result", "params": {"task_id": result["task_id"]}}
+                )
+            )
+        )
+        assert json.loads(response["result"]["data"]) == "Shared result"
+
+    @pytest.mark.asyncio
+    async def test_cached_result_recorded_on_task(self, orchestrator, tmp_path):
+        """Should serve repeated requests from the opt-in cache"""
+        from src.result_cache import ResultCache
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.result_cache = ResultCache(
+            orchestrator.state_manager.conn, enabled=True
+        )
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(return_value=MagicMock(content="Result"))
+
+            first = await orchestrator.process_task("Search for Python news")
+            second = await orchestrator.process_task("Search for Python news")
+
+        assert mock_mcp.call_tool.call_count == 1
+        assert second["cached"] is True
+        task = orchestrator.state_manager.get_task(second["task_id"])
+        assert task.state == TaskState.COMPLETED
+        assert task.result_source == "cache"
+        assert task.source_task_id == first["task_id"]
+
+    @pytest.mark.asyncio
+    async def test_retry_budget_exhaustion_fails_fast(self, orchestrator):
+        """Should stop retrying once the global retry budget is spent"""
+        from src.retry_scheduler import RetryBudget
+
+        orchestrator.retry_scheduler.budget = RetryBudget(
+            ratio=0, min_retries_per_second=0
+        )
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            with patch.object(orchestrator, "state_manager") as mock_state:
+                mock_mcp.call_tool = AsyncMock(side_effect=Exception("Outage"))
+                mock_state.get_task.return_value = TaskRecord(
+                    "task_123", "Test task", TaskState.EXECUTING, 0.0, 0.0
+                )
+
+                result = await orchestrator.execute_with_retry("task_123", max_retries=3)
+
+                assert result["status"] == "failed"
+                assert result["retry_budget_exhausted"] is True
+                assert mock_mcp.call_tool.call_count == 1
+                mock_state.update_state.assert_called_with("task_123", TaskState.FAILED)
+
+    @pytest.mark.asyncio
+    async def test_deadline_exceeded_cancels_executor(self, orchestrator, tmp_path):
+        """Should fail the task at its deadline and forward cancellation"""
+        import asyncio
+        import time
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+
+        async def call_tool(tool_name, **kwargs):
+            if tool_name == "execute_task":
+                await asyncio.sleep(10)
+            return MagicMock(content="cancelled")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            result = await orchestrator.process_task(
+                "Search for Python news", deadline=time.time() + 0.05
+            )
+
+            assert result["status"] == "failed"
+            assert result["error"] == "Deadline exceeded"
+            await asyncio.sleep(0.01)
+            tools = [c.args[0] for c in mock_mcp.call_tool.call_args_list]
+            assert tools == ["execute_task", "cancel_task"]
+
+        task = orchestrator.state_manager.get_task(result["task_id"])
+        assert task.state == TaskState.FAILED
+
+    @pytest.mark.asyncio
+    async def test_recovered_task_keeps_its_deadline(self, orchestrator, tmp_path):
+        """Should fail a recovered task whose stored deadline has passed without executing it"""
+        import time
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        task_id = orchestrator.state_manager.create_task(
+            "Search for Python news", deadline=time.time() - 1
+        )
+        orchestrator.state_manager.update_state(task_id, TaskState.DISPATCHING)
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(return_value=MagicMock(content="done"))
+
+            report = await orchestrator.recovery.run()
+
+            assert report["redispatch"] == 1
+            mock_mcp.call_tool.assert_not_called()
+
+        assert orchestrator.state_manager.get_task(task_id).state == TaskState.FAILED
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_task(self, orchestrator, tmp_path):
+        """Should cancel a running task and record the CANCELLED state"""
+        import asyncio
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        started = asyncio.Event()
+
+        async def call_tool(tool_name, **kwargs):
+            if tool_name == "execute_task":
+                started.set()
+                await asyncio.sleep(10)
+            return MagicMock(content="ok")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            pending = asyncio.create_task(orchestrator.process_task("Search for news"))
+            await started.wait()
+            task_id = next(iter(orchestrator._running_tasks))
+
+            cancelled = await orchestrator.cancel_task(task_id)
+            result = await pending
+
+            assert cancelled["status"] == "cancelled"
+            assert result["status"] == "cancelled"
+            mock_mcp.call_tool.assert_called_with(
+                "cancel_task", executor="openclaw", task_id=task_id
+            )
+
+        task = orchestrator.state_manager.get_task(task_id)
+        assert task.state == TaskState.CANCELLED
+        assert (await orchestrator.cancel_task(task_id))["error"] == "Task already cancelled"
+
+    @pytest.mark.asyncio
+    async def test_cancel_on_another_instance(self, orchestrator, tmp_path):
+        """Should stop a running task cancelled elsewhere and release a claimed one"""
+        import asyncio
+        from src.lease_keeper import LeaseKeeper
+        from src.state_manager import StateManager
+
+        db_path = str(tmp_path / "state.db")
+        orchestrator.state_manager = StateManager(db_path, instance_id="a")
+        other = StateManager(db_path, instance_id="b")
+        started = asyncio.Event()
+
+        async def call_tool(tool_name, **kwargs):
+            if tool_name == "execute_task":
+                started.set()
+                await asyncio.sleep(10)
+            return MagicMock(content="ok")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            pending = asyncio.create_task(orchestrator.process_task("Search for news"))
+            await started.wait()
+            task_id = next(iter(orchestrator._running_tasks))
+
+            # Instance b does not run the task, so its cancel only records the state
+            other.update_state(task_id, TaskState.CANCELLED)
+            assert LeaseKeeper(orchestrator).heartbeat() == [task_id]
+            result = await pending
+
+        assert result["status"] == "cancelled"
+        assert orchestrator.state_manager.get_task(task_id).state == TaskState.CANCELLED
+
+        queued = orchestrator.state_manager.create_task("Queued task")
+        orchestrator.recovery.claimed.add(queued)
+        assert (await orchestrator.cancel_task(queued))["status"] == "cancelled"
+        assert queued not in orchestrator.owned_task_ids()
+
+    @pytest.mark.asyncio
+    async def test_hot_reload_reaches_components(self, orchestrator, tmp_path):
+        """Should push reloaded config into fault handler, router and clients"""
+        config_file = tmp_path / "reload.yaml"
+        config_file.write_text("model_list: []\n")
+        orchestrator.config.config_path = str(config_file)
+        old_client = orchestrator.mcp_client
+
+        config_file.write_text(
+            "mcp_server_url: ws://10.0.0.1:18789\n"
+            "fault_handler:\n  consecutive_failures_threshold: 7\n"
+            "router:\n  complexity_threshold: 20\n"
+        )
+        old_config = orchestrator.config.reload()
+        changed = await orchestrator.apply_config(old_config, orchestrator.config.config)
+
+        assert "fault_handler" in changed
+        assert orchestrator.fault_handler.consecutive_failures_threshold == 7
+        assert orchestrator.router.complexity_threshold == 20
+        assert orchestrator.mcp_client is not old_client
+        assert orchestrator.mcp_client.server_url == "ws://10.0.0.1:18789"
+        assert orchestrator.router.mcp_client is orchestrator.mcp_client
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_in_flight_tasks(self, orchestrator, tmp_path):
+        """Should finish in-flight tasks within the timeout and reject new ones"""
+        import asyncio
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        started = asyncio.Event()
+
+        async def call_tool(tool_name, **kwargs):
+            started.set()
+            await asyncio.sleep(0.05)
+            return MagicMock(content="ok")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            pending = asyncio.create_task(orchestrator.process_task("Search for news"))
+            await started.wait()
+
+            report = await orchestrator.drain(timeout=5)
+            result = await pending
+            rejected = await orchestrator.process_task("Search for more news")
+
+        assert report["completed"] == 1
+        assert report["checkpointed"] == 0
+        assert result["status"] == "completed"
+        assert rejected["status"] == "rejected"
+
+    @pytest.mark.asyncio
+    async def test_drain_checkpoints_unfinished_tasks(self, orchestrator, tmp_path):
+        """Should checkpoint tasks still running at the drain deadline back to IDLE"""
+        import asyncio
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        started = asyncio.Event()
+
+        async def call_tool(tool_name, **kwargs):
+            if tool_name == "execute_task":
+                started.set()
+                await asyncio.sleep(10)
+            return MagicMock(content="ok")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            pending = asyncio.create_task(orchestrator.process_task("Search for news"))
+            await started.wait()
+            task_id = next(iter(orchestrator._running_tasks))
+
+            report = await orchestrator.drain(timeout=0.01)
+            result = await pending
+
+            mock_mcp.call_tool.assert_called_with(
+                "cancel_task", executor="openclaw", task_id=task_id
+            )
+
+        assert report["checkpointed"] == 1
+        assert result["status"] == "interrupted"
+        task = orchestrator.state_manager.get_task(task_id)
+        assert task.state == TaskState.IDLE
+
+    @pytest.mark.asyncio
+    async def test_usage_recorded_and_budget_steers_routing(self, orchestrator, tmp_path):
+        """Should record direct API usage and route to the free model once over budget"""
+        import json
+        from src.state_manager import StateManager
+        from src.usage_ledger import UsageLedger
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.usage_ledger = UsageLedger(
+            orchestrator.state_manager.conn,
+            prices={"claude-3-5-sonnet-20241022": {"input": 3.0, "output": 15.0}},
+            budgets={"daily": {"window_seconds": 86400, "limit": 0.01}},
+        )
+        orchestrator.router.budget_guard = orchestrator.usage_ledger.near_budget
+        orchestrator.router.free_model = "cliproxy/claude"
+
+        with patch.object(orchestrator, "fault_handler") as mock_fault:
+            mock_fault.system_state = SystemState.DEGRADED
+            mock_fault.fallback_to_direct_api = AsyncMock(
+                return_value={
+                    "model": "claude-3-5-sonnet-20241022",
+                    "content": "Response",
+                    "usage": {"input_tokens": 1000, "output_tokens": 1000},
+                }
+            )
+            await orchestrator.process_task("Urgent task")
+
+        response = json.loads(
+            await orchestrator.process_mcp_message(json.dumps({"method": "get_usage"}))
+        )
+        totals = response["result"]["totals"]
+        assert totals[0]["executor"] == "direct_api"
+        assert totals[0]["input_tokens"] == 1000
+        assert abs(totals[0]["cost"] - 0.018) < 1e-9
+        assert response["result"]["budgets"][0]["ratio"] > 1
+
+        route = orchestrator.router.route_task({"description": "Design a system"})
+        assert route["model"] == "cliproxy/claude"
+        assert route["budget_limited"] is True
+
+    @pytest.mark.asyncio
+    async def test_degraded_repeats_served_from_response_cache(self, orchestrator, tmp_path):
+        """Should call the direct API once for repeated prompts unless flagged non-deterministic"""
+        import json
+        from src.fault_state import FaultStateStore
+        from src.response_cache import ResponseCache
+        from src.state_manager import StateManager
+        from src.usage_ledger import UsageLedger
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.usage_ledger = UsageLedger(orchestrator.state_manager.conn)
+        orchestrator.fault_handler.response_cache = ResponseCache(orchestrator.state_manager.conn)
+        orchestrator.fault_handler.attach_store(
+            FaultStateStore(orchestrator.state_manager.conn, "test")
+        )
+        orchestrator.fault_handler.system_state = SystemState.DEGRADED
+
+        with patch("src.fault_handler.httpx.AsyncClient") as mock_client:
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "model": "claude-3-5-sonnet-20241022",
+                "content": "Healthy",
+                "usage": {"input_tokens": 40, "output_tokens": 10},
+            }
+            mock_client.return_value.__aenter__ = AsyncMock(return_value=mock_client.return_value)
+            mock_client.return_value.post = AsyncMock(return_value=mock_response)
+
+            for _ in range(3):
+                result = await orchestrator.process_task("Health probe")
+                assert result["status"] == "completed"
+            await orchestrator.process_mcp_message(
+                json.dumps(
+                    {
+                        "method": "create_task",
+                        "params": {"description": "Health probe", "deterministic": False},
+                    }
+                )
+            )
+
+            assert mock_client.return_value.post.call_count == 2
+
+        stats = json.loads(
+            await orchestrator.process_mcp_message(json.dumps({"method": "get_cache_stats"}))
+        )["result"]
+        assert stats["hits"] == 2
+        assert stats["saved_input_tokens"] == 80
+        usage = orchestrator.usage_ledger.get_summary(window_seconds=60)
+        assert usage["totals"][0]["input_tokens"] == 80
+
+    @pytest.mark.asyncio
+    async def test_executor_session_warms_up_while_queued(self, orchestrator, tmp_path):
+        """Should acquire the executor session during the queue wait and record time-to-dispatch"""
+        import asyncio
+        from src.scheduler import TaskScheduler
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.scheduler = TaskScheduler(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def call_tool(name, timeout=None, **arguments):
+            await release.wait()
+            return MagicMock(content=f"done {arguments['description']}")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            first = asyncio.create_task(orchestrator.process_task("First task"))
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(orchestrator.process_task("Second task"))
+            await asyncio.sleep(0.01)
+
+            # The second task holds no slot yet, but its session is already acquired
+            # and its deferred DISPATCHING write has been committed
+            assert mock_mcp.call_tool.call_count == 1
+            assert mock_mcp.connect.call_count == 2
+            queued = [
+                task_id
+                for task_id in orchestrator._running_tasks
+                if orchestrator.state_manager.get_task(task_id).state == TaskState.DISPATCHING
+            ]
+            assert len(queued) == 1
+
+            release.set()
+            results = await asyncio.gather(first, second)
+
+        assert [r["status"] for r in results] == ["completed", "completed"]
+        dispatch = [
+            event
+            for event in orchestrator.state_manager.get_task_events(results[1]["task_id"])
+            if event["kind"] == "dispatch"
+        ]
+        assert dispatch[0]["executor"] == "openclaw"
+        assert dispatch[0]["ms"] >= 10
+        samples = [
+            sample
+            for sample in orchestrator.metrics.stage_duration.snapshot()
+            if sample["labels"]["stage"] == "time_to_dispatch"
+        ]
+        assert sum(sample["count"] for sample in samples) == 2
+
+    @pytest.mark.asyncio
+    async def test_session_history_reaches_router_and_executor(self, orchestrator, tmp_path):
+        """Should route on the stored history and send it to the executor"""
+        from src.conversation_store import ConversationStore
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        orchestrator.conversations = ConversationStore(orchestrator.state_manager.conn)
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(return_value=MagicMock(content="Here they are"))
+
+            await orchestrator.process_task("List files", session_id="s1")
+            first = mock_mcp.call_tool.call_args.kwargs
+            result = await orchestrator.process_task("List files", session_id="s1")
+            second = mock_mcp.call_tool.call_args.kwargs
+
+        assert "conversation_history" not in first
+        assert second["conversation_history"] == [
+            {"role": "user", "content": "List files"},
+            {"role": "assistant", "content": "Here they are"},
+        ]
+        # The same request with context must not reuse the context-free execution
+        assert "cached" not in result
+        assert mock_mcp.call_tool.await_count == 2
+        assert len(orchestrator.conversations.get("s1")) == 4
+        assert orchestrator.state_manager.get_task(result["task_id"]).session_id == "s1"
+
+    @pytest.mark.asyncio
+    async def test_subtasks_fan_out_across_executors(self, orchestrator, tmp_path):
+        """Should run independent subtasks in parallel and aggregate their results"""
+        import asyncio
+        import json
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        in_flight = []
+        peak = []
+
+        async def call_tool(name, timeout=None, **arguments):
+            in_flight.append(arguments["executor"])
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(arguments["executor"])
+            return MagicMock(content=f"done {arguments['description']}")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            message = json.dumps(
+                {
+                    "method": "create_task",
+                    "params": {
+                        "description": "Implement X and write docs for Y",
+                        "subtasks": [
+                            {"id": "code", "description": "Implement feature X"},
+                            {"id": "docs", "description": "Write docs for Y"},
+                            {"description": "Summarize", "depends_on": ["code", "docs"]},
+                        ],
+                    },
+                }
+            )
+            result = json.loads(await orchestrator.process_mcp_message(message))["result"]
+
+        assert result["status"] == "completed"
+        subtasks = result["result"]["subtasks"]
+        assert [s["result"] for s in subtasks] == [
+            "done Implement feature X",
+            "done Write docs for Y",
+            "done Summarize",
+        ]
+        executors = [c.kwargs["executor"] for c in mock_mcp.call_tool.call_args_list]
+        assert sorted(executors[:2]) == ["claude_code", "openclaw"]
+        assert max(peak) == 2
+
+        tree = json.loads(
+            await orchestrator.process_mcp_message(
+                json.dumps({"method": "get_task_tree", "params": {"task_id": result["task_id"]}})
+            )
+        )["result"]
+        assert tree["state"] == "completed"
+        assert [node["state"] for node in tree["subtasks"]] == ["completed"] * 3
+        assert tree["subtasks"][2]["depends_on"] == [s["task_id"] for s in subtasks[:2]]
+
+    @pytest.mark.asyncio
+    async def test_failed_subtask_fails_parent(self, orchestrator, tmp_path):
+        """Should skip dependents of a failed subtask and fail the parent"""
+        from src.state_manager import StateManager
+        from src.task_graph import parse_subtasks
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+
+        async def call_tool(name, timeout=None, **arguments):
+            if arguments["description"] == "Build":
+                raise RuntimeError("Build broke")
+            return MagicMock(content="ok")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            result = await orchestrator.process_task(
+                "Build and ship",
+                subtasks=parse_subtasks(
+                    [
+                        {"description": "Build"},
+                        {"description": "Ship", "depends_on": [0]},
+                        {"description": "Announce"},
+                    ]
+                ),
+            )
+
+        assert result["status"] == "failed"
+        statuses = [s["status"] for s in result["result"]["subtasks"]]
+        assert statuses == ["failed", "skipped", "completed"]
+        states = [
+            t.state for t in orchestrator.state_manager.get_subtasks(result["task_id"])
+        ]
+        assert states == [TaskState.FAILED, TaskState.CANCELLED, TaskState.COMPLETED]
+        assert orchestrator.state_manager.get_task(result["task_id"]).state == TaskState.FAILED
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("stop", ["cancel", "deadline"])
+    async def test_stopped_parent_cancels_unstarted_subtasks(self, orchestrator, tmp_path, stop):
+        """Should cancel running and not-yet-started subtasks when the parent stops mid-graph"""
+        import asyncio
+        import time
+        from src.state_manager import StateManager
+        from src.task_graph import parse_subtasks
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        started = asyncio.Event()
+
+        async def call_tool(name, timeout=None, **arguments):
+            if name == "execute_task" and arguments["description"] == "Build":
+                started.set()
+                await asyncio.sleep(10)
+            return MagicMock(content="ok")
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            pending = asyncio.create_task(
+                orchestrator.process_task(
+                    "Build and ship",
+                    deadline=time.time() + 0.2 if stop == "deadline" else None,
+                    subtasks=parse_subtasks(
+                        [
+                            {"description": "Build"},
+                            {"description": "Ship", "depends_on": [0]},
+                            {"description": "Announce"},
+                        ]
+                    ),
+                )
+            )
+            await started.wait()
+            parent = orchestrator.state_manager.get_task(
+                next(iter(orchestrator._running_tasks))
+            )
+            parent_id = parent.parent_id or parent.task_id
+            announce = orchestrator.state_manager.get_subtasks(parent_id)[2].task_id
+            while orchestrator.state_manager.get_task(announce).state != TaskState.COMPLETED:
+                await asyncio.sleep(0.01)
+            if stop == "cancel":
+                await orchestrator.cancel_task(parent_id)
+            result = await pending
+
+        expected = "cancelled" if stop == "cancel" else "failed"
+        assert result["status"] == expected
+        manager = orchestrator.state_manager
+        assert manager.get_task(parent_id).state == TaskState(expected)
+        # The running subtask stops on its own; the one that never started is cancelled
+        states = [t.state for t in manager.get_subtasks(parent_id)]
+        assert states == [TaskState(expected), TaskState.CANCELLED, TaskState.COMPLETED]
+        assert orchestrator.recovery.claim(include_own=True) == []
+
+    @pytest.mark.asyncio
+    async def test_resumed_parent_reuses_finished_subtasks(self, orchestrator, tmp_path):
+        """Should rerun only unfinished subtasks when a parent is resumed"""
+        from src.state_manager import StateManager
+
+        orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+        manager = orchestrator.state_manager
+        parent = manager.create_task("Parent")
+        done, pending = manager.create_subtasks(parent, [("Done", []), ("Pending", [0])])
+        orchestrator.result_store.put(done, "earlier")
+        manager.update_state(done, TaskState.COMPLETED)
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(return_value=MagicMock(content="now"))
+
+            result = await orchestrator.resume_task(parent, "Parent")
+
+        assert mock_mcp.call_tool.await_count == 1
+        assert [s["result"] for s in result["result"]["subtasks"]] == ["earlier", "now"]
+        assert manager.get_task(pending).state == TaskState.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_traffic_recorder_captures_requests_and_executions(self, orchestrator):
+        """Should record MCP requests and executor calls, including failures"""
+        import json
+        from src.traffic_capture import TrafficRecorder
+
+        orchestrator.traffic_recorder = TrafficRecorder(enabled=True)
+
+        async def call_tool(name, timeout=None, **arguments):
+            if arguments["description"] == "Broken task":
+                raise RuntimeError("Executor crashed")
+            return {"content": "ok", "usage": {"input_tokens": 12, "output_tokens": 3}}
+
+        with patch.object(orchestrator, "mcp_client") as mock_mcp:
+            mock_mcp.connect = AsyncMock()
+            mock_mcp.call_tool = AsyncMock(side_effect=call_tool)
+
+            for description in ("List files", "Broken task"):
+                await orchestrator.process_mcp_message(
+                    json.dumps({"method": "create_task", "params": {"description": description}})
+                )
+            await orchestrator.process_mcp_message(json.dumps({"method": "ping"}))
+
+        records = orchestrator.traffic_recorder.records
+        requests = [r for r in records if r["k"] == "req"]
+        executions = [r for r in records if r["k"] == "exec"]
+        assert [r["s"] for r in requests] == ["completed", "failed"]
+        assert [(r["d"], r["e"], r["in"]) for r in executions] == [
+            ("List files", "openclaw", 12),
+            ("Broken task", "openclaw", 0),
+        ]
+        assert executions[1]["err"] == "Executor crashed"
+        assert executions[0]["task"] == requests[0]["task"]
@@ -0,0 +1,254 @@
+"""
+Batch ingest tests
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import MagicMock
+
+from src.batch_ingest import BatchIngest, main
+
+
+def _write_tasks(path, descriptions):
+    lines = (json.dumps({"id": f"t{i}", "description": d}) for i, d in enumerate(descriptions))
+    path.write_text("".join(line + "\n" for line in lines))
+
+
+def _rows(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _orchestrator(delays=None, fail_on=None):
+    """Orchestrator stand-in that tracks concurrency and can abort on a description"""
+    orchestrator = MagicMock()
+    orchestrator.running = 0
+    orchestrator.peak = 0
+
+    async def process_task(description, **kwargs):
+        if description == fail_on:
+            raise RuntimeError("executor crashed")
+        orchestrator.running += 1
+        orchestrator.peak = max(orchestrator.peak, orchestrator.running)
+        await asyncio.sleep((delays or {}).get(description, 0))
+        orchestrator.running -= 1
+        return {"task_id": f"id-{description}", "status": "completed", "result": description}
+
+    orchestrator.process_task = process_task
+    return orchestrator
+
+
+class TestBatchIngest:
+    """Test streaming JSONL ingest with checkpoints"""
+
+    @pytest.mark.asyncio
+    async def test_streams_results_with_bounded_concurrency(self, tmp_path):
+        """Should process every line, never exceeding the concurrency limit"""
+        tasks = tmp_path / "tasks.jsonl"
+        _write_tasks(tasks, [f"task {i}" for i in range(20)])
+        orchestrator = _orchestrator(delays={f"task {i}": 0.001 * (i % 4) for i in range(20)})
+
+        report = await BatchIngest(
+            orchestrator, str(tasks), str(tmp_path / "out.jsonl"), concurrency=3
+        ).run()
+
+        rows = _rows(tmp_path / "out.jsonl")
+        assert report["completed"] == 20
+        assert report["line"] == 20
+        assert orchestrator.peak == 3
+        assert sorted(row["line"] for row in rows) == list(range(1, 21))
+        assert {row["id"] for row in rows} == {f"t{i}" for i in range(20)}
+
+    @pytest.mark.asyncio
+    async def test_invalid_and_blank_lines(self, tmp_path):
+        """Should report malformed lines as failed rows and skip blank lines"""
+        tasks = tmp_path / "tasks.jsonl"
+        tasks.write_text('{"description": "ok"}\n\nnot json\n{"id": 1}\n')
+
+        report = await BatchIngest(
+            _orchestrator(), str(tasks), str(tmp_path / "out.jsonl")
+        ).run()
+
+        rows = {row["line"]: row for row in _rows(tmp_path / "out.jsonl")}
+        assert rows[1]["status"] == "completed"
+        assert rows[2]["status"] == "skipped"
+        assert rows[3]["error"].startswith("Invalid JSON")
+        assert rows[4]["error"] == "Missing description"
+        assert report["failed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_malformed_fields_fail_the_line_only(self, tmp_path):
+        """Should fail lines with bad timeout, deadline, priority or session and keep going"""
+        tasks = tmp_path / "tasks.jsonl"
+        lines = [
+            {"description": "a", "timeout": "soon"},
+            {"description": "b", "deadline": "tomorrow"},
+            {"description": "c", "priority": "urgent"},
+            {"description": "d", "session_id": 5},
+            {"description": "e", "timeout": 30},
+        ]
+        tasks.write_text("".join(json.dumps(line) + "\n" for line in lines))
+        output = tmp_path / "out.jsonl"
+
+        report = await BatchIngest(_orchestrator(), str(tasks), str(output)).run()
+
+        rows = {row["line"]: row for row in _rows(output)}
+        assert rows[1]["error"] == "Invalid timeout or deadline"
+        assert rows[2]["error"] == "Invalid timeout or deadline"
+        assert rows[3]["error"] == "Invalid priority: urgent"
+        assert rows[4]["error"] == "Invalid session_id"
+        assert rows[5]["status"] == "completed"
+        assert report["failed"] == 4
+        assert json.loads((tmp_path / "out.jsonl.checkpoint").read_text())["line"] == 5
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_checkpoint(self, tmp_path):
+        """Should resume after a crash without losing or duplicating output rows"""
+        tasks = tmp_path / "tasks.jsonl"
+        output = tmp_path / "out.jsonl"
+        _write_tasks(tasks, [f"task {i}" for i in range(10)])
+
+        with pytest.raises(RuntimeError):
+            await BatchIngest(
+                _orchestrator(fail_on="task 6"),
+                str(tasks),
+                str(output),
+                concurrency=1,
+                checkpoint_every=2,
+            ).run()
+        checkpoint = json.loads((tmp_path / "out.jsonl.checkpoint").read_text())
+        assert checkpoint["line"] == 6
+
+        orchestrator = _orchestrator()
+        report = await BatchIngest(orchestrator, str(tasks), str(output)).run()
+
+        lines = [row["line"] for row in _rows(output)]
+        assert sorted(lines) == list(range(1, 11))
+        assert report["resumed_from"] == 6
+        assert report["completed"] == 4
+
+        # A finished file is a no-op on re-run
+        report = await BatchIngest(orchestrator, str(tasks), str(output)).run()
+        assert report["completed"] == 0
+        assert len(_rows(output)) == 10
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_tracks_out_of_order_completion(self, tmp_path):
+        """Should only advance the watermark past contiguous completed lines"""
+        tasks = tmp_path / "tasks.jsonl"
+        _write_tasks(tasks, ["slow", "fast 1", "fast 2"])
+        ingest = BatchIngest(
+            _orchestrator(delays={"slow": 0.05}),
+            str(tasks),
+            str(tmp_path / "out.jsonl"),
+            concurrency=3,
+            checkpoint_every=1,
+        )
+        run = asyncio.create_task(ingest.run())
+        await asyncio.sleep(0.02)
+
+        checkpoint = json.loads((tmp_path / "out.jsonl.checkpoint").read_text())
+        assert checkpoint["line"] == 0
+        assert checkpoint["done"] == [2, 3]
+        await run
+        assert ingest._line == 3
+
+    @pytest.mark.asyncio
+    async def test_stop_finishes_in_flight_tasks(self, tmp_path):
+        """Should stop reading new lines once stopping is set"""
+        tasks = tmp_path / "tasks.jsonl"
+        _write_tasks(tasks, [f"task {i}" for i in range(50)])
+        ingest = BatchIngest(
+            _orchestrator(delays={f"task {i}": 0.01 for i in range(50)}),
+            str(tasks),
+            str(tmp_path / "out.jsonl"),
+            concurrency=2,
+        )
+        run = asyncio.create_task(ingest.run())
+        await asyncio.sleep(0.015)
+        ingest.stopping.set()
+        report = await run
+
+        assert report["interrupted"] is True
+        assert report["line"] < 50
+        assert len(_rows(tmp_path / "out.jsonl")) == report["line"]
+
+    @pytest.mark.asyncio
+    async def test_cli_runs_through_orchestrator(self, tmp_path, monkeypatch):
+        """Should drive the real orchestrator pipeline from the command line"""
+        from unittest.mock import AsyncMock, patch
+
+        monkeypatch.chdir(tmp_path)
+        config = tmp_path / "config.yaml"
+        config.write_text("model_list: []\nconfig_watch:\n  enabled: false\n")
+        tasks = tmp_path / "tasks.jsonl"
+        _write_tasks(tasks, ["first", "second"])
+
+        with patch("src.orchestrator.MCPClient") as mock_client:
+            mock_client.return_value.session = None
+            mock_client.return_value.connect = AsyncMock()
+            mock_client.return_value.disconnect = AsyncMock()
+            mock_client.return_value.call_tool = AsyncMock(
+                return_value=MagicMock(content="done")
+            )
+            code = await main(
+                [str(tasks), "-o", str(tmp_path / "out.jsonl"), "--config", str(config)]
+            )
+
+        rows = _rows(tmp_path / "out.jsonl")
+        assert code == 0
+        assert {row["status"] for row in rows} == {"completed"}
+        assert {row["result"] for row in rows} == {"done"}
+
+    @pytest.mark.asyncio
+    async def test_cli_keeps_leases_on_shared_db(self, tmp_path, monkeypatch):
+        """Should renew its leases so a server on the same db never takes the batch over"""
+        from unittest.mock import AsyncMock, patch
+        from src.state_manager import StateManager, TaskState
+
+        monkeypatch.chdir(tmp_path)
+        db_path = tmp_path / "shared.db"
+        config = tmp_path / "config.yaml"
+        config.write_text(
+            "model_list: []\n"
+            "config_watch:\n  enabled: false\n"
+            f"state_manager:\n  db_path: {db_path}\n  instance_id: batch\n"
+            "  lease_seconds: 0.3\n"
+            "leases:\n  heartbeat_interval: 0.05\n  poll_interval: 0.05\n"
+        )
+        tasks = tmp_path / "tasks.jsonl"
+        _write_tasks(tasks, ["first", "second"])
+
+        server = StateManager(str(db_path), instance_id="server", lease_seconds=0.3)
+        states = [TaskState.IDLE, TaskState.DISPATCHING, TaskState.EXECUTING]
+        taken = []
+
+        async def slow_call(*args, **kwargs):
+            await asyncio.sleep(0.8)
+            return MagicMock(content="done")
+
+        async def poll_server():
+            while True:
+                taken.extend(server.claim_tasks(states))
+                await asyncio.sleep(0.05)
+
+        with patch("src.orchestrator.MCPClient") as mock_client:
+            mock_client.return_value.session = None
+            mock_client.return_value.connect = AsyncMock()
+            mock_client.return_value.disconnect = AsyncMock()
+            mock_client.return_value.call_tool = AsyncMock(side_effect=slow_call)
+            poller = asyncio.create_task(poll_server())
+            try:
+                code = await main(
+                    [str(tasks), "-o", str(tmp_path / "out.jsonl"), "--config", str(config)]
+                )
+            finally:
+                poller.cancel()
+
+        rows = _rows(tmp_path / "out.jsonl")
+        assert code == 0
+        assert {row["status"] for row in rows} == {"completed"}
+        assert taken == []
+        for row in rows:
+            assert server.get_task(row["task_id"]).state == TaskState.COMPLETED
@@ -48,3 +48,95 @@ class TestConfig:
 
         # Verify default key is used
         assert config.config["github_key"] == "${GITHUB_LITELLM_KEY}"
+
+    def test_snapshot_is_immutable(self, tmp_path):
+        """Should expose a read-only config snapshot"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("router:\n  complexity_threshold: 40\n")
+
+        config = Config(str(config_file))
+
+        with pytest.raises(TypeError):
+            config.config["router"]["complexity_threshold"] = 10
+
+    def test_invalid_config_rejected(self, tmp_path):
+        """Should reject structurally invalid config"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("fault_handler:\n  lite_llm_timeout: -1\n")
+
+        with pytest.raises(ValueError):
+            Config(str(config_file))
+
+    def test_invalid_scheduler_weighting_rejected(self, tmp_path):
+        """Should reject a negative SJF weighting"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("scheduler:\n  sjf_seconds_per_point: -1\n")
+
+        with pytest.raises(ValueError):
+            Config(str(config_file))
+
+    def test_reload_swaps_snapshot(self, tmp_path):
+        """Should swap in the new snapshot and return the old one"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("router:\n  complexity_threshold: 40\n")
+        config = Config(str(config_file))
+
+        config_file.write_text("router:\n  complexity_threshold: 60\n")
+        old = config.reload()
+
+        assert old["router"]["complexity_threshold"] == 40
+        assert config.config["router"]["complexity_threshold"] == 60
+
+    def test_reload_keeps_old_config_when_invalid(self, tmp_path):
+        """Should keep serving the current snapshot if the new file is invalid"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("router:\n  complexity_threshold: 40\n")
+        config = Config(str(config_file))
+
+        config_file.write_text("router: [broken\n")
+
+        assert config.reload() is None
+        assert config.config["router"]["complexity_threshold"] == 40
+
+    @pytest.mark.parametrize(
+        "section",
+        [
+            "fault_handler:\n  health_check_interval: soon\n",
+            "scheduler:\n  max_concurrency: 0\n",
+            "scheduler:\n  max_concurrency: 2.5\n",
+            "scheduler:\n  weights:\n    urgent: 3\n",
+            "scheduler:\n  weights:\n    batch: heavy\n",
+            "usage:\n  budgets:\n    daily:\n      window_seconds: 60\n",
+            "usage:\n  budgets:\n    daily:\n      limit: ten\n",
+            "usage:\n  budget_threshold: 1.5\n",
+        ],
+    )
+    def test_reload_rejects_values_components_cannot_read(self, tmp_path, section):
+        """Should reject the whole reload when any value would fail float() / int() later"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("router:\n  complexity_threshold: 40\n")
+        config = Config(str(config_file))
+
+        config_file.write_text("router:\n  complexity_threshold: 60\n" + section)
+
+        assert config.reload() is None
+        assert config.config["router"]["complexity_threshold"] == 40
+
+    @pytest.mark.asyncio
+    async def test_watcher_notifies_on_change(self, tmp_path):
+        """Should reload and notify listeners when the file changes"""
+        from src.config import ConfigWatcher, changed_sections
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("lite_llm_url: http://a:4000\n")
+        config = Config(str(config_file))
+        changes = []
+        watcher = ConfigWatcher(config, lambda old, new: changes.append(changed_sections(old, new)))
+
+        assert await watcher.check() is False
+
+        config_file.write_text("lite_llm_url: http://b:4000\n")
+        os.utime(config_file, ns=(0, 1))
+
+        assert await watcher.check() is True
+        assert changes == [["lite_llm_url"]]
@@ -0,0 +1,119 @@
+"""
+Conversation store tests
+"""
+
+import sqlite3
+
+from mcp.types import TextContent
+
+from src.conversation_store import ConversationStore, estimate_tokens, message_text
+
+
+def _message(role: str, content: str) -> dict:
+    return {"role": role, "content": content}
+
+
+class TestMessageText:
+    """Test result content conversion"""
+
+    def test_plain_and_block_content(self):
+        """Should flatten strings, MCP content blocks and direct API responses"""
+        assert message_text("done") == "done"
+        blocks = [TextContent(type="text", text="a"), TextContent(type="text", text="b")]
+        assert message_text(blocks) == "a\nb"
+        assert message_text({"content": [{"type": "text", "text": "reply"}]}) == "reply"
+        assert message_text(None) == ""
+
+
+class TestConversationStore:
+    """Test session-keyed history storage"""
+
+    def test_append_and_reload(self, tmp_path):
+        """Should persist compressed history that survives a new store instance"""
+        db_path = str(tmp_path / "state.db")
+        store = ConversationStore(sqlite3.connect(db_path))
+
+        store.append("s1", _message("user", "Hello"), _message("assistant", "Hi there"))
+        store.append("s1", _message("user", "List files"))
+
+        reloaded = ConversationStore(sqlite3.connect(db_path))
+        assert reloaded.get("s1") == [
+            _message("user", "Hello"),
+            _message("assistant", "Hi there"),
+            _message("user", "List files"),
+        ]
+        assert reloaded.get("missing") == []
+
+        blob, count = reloaded.conn.execute(
+            "SELECT messages, message_count FROM conversations WHERE session_id = 's1'"
+        ).fetchone()
+        assert count == 3
+        assert b"Hello" not in blob
+
+    def test_cache_is_bounded(self):
+        """Should evict the least recently used session from memory"""
+        store = ConversationStore(sqlite3.connect(":memory:"), cache_size=2)
+
+        store.append("s1", _message("user", "one"))
+        store.append("s2", _message("user", "two"))
+        store.get("s1")
+        store.append("s3", _message("user", "three"))
+
+        assert list(store._cache) == ["s1", "s3"]
+        assert store.get("s2") == [_message("user", "two")]
+
+    def test_stored_history_is_bounded(self):
+        """Should keep only the newest messages and summarize the rest when a hook is set"""
+        store = ConversationStore(
+            sqlite3.connect(":memory:"),
+            max_messages=4,
+            summarizer=lambda dropped: f"{len(dropped)} messages",
+        )
+
+        for i in range(6):
+            store.append("s1", _message("user", f"m{i}"))
+
+        history = store.get("s1")
+        assert len(history) == 4
+        assert history[0]["content"].startswith("[Earlier conversation summary]")
+        assert history[-1]["content"] == "m5"
+
+    def test_context_is_token_bounded(self):
+        """Should keep the newest messages that fit the token budget"""
+        store = ConversationStore(sqlite3.connect(":memory:"), max_context_tokens=40)
+        history = [_message("user", "x" * 40) for _ in range(5)]
+
+        context = store.context_for(history)
+
+        per_message = estimate_tokens("x" * 40) + 4
+        assert len(context) == 40 // per_message
+        assert store.context_for(history[:1]) == history[:1]
+
+    def test_context_starts_with_user_turn(self):
+        """Should drop assistant turns left at the front after trimming"""
+        store = ConversationStore(sqlite3.connect(":memory:"), max_context_tokens=18)
+        history = [
+            _message("user", "q1 " + "x" * 30),
+            _message("assistant", "a1"),
+            _message("user", "q2"),
+            _message("assistant", "a2"),
+        ]
+
+        context = store.context_for(history)
+
+        assert context == history[2:]
+        assert store.context_for(history[1:2]) == []
+
+    def test_context_summary_hook(self):
+        """Should prepend a summary of truncated messages when a hook is set"""
+        store = ConversationStore(
+            sqlite3.connect(":memory:"),
+            max_context_tokens=20,
+            summarizer=lambda dropped: " / ".join(m["content"][:3] for m in dropped),
+        )
+        history = [_message("user", f"msg{i} " + "x" * 30) for i in range(3)]
+
+        context = store.context_for(history)
+
+        assert context[0]["content"].startswith("[Earlier conversation summary] msg")
+        assert context[-1] == history[-1]
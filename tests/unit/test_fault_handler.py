@@ -118,3 +118,46 @@ class TestFaultHandler:
             call_args = mock_client.return_value.post.call_args
             headers = call_args[1]["headers"]
             assert "backup_key_123" in headers["x-api-key"]
+
+    def test_apply_config_keeps_state(self):
+        """Should update thresholds without resetting failure counters"""
+        handler = FaultHandler(lite_llm_url="http://localhost:4000", github_key="test_key")
+        handler.consecutive_failures = 1
+
+        handler.apply_config(
+            {"consecutive_failures_threshold": 5, "cloud_check_timeout": 3},
+            lite_llm_url="http://litellm:4000",
+        )
+
+        assert handler.consecutive_failures_threshold == 5
+        assert handler.cloud_check_timeout == 3.0
+        assert handler.lite_llm_url == "http://litellm:4000"
+        assert handler.consecutive_failures == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_uses_response_cache(self):
+        """Should answer repeated direct API requests from the response cache"""
+        import sqlite3
+        from src.response_cache import ResponseCache
+
+        handler = FaultHandler(lite_llm_url="http://localhost:4000", github_key="test_key")
+        handler.response_cache = ResponseCache(sqlite3.connect(":memory:"))
+        messages = [{"role": "user", "content": "status?"}]
+
+        with patch("src.fault_handler.httpx.AsyncClient") as mock_client:
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "content": "ok",
+                "usage": {"input_tokens": 3, "output_tokens": 2},
+            }
+            mock_client.return_value.__aenter__ = AsyncMock(return_value=mock_client.return_value)
+            mock_client.return_value.post = AsyncMock(return_value=mock_response)
+
+            first = await handler.fallback_to_direct_api(messages=messages)
+            second = await handler.fallback_to_direct_api(messages=messages)
+            await handler.fallback_to_direct_api(messages=messages, deterministic=False)
+
+            assert mock_client.return_value.post.call_count == 2
+            assert "cached" not in first
+            assert second["cached"] is True
+            assert handler.response_cache.get_stats()["saved_output_tokens"] == 2
@@ -0,0 +1,109 @@
+"""
+Shared fault state tests
+"""
+
+import sqlite3
+import time
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.fault_handler import FaultHandler, SystemState
+from src.fault_state import FaultStateStore, HealthMonitor
+
+
+def _handler(store: FaultStateStore) -> FaultHandler:
+    handler = FaultHandler(lite_llm_url="http://localhost:4000", github_key="test_key")
+    handler.attach_store(store)
+    return handler
+
+
+class TestFaultStateStore:
+    """Test persisted fault state and prober election"""
+
+    def test_state_survives_restart(self, tmp_path):
+        """Should reload the mode and failure counts saved by a previous process"""
+        db_path = str(tmp_path / "state.db")
+        handler = _handler(FaultStateStore(sqlite3.connect(db_path), "a"))
+        handler.consecutive_failures = 2
+        handler.system_state = SystemState.DEGRADED
+
+        restarted = _handler(FaultStateStore(sqlite3.connect(db_path), "a"))
+
+        assert restarted.system_state == SystemState.DEGRADED
+        assert restarted.consecutive_failures == 2
+
+    def test_single_prober_with_takeover(self, tmp_path):
+        """Should elect one prober and let another take over after its lease expires"""
+        db_path = str(tmp_path / "state.db")
+        first = FaultStateStore(sqlite3.connect(db_path), "a")
+        second = FaultStateStore(sqlite3.connect(db_path), "b")
+
+        assert first.try_acquire_prober(0.05)
+        assert not second.try_acquire_prober(0.05)
+        assert first.try_acquire_prober(0.05)
+
+        time.sleep(0.06)
+        assert second.try_acquire_prober(30)
+        assert not first.try_acquire_prober(30)
+
+        second.release_prober()
+        assert first.try_acquire_prober(30)
+
+    def test_probe_history_is_bounded(self):
+        """Should keep only the most recent probes"""
+        store = FaultStateStore(sqlite3.connect(":memory:"), "a", history_limit=3)
+
+        for i in range(5):
+            store.record_probe("lite_llm", healthy=i % 2 == 0, latency_ms=float(i))
+
+        history = store.get_history()
+        assert [probe["latency_ms"] for probe in history] == [4.0, 3.0, 2.0]
+        assert history[0] == {
+            "at": history[0]["at"],
+            "probe": "lite_llm",
+            "healthy": True,
+            "latency_ms": 4.0,
+            "instance_id": "a",
+        }
+
+
+class TestHealthMonitor:
+    """Test elected health probing"""
+
+    @pytest.mark.asyncio
+    async def test_only_prober_hits_endpoints(self, tmp_path):
+        """Should probe from one instance and sync the result to the others"""
+        db_path = str(tmp_path / "state.db")
+        prober_store = FaultStateStore(sqlite3.connect(db_path), "a")
+        follower_store = FaultStateStore(sqlite3.connect(db_path), "b")
+        prober = HealthMonitor(_handler(prober_store), prober_store, interval=30)
+        follower = HealthMonitor(_handler(follower_store), follower_store, interval=30)
+
+        with patch("src.fault_handler.httpx.AsyncClient") as mock_client:
+            mock_client.return_value.__aenter__ = AsyncMock(return_value=mock_client.return_value)
+            mock_client.return_value.get = AsyncMock(side_effect=Exception("Timeout"))
+
+            assert await prober.tick() is True
+            assert await prober.tick() is True
+            probes = mock_client.return_value.get.await_count
+
+            assert await follower.tick() is False
+            assert mock_client.return_value.get.await_count == probes
+
+        assert prober.fault_handler.system_state == SystemState.DEGRADED
+        assert follower.fault_handler.system_state == SystemState.DEGRADED
+        assert follower.fault_handler.consecutive_cloud_failures == 2
+        assert {probe["instance_id"] for probe in prober_store.get_history()} == {"a"}
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_prober(self, tmp_path):
+        """Should hand the prober role over on shutdown"""
+        store = FaultStateStore(sqlite3.connect(str(tmp_path / "state.db")), "a")
+        monitor = HealthMonitor(_handler(store), store, interval=30)
+        monitor.fault_handler.check_lite_llm_health = AsyncMock(return_value=True)
+        monitor.fault_handler.check_cloud_apis = AsyncMock(return_value=True)
+
+        await monitor.tick()
+        await monitor.stop()
+
+        assert store.load()["prober"] is None
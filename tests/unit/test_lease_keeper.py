@@ -0,0 +1,92 @@
+"""
+Lease keeper tests
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.lease_keeper import LeaseKeeper
+from src.recovery import CrashRecovery
+from src.state_manager import StateManager, TaskState
+
+
+@pytest.fixture
+def orchestrator(tmp_path):
+    """Create a minimal orchestrator stand-in backed by a real state database"""
+    orchestrator = MagicMock()
+    orchestrator.state_manager = StateManager(str(tmp_path / "state.db"), instance_id="a")
+    orchestrator.is_task_active.return_value = False
+    orchestrator.resume_task = AsyncMock()
+    orchestrator.accepting = True
+    orchestrator.free_capacity.return_value = 2
+    orchestrator.recovery = CrashRecovery(orchestrator)
+    return orchestrator
+
+
+class TestLeaseKeeper:
+    """Test lease heartbeats and shared-queue pulling"""
+
+    @pytest.mark.asyncio
+    async def test_pull_is_bounded_by_free_capacity(self, orchestrator):
+        """Should claim only as many queued tasks as there are free slots"""
+        manager = orchestrator.state_manager
+        queued = [manager.create_task(f"Task {i}", claim=False) for i in range(3)]
+        keeper = LeaseKeeper(orchestrator)
+
+        claimed = keeper.pull()
+        assert {task.task_id for task in claimed} <= set(queued)
+        assert len(claimed) == 2
+        assert orchestrator.recovery.claimed == {task.task_id for task in claimed}
+
+        await asyncio.gather(*keeper._pulls)
+        assert orchestrator.resume_task.await_count == 2
+        assert orchestrator.recovery.claimed == set()
+
+    def test_no_pull_while_draining_or_full(self, orchestrator):
+        """Should not claim work when draining or without free slots"""
+        orchestrator.state_manager.create_task("Task", claim=False)
+        keeper = LeaseKeeper(orchestrator)
+
+        orchestrator.accepting = False
+        assert keeper.pull() == []
+        orchestrator.accepting = True
+        orchestrator.free_capacity.return_value = 0
+        assert keeper.pull() == []
+
+    def test_heartbeat_abandons_lost_leases(self, orchestrator, tmp_path):
+        """Should renew owned leases and abandon tasks taken over by another instance"""
+        manager = orchestrator.state_manager
+        kept = manager.create_task("Kept")
+        lost = manager.create_task("Lost")
+        manager.update_state(lost, TaskState.DISPATCHING)
+        other = StateManager(str(tmp_path / "state.db"), instance_id="b")
+        other.conn.execute("UPDATE tasks SET owner = 'b' WHERE task_id = ?", (lost,))
+        other.conn.commit()
+        orchestrator.owned_task_ids.return_value = [kept, lost]
+
+        assert LeaseKeeper(orchestrator).heartbeat() == [lost]
+        orchestrator.abandon_task.assert_called_once_with(lost)
+        assert manager.get_task(kept).heartbeat_at is not None
+
+    def test_heartbeat_stops_tasks_cancelled_elsewhere(self, orchestrator, tmp_path):
+        """Should stop renewing and abandon a task another instance has cancelled"""
+        manager = orchestrator.state_manager
+        task_id = manager.create_task("Cancelled elsewhere")
+        other = StateManager(str(tmp_path / "state.db"), instance_id="b")
+        other.update_state(task_id, TaskState.CANCELLED)
+        lease = manager.get_task(task_id).lease_expires_at
+        orchestrator.owned_task_ids.return_value = [task_id]
+
+        assert LeaseKeeper(orchestrator).heartbeat() == [task_id]
+        orchestrator.abandon_task.assert_called_once_with(task_id)
+        assert manager.get_task(task_id).lease_expires_at == lease
+
+    def test_from_config(self, orchestrator):
+        """Should default the heartbeat to a third of the lease and honor enabled"""
+        orchestrator.state_manager.lease_seconds = 30
+
+        keeper = LeaseKeeper.from_config(orchestrator, {"poll_interval": 1})
+
+        assert keeper.heartbeat_interval == 10
+        assert keeper.poll_interval == 1
+        assert LeaseKeeper.from_config(orchestrator, {"enabled": False}) is None
@@ -0,0 +1,82 @@
+"""
+Log pipeline tests
+"""
+
+import json
+import logging
+from src.log_pipeline import JsonFormatter, LogPipeline, RateLimiter
+
+
+class TestJsonFormatter:
+    """Test structured JSON log records"""
+
+    def test_includes_structured_fields(self):
+        """Should merge args and include task_id and stage from extra"""
+        record = logging.LogRecord(
+            "src.orchestrator", logging.WARNING, "", 0, "任務失敗 %s", ("t1",), None
+        )
+        record.task_id = "t1"
+        record.stage = "execute"
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "任務失敗 t1"
+        assert entry["level"] == "WARNING"
+        assert entry["task_id"] == "t1"
+        assert entry["stage"] == "execute"
+        assert "executor" not in entry
+
+
+class TestRateLimiter:
+    """Test hot-path debug sampling"""
+
+    def test_limits_burst(self):
+        """Should allow at most the burst size at once"""
+        limiter = RateLimiter(per_second=5)
+
+        allowed = sum(limiter.allow() for _ in range(20))
+
+        assert allowed == 5
+
+
+class TestLogPipeline:
+    """Test queue-based logging to rotating files"""
+
+    def test_writes_json_lines_through_queue(self, tmp_path):
+        """Should format on the listener thread and flush on stop"""
+        log_file = tmp_path / "omni.log"
+        pipeline = LogPipeline()
+        root = logging.getLogger()
+        level = root.level
+        try:
+            pipeline.install({"format": "json", "file": str(log_file), "level": "DEBUG"})
+            logging.getLogger("test.pipeline").info(
+                "處理 %s", "t1", extra={"task_id": "t1", "stage": "route"}
+            )
+        finally:
+            pipeline.stop()
+            root.setLevel(level)
+
+        entries = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+        entry = next(e for e in entries if e["logger"] == "test.pipeline")
+        assert entry["message"] == "處理 t1"
+        assert entry["stage"] == "route"
+        assert pipeline._queue_handler not in root.handlers
+
+    def test_rotates_log_files(self, tmp_path):
+        """Should roll over to a backup file once max_bytes is exceeded"""
+        log_file = tmp_path / "omni.log"
+        pipeline = LogPipeline()
+        root = logging.getLogger()
+        level = root.level
+        try:
+            pipeline.install(
+                {"format": "text", "file": str(log_file), "max_bytes": 200, "backup_count": 2}
+            )
+            for i in range(20):
+                logging.getLogger("test.pipeline").warning("line %d %s", i, "x" * 40)
+        finally:
+            pipeline.stop()
+            root.setLevel(level)
+
+        assert (tmp_path / "omni.log.1").exists()
@@ -27,3 +27,259 @@ def test_mcp_server_initialization():
         assert server.orchestrator == mock_orchestrator
         assert server.port == 18765
         assert server.host == "0.0.0.0"
+
+
+class TestMCPServerReadiness:
+    """Test liveness/readiness split of MCPServer"""
+
+    @pytest.mark.asyncio
+    async def test_ping_before_ready(self):
+        """Should answer ping and report not ready before the orchestrator loads"""
+        from src.main import MCPServer
+
+        server = MCPServer()
+
+        assert await server.handle_message('{"method": "ping"}') == '{"result": "pong"}'
+        readiness = await server.handle_message('{"method": "get_readiness"}')
+        assert '"ready": false' in readiness
+
+    @pytest.mark.asyncio
+    async def test_requests_wait_until_ready(self):
+        """Should hold business requests until the orchestrator is injected"""
+        import asyncio
+
+        from src.main import MCPServer
+
+        server = MCPServer()
+        orchestrator = MagicMock()
+        orchestrator.process_mcp_message = AsyncMock(return_value='{"result": "ok"}')
+
+        pending = asyncio.create_task(server.handle_message('{"method": "create_task"}'))
+        await asyncio.sleep(0)
+        assert not pending.done()
+
+        server.set_orchestrator(orchestrator)
+        assert await pending == '{"result": "ok"}'
+        assert server.ready_after_ms is not None
+
+        readiness = await server.handle_message('{"method": "get_readiness"}')
+        assert '"ready": true' in readiness
+
+    @pytest.mark.asyncio
+    async def test_ping_answered_while_orchestrator_builds(self):
+        """Should answer pings over the socket while the orchestrator is still being built"""
+        import asyncio
+        import threading
+        from websockets import connect
+
+        from src.main import MCPServer, load_orchestrator
+
+        release = threading.Event()
+        orchestrator = MagicMock()
+        orchestrator.drain = AsyncMock()
+        orchestrator.shutdown = AsyncMock()
+
+        def build():
+            release.wait(5)
+            return orchestrator
+
+        server = MCPServer()
+        server.host = "127.0.0.1"
+        server.port = 0
+        started = asyncio.Event()
+        serving = asyncio.create_task(server.start(on_started=started.set))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        port = server.server.sockets[0].getsockname()[1]
+
+        with patch("src.main._build_orchestrator", side_effect=build):
+            loading = asyncio.create_task(load_orchestrator(server, MagicMock()))
+            try:
+                async with connect(f"ws://127.0.0.1:{port}") as websocket:
+                    await websocket.send('{"method": "ping"}')
+                    pong = await asyncio.wait_for(websocket.recv(), timeout=1)
+            finally:
+                release.set()
+            await asyncio.wait_for(loading, timeout=5)
+
+        assert pong == '{"result": "pong"}'
+        assert server.orchestrator is orchestrator
+        orchestrator.start_background_tasks.assert_called_once()
+        server.stop()
+        await asyncio.wait_for(serving, timeout=5)
+
+    @pytest.mark.asyncio
+    async def test_readiness_matched_by_method_only(self):
+        """Should pass task requests that mention get_readiness through to the orchestrator"""
+        from src.main import MCPServer
+
+        orchestrator = MagicMock()
+        orchestrator.process_mcp_message = AsyncMock(return_value='{"result": "ok"}')
+        server = MCPServer(orchestrator)
+        message = '{"method": "create_task", "params": {"description": "call get_readiness"}}'
+
+        assert await server.handle_message(message) == '{"result": "ok"}'
+        orchestrator.process_mcp_message.assert_awaited_once_with(message, peer=None)
+        readiness = await server.handle_message('{"method": "get_readiness"}')
+        assert '"ready": true' in readiness
+
+
+class TestMCPServerShutdown:
+    """Test SIGTERM-driven drain of MCPServer"""
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_then_shuts_down(self):
+        """Should drain the orchestrator before closing its resources"""
+        import asyncio
+
+        from src.main import MCPServer
+
+        calls = []
+        orchestrator = MagicMock()
+        orchestrator.drain = AsyncMock(side_effect=lambda: calls.append("drain"))
+        orchestrator.shutdown = AsyncMock(side_effect=lambda: calls.append("shutdown"))
+
+        server = MCPServer(orchestrator)
+        server.host = "127.0.0.1"
+        server.port = 0
+
+        await asyncio.wait_for(server.start(on_started=server.stop), timeout=5)
+
+        assert calls == ["drain", "shutdown"]
+
+
+class TestMCPServerConnections:
+    """Test connection limits, reaping and inventory of MCPServer"""
+
+    @staticmethod
+    async def _serve(server):
+        """Start the server on an ephemeral port and return (task, url)"""
+        import asyncio
+
+        started = asyncio.Event()
+        task = asyncio.create_task(server.start(on_started=started.set))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        port = server.server.sockets[0].getsockname()[1]
+        return task, f"ws://127.0.0.1:{port}"
+
+    @staticmethod
+    def _server():
+        from src.main import MCPServer
+
+        orchestrator = MagicMock()
+        orchestrator.process_mcp_message = AsyncMock(return_value='{"result": "ok"}')
+        orchestrator.drain = AsyncMock()
+        orchestrator.shutdown = AsyncMock()
+        server = MCPServer(orchestrator)
+        server.host = "127.0.0.1"
+        server.port = 0
+        return server
+
+    @pytest.mark.asyncio
+    async def test_rejects_connections_over_limit(self):
+        """Should close connections beyond max_connections with 1013"""
+        import asyncio
+        from websockets import connect
+
+        server = self._server()
+        server.apply_config({"max_connections": 1, "heartbeat_interval": 0})
+        task, url = await self._serve(server)
+        try:
+            async with connect(url) as first:
+                await first.send('{"method": "ping"}')
+                assert await first.recv() == '{"result": "ok"}'
+
+                async with connect(url) as second:
+                    await asyncio.wait_for(second.wait_closed(), timeout=5)
+                    assert second.close_code == 1013
+
+                inventory = server.get_connections()
+                assert inventory["count"] == 1
+                assert inventory["rejected"] == 1
+                assert inventory["connections"][0]["messages_in"] == 1
+                assert inventory["connections"][0]["messages_out"] == 1
+        finally:
+            server.stop()
+            await task
+
+    @pytest.mark.asyncio
+    async def test_reaps_idle_connections(self):
+        """Should close idle connections but keep ones answering heartbeats"""
+        import asyncio
+        from websockets import connect
+
+        server = self._server()
+        server.apply_config({"idle_timeout": 0.05, "heartbeat_timeout": 1})
+        task, url = await self._serve(server)
+        try:
+            async with connect(url) as idle:
+                await asyncio.sleep(0.01)
+                assert await server.reap_connections() == 0
+                assert server.get_connections()["connections"][0]["latency_ms"] is not None
+
+                await asyncio.sleep(0.1)
+                assert await server.reap_connections() == 1
+                await asyncio.wait_for(idle.wait_closed(), timeout=5)
+                assert server.get_connections()["count"] == 0
+                assert server.reaped_connections == 1
+        finally:
+            server.stop()
+            await task
+
+    @pytest.mark.asyncio
+    async def test_reaps_dead_peers(self):
+        """Should drop connections whose heartbeat ping goes unanswered"""
+        import asyncio
+
+        server = self._server()
+        server.apply_config({"heartbeat_timeout": 0.01})
+        websocket = MagicMock()
+        websocket.remote_address = ("10.0.0.5", 5000)
+
+        async def ping():
+            return asyncio.get_running_loop().create_future()
+
+        websocket.ping = ping
+        assert server._register(websocket) is not None
+
+        assert await server.reap_connections() == 1
+        websocket.fail_connection.assert_called_once_with(1011, "Heartbeat timeout")
+        assert server.connections == {}
+
+    @pytest.mark.asyncio
+    async def test_oversized_messages_close_connection(self):
+        """Should enforce the configured max message size per connection"""
+        import asyncio
+        from websockets import connect
+
+        server = self._server()
+        server.apply_config({"max_message_size": 64, "heartbeat_interval": 0})
+        task, url = await self._serve(server)
+        try:
+            async with connect(url) as client:
+                await client.send('{"method": "ping", "pad": "' + "x" * 200 + '"}')
+                await asyncio.wait_for(client.wait_closed(), timeout=5)
+                assert client.close_code == 1009
+        finally:
+            server.stop()
+            await task
+
+    @pytest.mark.asyncio
+    async def test_inventory_is_admin_only(self, tmp_path):
+        """Should expose the inventory through the orchestrator's localhost-only method"""
+        import json
+        from src.main import MCPServer
+        from src.orchestrator import Orchestrator
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(f"model_list: []\nstate_manager:\n  db_path: {tmp_path}/s.db\n")
+        server = MCPServer(Orchestrator(config_path=str(config_file)))
+
+        local = json.loads(await server.handle_message('{"method": "get_connections"}'))
+        remote = json.loads(
+            await server.handle_message(
+                '{"method": "get_connections"}', peer=("203.0.113.9", 4000)
+            )
+        )
+
+        assert local["result"]["count"] == 0
+        assert "restricted" in remote["error"]
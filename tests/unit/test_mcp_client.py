@@ -2,6 +2,7 @@
 MCP Client tests
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from src.mcp_client import MCPClient
@@ -100,3 +101,121 @@ class TestMCPClient:
 
                 mock_session.return_value.__aexit__.assert_called_once()
                 mock_ws.return_value.__aexit__.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_connect_opens_one_session(self):
+        """Should share a single session between tasks connecting at the same time"""
+        import asyncio
+
+        client = MCPClient("ws://127.0.0.1:18789")
+
+        async def slow_initialize():
+            await asyncio.sleep(0.01)
+
+        with patch("src.mcp_client.websocket_client") as mock_ws:
+            mock_ws.return_value.__aenter__ = AsyncMock(return_value=(AsyncMock(), AsyncMock()))
+            mock_ws.return_value.__aexit__ = AsyncMock()
+
+            with patch("src.mcp_client.ClientSession") as mock_session:
+                mock_session.return_value.__aenter__ = AsyncMock()
+                mock_session.return_value.__aexit__ = AsyncMock()
+                mock_session.return_value.initialize = AsyncMock(side_effect=slow_initialize)
+
+                await asyncio.gather(*(client.connect() for _ in range(5)))
+                await client.disconnect()
+
+                assert mock_ws.call_count == 1
+                mock_session.return_value.initialize.assert_called_once()
+                assert client.session is None
+
+    @pytest.mark.asyncio
+    async def test_call_tool_with_timeout(self):
+        """Should forward the remaining deadline as the read timeout"""
+        from datetime import timedelta
+
+        client = MCPClient("ws://127.0.0.1:18789")
+        client.session = MagicMock()
+        client.session.call_tool = AsyncMock(return_value=MagicMock(content="ok"))
+
+        await client.call_tool("test_tool", timeout=2.5, param1="value1")
+
+        client.session.call_tool.assert_called_once_with(
+            "test_tool",
+            arguments={"param1": "value1"},
+            read_timeout_seconds=timedelta(seconds=2.5),
+        )
+
+
+class TestMCPClientRegistry:
+    """Test per-executor client registry"""
+
+    @pytest.mark.asyncio
+    async def test_apply_rebuilds_only_changed_clients(self):
+        """Should rebuild clients whose URL changed and keep the rest"""
+        from src.mcp_client import MCPClientRegistry
+
+        registry = MCPClientRegistry(
+            {
+                "openclaw": {"url": "ws://127.0.0.1:18789"},
+                "moltworker": {"url": "ws://10.0.0.2:9000"},
+                "claude_code": {"url": "stdio"},
+            }
+        )
+        openclaw = registry.get("openclaw")
+        moltworker = registry.get("moltworker")
+        moltworker.disconnect = AsyncMock()
+
+        changed = await registry.apply(
+            {
+                "openclaw": {"url": "ws://127.0.0.1:18789"},
+                "moltworker": {"url": "ws://10.0.0.3:9000"},
+            }
+        )
+
+        assert changed == ["moltworker"]
+        assert registry.get("openclaw") is openclaw
+        assert registry.get("moltworker").server_url == "ws://10.0.0.3:9000"
+        assert registry.get("claude_code") is None
+        await asyncio.sleep(0)
+        moltworker.disconnect.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_replaced_client_drains_in_flight_calls(self):
+        """Should disconnect a replaced client only after its in-flight calls finish"""
+        from src.mcp_client import MCPClientRegistry
+
+        registry = MCPClientRegistry({"openclaw": {"url": "ws://127.0.0.1:18789"}})
+        old = registry.get("openclaw")
+        release = asyncio.Event()
+
+        async def call_tool(name, arguments):
+            await release.wait()
+            return MagicMock(content="done")
+
+        old.session = MagicMock()
+        old.session.call_tool = AsyncMock(side_effect=call_tool)
+        old.disconnect = AsyncMock()
+        call = asyncio.create_task(old.call_tool("execute_task", description="x"))
+        await asyncio.sleep(0)
+
+        await registry.apply({"openclaw": {"url": "ws://10.0.0.1:18789"}})
+        await asyncio.sleep(0.01)
+        old.disconnect.assert_not_called()
+
+        release.set()
+        assert (await call).content == "done"
+        await asyncio.sleep(0)
+        old.disconnect.assert_called_once()
+
+        # Shutdown does not wait for a replaced client that is still busy
+        busy = registry.get("openclaw")
+        busy.session = old.session
+        busy.disconnect = AsyncMock()
+        release.clear()
+        stuck = asyncio.create_task(busy.call_tool("execute_task", description="y"))
+        await asyncio.sleep(0)
+        await registry.apply({})
+        await registry.close()
+        busy.disconnect.assert_called_once()
+        stuck.cancel()
+        await asyncio.gather(stuck, return_exceptions=True)
@@ -0,0 +1,90 @@
+"""
+Metrics tests
+"""
+
+import asyncio
+import pytest
+from src.metrics import Counter, Histogram, MetricsRegistry, MetricsServer
+
+
+class TestHistogram:
+    """Test histogram bucketing and exposition"""
+
+    def test_render_cumulative_buckets(self):
+        """Should render cumulative buckets, sum and count per label set"""
+        histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="route")
+        histogram.observe(0.5, stage="route")
+        histogram.observe(5.0, stage="route")
+
+        lines = histogram.render()
+
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{stage="route",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{stage="route",le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{stage="route",le="+Inf"} 3' in lines
+        assert 'latency_seconds_sum{stage="route"} 5.55' in lines
+        assert 'latency_seconds_count{stage="route"} 3' in lines
+
+    def test_escapes_label_values(self):
+        """Should escape quotes and backslashes in label values"""
+        counter = Counter("tasks_total", "Tasks", ("status",))
+        counter.inc(status='bad "value"\\')
+
+        assert 'tasks_total{status="bad \\"value\\"\\\\"} 1.0' in counter.render()
+
+
+class TestMetricsRegistry:
+    """Test stage timing helpers"""
+
+    def test_time_records_duration_and_errors(self):
+        """Should record the stage duration and count stages that raise"""
+        registry = MetricsRegistry()
+
+        with registry.time("route", system_state="normal"):
+            pass
+        with pytest.raises(RuntimeError):
+            with registry.time("call_tool", executor="openclaw", model="gpt-4"):
+                raise RuntimeError("boom")
+
+        snapshot = registry.snapshot()
+        stages = {s["labels"]["stage"]: s for s in snapshot["omni_stage_duration_seconds"]}
+        assert stages["route"]["count"] == 1
+        assert stages["route"]["labels"]["system_state"] == "normal"
+        assert stages["call_tool"]["labels"]["executor"] == "openclaw"
+        errors = snapshot["omni_stage_errors_total"]
+        assert [e["labels"]["stage"] for e in errors] == ["call_tool"]
+
+
+class TestMetricsServer:
+    """Test the local Prometheus endpoint"""
+
+    def test_disabled_by_default(self):
+        """Should not create a server unless enabled in config"""
+        assert MetricsServer.from_config(MetricsRegistry(), None) is None
+        assert MetricsServer.from_config(MetricsRegistry(), {"enabled": False}) is None
+
+    @pytest.mark.asyncio
+    async def test_serves_metrics(self):
+        """Should serve the exposition text on GET /metrics and 404 elsewhere"""
+        registry = MetricsRegistry()
+        registry.tasks.inc(status="completed")
+        server = MetricsServer(registry, port=0)
+        await server.start()
+
+        async def get(path):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        try:
+            metrics = await get("/metrics")
+            missing = await get("/")
+        finally:
+            await server.stop()
+
+        assert metrics.startswith("HTTP/1.1 200 OK")
+        assert 'omni_tasks_total{status="completed"} 1.0' in metrics
+        assert missing.startswith("HTTP/1.1 404")
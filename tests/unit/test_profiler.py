@@ -0,0 +1,82 @@
+"""
+Sampling profiler tests
+"""
+
+import asyncio
+import time
+import pytest
+from src.profiler import SamplingProfiler
+
+
+class TestSamplingProfiler:
+    """Test on-demand event-loop profiling"""
+
+    @pytest.mark.asyncio
+    async def test_captures_stacks_lag_and_slow_callbacks(self, tmp_path):
+        """Should sample a blocking callback and report it as a slow callback"""
+
+        loop = asyncio.get_running_loop()
+        debug = loop.get_debug()
+        debug_seen = []
+
+        def block_loop():
+            debug_seen.append(loop.get_debug())
+            time.sleep(0.15)
+
+        profiler = SamplingProfiler(interval=0.005, slow_callback=0.05, output_dir=str(tmp_path))
+        loop.call_later(0.02, block_loop)
+
+        report = await profiler.run(0.3)
+
+        assert report["samples"] > 0
+        assert any("block_loop" in entry["stack"] for entry in report["top_stacks"])
+        assert report["loop_lag_ms"]["max"] >= 100
+        assert any(
+            "block_loop" in record["stack"] and record["lag_ms"] >= 100
+            for record in report["slow_callbacks"]
+        )
+        # Sampling alone: the loop never switches into debug mode
+        assert debug_seen == [debug]
+
+        lines = open(report["output"], encoding="utf-8").read().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+        assert report["collapsed"] == lines
+        assert report["collapsed_truncated"] == 0
+
+    @pytest.mark.asyncio
+    async def test_collapsed_stacks_capped_in_report(self, tmp_path):
+        """Should cap the collapsed stacks returned inline but keep them all in the file"""
+
+        async def busy(depth):
+            if depth:
+                return await busy(depth - 1)
+            time.sleep(0.02)
+
+        profiler = SamplingProfiler(interval=0.002, output_dir=str(tmp_path), max_stacks=1)
+        runs = [asyncio.create_task(busy(depth)) for depth in range(3)]
+
+        report = await profiler.run(0.15)
+        await asyncio.gather(*runs)
+
+        lines = open(report["output"], encoding="utf-8").read().splitlines()
+        assert len(lines) > 1
+        assert report["collapsed"] == lines[:1]
+        assert report["collapsed_truncated"] == len(lines) - 1
+
+    @pytest.mark.asyncio
+    async def test_restores_loop_and_rejects_overlap(self, tmp_path):
+        """Should restore loop debug settings and refuse concurrent runs"""
+        profiler = SamplingProfiler(output_dir=str(tmp_path), max_seconds=0.05)
+        loop = asyncio.get_running_loop()
+        debug = loop.get_debug()
+
+        first = asyncio.create_task(profiler.run(10))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await profiler.run(0.01)
+        report = await first
+
+        assert report["duration_s"] < 1
+        assert loop.get_debug() == debug
+        assert not profiler.running
@@ -0,0 +1,178 @@
+"""
+Crash recovery tests
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.recovery import CrashRecovery, RecoveryAction
+from src.state_manager import StateManager, TaskState
+
+
+@pytest.fixture
+def orchestrator(tmp_path):
+    """Create a minimal orchestrator stand-in backed by a real state database"""
+    orchestrator = MagicMock()
+    orchestrator.state_manager = StateManager(str(tmp_path / "state.db"))
+    orchestrator.is_task_active.return_value = False
+    orchestrator.resume_task = AsyncMock()
+    return orchestrator
+
+
+class TestCrashRecovery:
+    """Test startup recovery of orphaned tasks"""
+
+    @pytest.mark.asyncio
+    async def test_default_policy(self, orchestrator):
+        """Should re-dispatch DISPATCHING tasks and fail EXECUTING tasks"""
+        manager = orchestrator.state_manager
+        dispatching = manager.create_task("Dispatching task")
+        manager.update_state(dispatching, TaskState.DISPATCHING)
+        executing = manager.create_task("Executing task")
+        manager.update_state(executing, TaskState.EXECUTING)
+        done = manager.create_task("Done task")
+        manager.update_state(done, TaskState.COMPLETED)
+
+        report = await CrashRecovery(orchestrator).run()
+
+        orchestrator.resume_task.assert_called_once_with(
+            dispatching, "Dispatching task", deadline=None, session_id=None
+        )
+        assert manager.get_task(executing).state == TaskState.FAILED
+        assert manager.get_task(done).state == TaskState.COMPLETED
+        assert report["recovered"] == 2
+        assert report["redispatch"] == 1
+        assert report["fail"] == 1
+        assert report["duration_ms"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_skips_tasks_active_in_this_process(self, orchestrator):
+        """Should leave tasks already being handled by the live process alone"""
+        manager = orchestrator.state_manager
+        task_id = manager.create_task("Live task")
+        manager.update_state(task_id, TaskState.EXECUTING)
+        orchestrator.is_task_active.return_value = True
+
+        report = await CrashRecovery(orchestrator).run()
+
+        assert report["recovered"] == 0
+        assert manager.get_task(task_id).state == TaskState.EXECUTING
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self, orchestrator):
+        """Should never re-dispatch more tasks at once than configured"""
+        manager = orchestrator.state_manager
+        for i in range(6):
+            manager.update_state(manager.create_task(f"Task {i}"), TaskState.EXECUTING)
+
+        running = 0
+        peak = 0
+
+        async def resume(task_id, description, deadline=None, session_id=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        orchestrator.resume_task = AsyncMock(side_effect=resume)
+        recovery = CrashRecovery.from_config(
+            orchestrator, {"policy": {"executing": "redispatch"}, "concurrency": 2}
+        )
+
+        report = await recovery.run()
+
+        assert recovery.policy[TaskState.EXECUTING] == RecoveryAction.REDISPATCH
+        assert report["redispatch"] == 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_redispatches_checkpointed_tasks(self, orchestrator):
+        """Should re-dispatch tasks checkpointed back to IDLE by a drain"""
+        manager = orchestrator.state_manager
+        task_id = manager.create_task("Checkpointed task")
+
+        report = await CrashRecovery(orchestrator).run()
+
+        orchestrator.resume_task.assert_called_once_with(
+            task_id, "Checkpointed task", deadline=None, session_id=None
+        )
+        assert report["redispatch"] == 1
+
+    @pytest.mark.asyncio
+    async def test_keeps_stored_deadline(self, orchestrator):
+        """Should re-dispatch tasks with the deadline stored at submission"""
+        manager = orchestrator.state_manager
+        deadline = time.time() + 30
+        task_id = manager.create_task("Timed task", deadline=deadline, session_id="s1")
+
+        await CrashRecovery(orchestrator).run()
+
+        orchestrator.resume_task.assert_called_once_with(
+            task_id, "Timed task", deadline=deadline, session_id="s1"
+        )
+
+    @pytest.mark.asyncio
+    async def test_resumes_pending_retries_and_purges_stale_rows(self, orchestrator):
+        """Should re-dispatch tasks waiting for a retry once due and drop leftover rows"""
+        manager = orchestrator.state_manager
+        waiting = manager.create_task("Waiting for retry")
+        manager.update_state(waiting, TaskState.EXECUTING)
+        manager.save_retry(waiting, 2, time.time() + 0.05, "Timeout")
+        done = manager.create_task("Done task")
+        manager.update_state(done, TaskState.COMPLETED)
+        manager.save_retry(done, 1, time.time(), "Timeout")
+        manager.save_retry("missing", 1, time.time(), "Timeout")
+
+        started = time.time()
+        report = await CrashRecovery(orchestrator).run()
+
+        orchestrator.resume_task.assert_called_once_with(
+            waiting, "Waiting for retry", deadline=None, session_id=None
+        )
+        assert time.time() - started >= 0.04
+        assert report["redispatch"] == 1
+        assert report["retried"] == 1
+        assert report["fail"] == 0
+        assert report["stale_retries"] == 2
+        assert manager.get_retry_schedule() == []
+
+    @pytest.mark.asyncio
+    async def test_skips_tasks_cancelled_after_claim(self, orchestrator):
+        """Should not resume claimed tasks cancelled while waiting for a retry or a slot"""
+        manager = orchestrator.state_manager
+        waiting = manager.create_task("Waiting for retry")
+        manager.update_state(waiting, TaskState.EXECUTING)
+        manager.save_retry(waiting, 2, time.time() + 0.05, "Timeout")
+        first = manager.create_task("First")
+        queued = manager.create_task("Queued")
+        release = asyncio.Event()
+
+        async def resume_task(task_id, *args, **kwargs):
+            await release.wait()
+
+        orchestrator.resume_task = AsyncMock(side_effect=resume_task)
+        recovery = CrashRecovery(orchestrator, concurrency=1)
+        claimed = {task.task_id: task for task in recovery.claim(include_own=True)}
+        run = asyncio.create_task(
+            recovery.recover([claimed[waiting], claimed[first], claimed[queued]])
+        )
+        await asyncio.sleep(0.01)
+        assert recovery.claimed == {waiting, queued}
+
+        for task_id in (waiting, queued):
+            manager.update_state(task_id, TaskState.CANCELLED)
+        await asyncio.sleep(0.06)
+        release.set()
+        report = await run
+
+        orchestrator.resume_task.assert_called_once_with(
+            first, "First", deadline=None, session_id=None
+        )
+        assert report["redispatch"] == 1
+        assert report["retried"] == 0
+        assert report["skipped"] == 2
+        assert manager.get_task(waiting).state == TaskState.CANCELLED
+        assert manager.get_retry_schedule() == []
+        assert recovery.claimed == set()
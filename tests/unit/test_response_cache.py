@@ -0,0 +1,111 @@
+"""
+Direct API response cache tests
+"""
+
+import sqlite3
+import time
+
+from src.response_cache import ResponseCache, response_key
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def _response(text: str = "pong", input_tokens: int = 10, output_tokens: int = 5) -> dict:
+    return {
+        "content": [{"type": "text", "text": text}],
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+    }
+
+
+class TestResponseKey:
+    """Test request hashing"""
+
+    def test_key_covers_model_messages_and_params(self):
+        """Should give identical requests the same key and differing ones distinct keys"""
+        key = response_key("model-a", MESSAGES, {"max_tokens": 1024})
+
+        assert key == response_key("model-a", list(MESSAGES), {"max_tokens": 1024})
+        assert key != response_key("model-b", MESSAGES, {"max_tokens": 1024})
+        assert key != response_key("model-a", MESSAGES, {"max_tokens": 512})
+        assert key != response_key("model-a", [{"role": "user", "content": "pong"}])
+
+
+class TestResponseCache:
+    """Test the persistent direct-API response cache"""
+
+    def test_hit_and_miss(self):
+        """Should return stored responses marked as cached and count hits and misses"""
+        cache = ResponseCache(sqlite3.connect(":memory:"))
+        cache.put("key", _response())
+
+        assert cache.get("missing") is None
+        hit = cache.get("key")
+
+        assert hit["cached"] is True
+        assert hit["content"][0]["text"] == "pong"
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+        assert stats["saved_input_tokens"] == 10
+        assert stats["saved_output_tokens"] == 5
+
+    def test_survives_restart(self, tmp_path):
+        """Should serve responses and saved-token totals from disk after a restart"""
+        path = str(tmp_path / "state.db")
+        first = ResponseCache(sqlite3.connect(path))
+        first.put("key", _response())
+        first.get("key")
+        first.flush()
+
+        second = ResponseCache(sqlite3.connect(path))
+        assert second.get("key")["content"][0]["text"] == "pong"
+        stats = second.get_stats()
+        assert stats["entries"] == 1
+        assert stats["saved_input_tokens"] == 20
+        assert stats["saved_output_tokens"] == 10
+
+    def test_ttl_expiry(self):
+        """Should ignore entries older than the TTL"""
+        cache = ResponseCache(sqlite3.connect(":memory:"), ttl_seconds=60)
+        cache.put("key", _response())
+        cache._memory["key"] = (time.time() - 120, cache._memory["key"][1])
+        cache.conn.execute("UPDATE response_cache SET created_at = ?", (time.time() - 120,))
+
+        assert cache.get("key") is None
+
+    def test_evicts_least_recently_used_by_count(self):
+        """Should drop the least recently used entry when over max_entries"""
+        cache = ResponseCache(sqlite3.connect(":memory:"), max_entries=2, memory_entries=0)
+        cache.put("a", _response("a"))
+        time.sleep(0.01)
+        cache.put("b", _response("b"))
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.put("c", _response("c"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_evicts_by_total_size(self):
+        """Should keep the total stored size within max_bytes"""
+        cache = ResponseCache(sqlite3.connect(":memory:"), max_bytes=300)
+        for i in range(5):
+            cache.put(f"key-{i}", _response("x" * 100))
+            time.sleep(0.01)
+
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 300
+        assert 0 < stats["entries"] < 5
+        assert cache.get("key-4") is not None
+        assert cache.get("key-0") is None
+
+    def test_disabled(self):
+        """Should neither store nor create tables when disabled"""
+        cache = ResponseCache.from_config(sqlite3.connect(":memory:"), {"enabled": False})
+        cache.put("key", _response())
+
+        assert cache.get("key") is None
+        assert cache.get_stats() == {"enabled": False, "hits": 0, "misses": 0, "hit_ratio": 0.0}
@@ -0,0 +1,160 @@
+"""
+Result cache tests
+"""
+
+import asyncio
+import sqlite3
+import time
+import pytest
+from src.result_cache import ResultCache, SingleFlight, request_key
+
+
+class TestRequestKey:
+    """Test request normalization"""
+
+    def test_whitespace_is_normalized(self):
+        """Should produce the same key for whitespace-only differences"""
+        route = {"executor": "openclaw", "model": "gpt-4"}
+
+        assert request_key("List  files\n", route) == request_key("List files", route)
+
+    def test_route_is_part_of_key(self):
+        """Should produce different keys for different executors"""
+        assert request_key("List files", {"executor": "openclaw"}) != request_key(
+            "List files", {"executor": "claude_code"}
+        )
+
+    def test_context_is_part_of_key(self):
+        """Should only share keys between requests with the same conversation context"""
+        route = {"executor": "openclaw", "model": "gpt-4"}
+        context = [{"role": "user", "content": "Hi"}]
+
+        assert request_key("List files", route, []) == request_key("List files", route)
+        assert request_key("List files", route, context) != request_key("List files", route)
+
+
+class TestSingleFlight:
+    """Test in-flight request coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_execution(self):
+        """Should execute once and hand the result to every waiter"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(
+            flight.do("key", "task_1", work),
+            flight.do("key", "task_2", work),
+            flight.do("key", "task_3", work),
+        )
+
+        assert len(calls) == 1
+        assert results[0] == ("result", None)
+        assert results[1] == ("result", "task_1")
+        assert results[2] == ("result", "task_1")
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_waiters(self):
+        """Should raise the shared exception for every waiter"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("executor down")
+
+        results = await asyncio.gather(
+            flight.do("key", "task_1", work),
+            flight.do("key", "task_2", work),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelling_one_waiter_keeps_execution(self):
+        """Should keep the shared execution alive for remaining waiters"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "result"
+
+        first = asyncio.create_task(flight.do("key", "task_1", work))
+        second = asyncio.create_task(flight.do("key", "task_2", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == ("result", None)
+
+    @pytest.mark.asyncio
+    async def test_owner_leaving_hands_result_to_next_waiter(self):
+        """Should make the earliest remaining waiter the result owner when the owner leaves"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "result"
+
+        first = asyncio.create_task(flight.do("key", "task_1", work))
+        second = asyncio.create_task(flight.do("key", "task_2", work))
+        third = asyncio.create_task(flight.do("key", "task_3", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == ("result", None)
+        assert await third == ("result", "task_2")
+
+
+class TestResultCache:
+    """Test persistent result cache"""
+
+    def test_disabled_by_default(self, tmp_path):
+        """Should not store anything unless enabled"""
+        conn = sqlite3.connect(str(tmp_path / "state.db"))
+        cache = ResultCache(conn)
+
+        cache.put("key", "task_1", "result")
+
+        assert cache.get("key") is None
+
+    def test_put_and_get_survive_restart(self, tmp_path):
+        """Should persist cached results in SQLite"""
+        db_path = str(tmp_path / "state.db")
+        cache = ResultCache(sqlite3.connect(db_path), enabled=True)
+        cache.put("key", "task_1", [{"type": "text", "text": "hello"}])
+
+        reopened = ResultCache(sqlite3.connect(db_path), enabled=True)
+
+        assert reopened.get("key") == ("task_1", [{"type": "text", "text": "hello"}])
+
+    def test_ttl_expiry(self, tmp_path):
+        """Should drop entries older than the TTL"""
+        conn = sqlite3.connect(str(tmp_path / "state.db"))
+        cache = ResultCache(conn, enabled=True, ttl_seconds=0)
+
+        cache.put("key", "task_1", "result")
+
+        assert cache.get("key") is None
+
+    def test_size_eviction(self, tmp_path):
+        """Should evict least recently used entries beyond max_entries"""
+        conn = sqlite3.connect(str(tmp_path / "state.db"))
+        cache = ResultCache(conn, enabled=True, max_entries=2)
+
+        cache.put("a", "task_a", "A")
+        time.sleep(0.001)
+        cache.put("b", "task_b", "B")
+        time.sleep(0.001)
+        cache.get("a")
+        time.sleep(0.001)
+        cache.put("c", "task_c", "C")
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
@@ -0,0 +1,75 @@
+"""
+Result store tests
+"""
+
+import json
+import sqlite3
+
+from mcp.types import TextContent
+
+from src.result_store import ENCODING_PLAIN, ENCODING_ZLIB, ResultStore
+
+
+def _store(**kwargs) -> ResultStore:
+    return ResultStore(sqlite3.connect(":memory:"), **kwargs)
+
+
+class TestResultStore:
+    """Test persisted, chunked task results"""
+
+    def test_small_result_is_stored_plain(self):
+        """Should store small results uncompressed in a single chunk"""
+        store = _store()
+
+        info = store.put("task-1", "done")
+
+        assert info == {"encoding": ENCODING_PLAIN, "size": 6, "stored_size": 6, "chunks": 1}
+        assert store.get("task-1") == "done"
+        assert store.get_info("task-1") == info
+
+    def test_large_result_is_chunked_and_compressed(self):
+        """Should split large results into independently compressed chunks"""
+        store = _store(chunk_size=1000, compress_threshold=100)
+        content = {"output": "line of output\n" * 500}
+
+        info = store.put("task-1", content)
+        text = json.dumps(content, separators=(",", ":"))
+
+        assert info["encoding"] == ENCODING_ZLIB
+        assert info["chunks"] == -(-len(text) // 1000)
+        assert info["stored_size"] < info["size"]
+        assert store.get_chunk("task-1", 1) == text[1000:2000]
+        assert "".join(store.iter_chunks("task-1")) == text
+        assert store.get("task-1") == content
+
+    def test_multibyte_text_chunks_decode_independently(self):
+        """Should chunk by characters so every chunk is valid text"""
+        store = _store(chunk_size=7, compress_threshold=10)
+        content = "任務結果" * 10
+
+        store.put("task-1", content)
+
+        assert store.get("task-1") == content
+        assert all(chunk for chunk in store.iter_chunks("task-1"))
+
+    def test_mcp_content_blocks(self):
+        """Should serialize MCP content blocks"""
+        store = _store()
+
+        store.put("task-1", [TextContent(type="text", text="done")])
+
+        assert store.get("task-1")[0]["text"] == "done"
+
+    def test_overwrite_and_delete(self):
+        """Should replace old chunks on overwrite and remove everything on delete"""
+        store = _store(chunk_size=5, compress_threshold=1000)
+        store.put("task-1", "a" * 50)
+        store.put("task-1", "b")
+
+        assert store.get("task-1") == "b"
+        assert store.get_chunk("task-1", 3) is None
+
+        store.delete("task-1")
+        assert store.get("task-1") is None
+        assert store.get_info("task-1") is None
+        assert list(store.iter_chunks("task-1")) == []
@@ -0,0 +1,89 @@
+"""
+Retry scheduler tests
+"""
+
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from src.retry_scheduler import RetryBudget, RetryScheduler
+from src.state_manager import StateManager
+
+
+class TestRetryBudget:
+    """Test global retry budget"""
+
+    def test_min_retries_without_traffic(self):
+        """Should allow the minimum retry allowance when idle"""
+        budget = RetryBudget(ratio=0.1, min_retries_per_second=0.2, window_seconds=10)
+
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is False
+
+    def test_ratio_scales_with_requests(self):
+        """Should allow retries proportional to request volume"""
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, window_seconds=10)
+        for _ in range(10):
+            budget.record_request()
+
+        granted = sum(budget.try_acquire() for _ in range(20))
+
+        assert granted == 5
+        assert budget.get_stats() == {"requests": 10, "retries": 5}
+
+
+class TestRetryScheduler:
+    """Test delayed retry queue"""
+
+    def test_full_jitter_bounds(self):
+        """Should draw delays uniformly between zero and the capped backoff"""
+        scheduler = RetryScheduler(base_delay=1.0, max_delay=5.0)
+
+        delays = [scheduler.backoff(10) for _ in range(200)]
+
+        assert all(0 <= d <= 5.0 for d in delays)
+        assert len(set(delays)) > 1
+
+    @pytest.mark.asyncio
+    async def test_waiters_fire_in_due_order(self):
+        """Should wake waiters in due order from a single timer"""
+        scheduler = RetryScheduler()
+        order = []
+
+        async def wait(name, delay):
+            await scheduler.wait(name, 1, delay)
+            order.append(name)
+
+        await asyncio.gather(wait("late", 0.03), wait("early", 0.01), wait("mid", 0.02))
+
+        assert order == ["early", "mid", "late"]
+        assert scheduler.pending() == 0
+
+    @pytest.mark.asyncio
+    async def test_schedule_is_persisted(self, tmp_path):
+        """Should persist the retry schedule while waiting and clear it afterwards"""
+        manager = StateManager(str(tmp_path / "state.db"))
+        scheduler = RetryScheduler(state_manager=manager)
+
+        waiter = asyncio.create_task(scheduler.wait("task_1", 2, 0.02, "Timeout"))
+        await asyncio.sleep(0)
+
+        schedule = manager.get_retry_schedule()
+        assert schedule[0]["task_id"] == "task_1"
+        assert schedule[0]["attempt"] == 2
+        assert schedule[0]["last_error"] == "Timeout"
+
+        await waiter
+        assert manager.get_retry_schedule() == []
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_waiters(self):
+        """Should cancel pending retries on close"""
+        scheduler = RetryScheduler(state_manager=MagicMock())
+
+        waiter = asyncio.create_task(scheduler.wait("task_1", 1, 10))
+        await asyncio.sleep(0)
+        scheduler.close()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
@@ -124,3 +124,60 @@ class TestRouterDecision:
 
         assert route["model"] == "gpt-3.5-turbo"
         mock_router.get_lightweight_model.assert_called_once()
+
+    def test_tight_deadline_uses_lightweight_model(self):
+        """Should route to the lightweight model when the deadline is close"""
+        import time
+
+        mock_router = MagicMock()
+        mock_router.get_lightweight_model.return_value = "gpt-3.5-turbo"
+
+        router = RouterDecision(mcp_client=MagicMock(), lite_llm_router=mock_router)
+
+        task = {
+            "description": "Implement a distributed caching system with fault tolerance",
+            "deadline": time.time() + 5,
+        }
+        route = router.route_task(task)
+
+        assert route["model"] == "gpt-3.5-turbo"
+        assert 0 < route["remaining_seconds"] <= 5
+
+    def test_apply_config_threshold(self):
+        """Should honor a reloaded complexity threshold"""
+        mock_router = MagicMock()
+        router = RouterDecision(mcp_client=MagicMock(), lite_llm_router=mock_router)
+
+        router.apply_config({"complexity_threshold": 0})
+        router.route_task({"description": "What time is it?"})
+
+        mock_router.get_model.assert_called_once()
+
+    def test_budget_pressure_routes_to_free_model(self):
+        """Should switch to the free model when the budget guard reports pressure"""
+        mock_router = MagicMock()
+        mock_router.get_model.return_value = "gpt-4"
+        router = RouterDecision(mcp_client=MagicMock(), lite_llm_router=mock_router)
+        router.apply_config({"complexity_threshold": 0, "free_model": "cliproxy/claude"})
+
+        router.budget_guard = lambda: False
+        assert router.route_task({"description": "Design a system"})["model"] == "gpt-4"
+
+        router.budget_guard = lambda: True
+        route = router.route_task({"description": "Design a system"})
+
+        assert route["model"] == "cliproxy/claude"
+        assert route["budget_limited"] is True
+
+    def test_budget_guard_without_free_model(self):
+        """Should keep the normal model when no free model is configured"""
+        mock_router = MagicMock()
+        mock_router.get_model.return_value = "gpt-4"
+        router = RouterDecision(mcp_client=MagicMock(), lite_llm_router=mock_router)
+        router.apply_config({"complexity_threshold": 0})
+        router.budget_guard = lambda: True
+
+        route = router.route_task({"description": "Design a system"})
+
+        assert route["model"] == "gpt-4"
+        assert "budget_limited" not in route
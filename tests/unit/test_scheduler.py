@@ -0,0 +1,154 @@
+"""
+Task scheduler tests
+"""
+
+import asyncio
+import pytest
+from src.scheduler import PriorityClass, TaskScheduler
+
+
+async def _drain(scheduler, order, priority_class, label, complexity=0):
+    """Acquire a slot, record dispatch order, release immediately"""
+    async with scheduler.slot(priority_class, complexity):
+        order.append(label)
+
+
+class TestTaskScheduler:
+    """Test priority classification and weighted fair queuing"""
+
+    def test_classify_from_route(self):
+        """Should map Moltworker routes to the 24/7 class"""
+        scheduler = TaskScheduler()
+
+        assert scheduler.classify({"executor": "moltworker"}) == PriorityClass.ALWAYS_ON
+        assert scheduler.classify({"executor": "openclaw"}) == PriorityClass.INTERACTIVE
+
+    def test_classify_client_priority_overrides_route(self):
+        """Should prefer client-supplied priority over the route"""
+        scheduler = TaskScheduler()
+
+        assert (
+            scheduler.classify({"executor": "moltworker"}, "batch") == PriorityClass.BATCH
+        )
+        with pytest.raises(ValueError):
+            scheduler.classify({"executor": "openclaw"}, "urgent")
+
+    def test_from_config(self):
+        """Should build scheduler from config section"""
+        scheduler = TaskScheduler.from_config(
+            {
+                "max_concurrency": 2,
+                "weights": {"batch": 5},
+                "shortest_job_first": True,
+                "sjf_seconds_per_point": 0.2,
+            }
+        )
+
+        assert scheduler.max_concurrency == 2
+        assert scheduler.weights[PriorityClass.BATCH] == 5.0
+        assert scheduler.weights[PriorityClass.INTERACTIVE] == 8.0
+        assert scheduler.shortest_job_first is True
+        assert scheduler.sjf_seconds_per_point == 0.2
+
+    @pytest.mark.asyncio
+    async def test_weighted_fair_share(self):
+        """Should dispatch classes proportionally to their weights"""
+        scheduler = TaskScheduler(
+            max_concurrency=1,
+            weights={PriorityClass.INTERACTIVE: 3.0, PriorityClass.BATCH: 1.0},
+            aging_rate=0.0,
+        )
+        order = []
+
+        await scheduler.acquire(PriorityClass.INTERACTIVE)
+        waiters = [
+            asyncio.create_task(_drain(scheduler, order, PriorityClass.BATCH, "b"))
+            for _ in range(4)
+        ] + [
+            asyncio.create_task(_drain(scheduler, order, PriorityClass.INTERACTIVE, "i"))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*waiters)
+
+        # 前 4 次調度中 interactive 應佔 3 次
+        assert order[:4].count("i") == 3
+
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self):
+        """Should dispatch a long-waiting low-weight task ahead of fresh ones"""
+        scheduler = TaskScheduler(
+            max_concurrency=1,
+            weights={PriorityClass.INTERACTIVE: 100.0, PriorityClass.BATCH: 0.01},
+            aging_rate=1000.0,
+        )
+        order = []
+
+        await scheduler.acquire(PriorityClass.INTERACTIVE)
+        batch = asyncio.create_task(_drain(scheduler, order, PriorityClass.BATCH, "b"))
+        await asyncio.sleep(0.05)
+        interactive = asyncio.create_task(
+            _drain(scheduler, order, PriorityClass.INTERACTIVE, "i")
+        )
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(batch, interactive)
+
+        assert order[0] == "b"
+
+    @pytest.mark.asyncio
+    async def test_shortest_job_first(self):
+        """Should dispatch low-complexity tasks first within a class"""
+        scheduler = TaskScheduler(max_concurrency=1, shortest_job_first=True)
+        order = []
+
+        await scheduler.acquire(PriorityClass.BATCH)
+        waiters = [
+            asyncio.create_task(
+                _drain(scheduler, order, PriorityClass.BATCH, label, complexity)
+            )
+            for label, complexity in [("long", 90), ("short", 10)]
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*waiters)
+
+        assert order == ["short", "long"]
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_metrics(self):
+        """Should expose per-class queue-wait metrics"""
+        scheduler = TaskScheduler(max_concurrency=1)
+
+        await scheduler.acquire(PriorityClass.INTERACTIVE)
+        waiter = asyncio.create_task(scheduler.acquire(PriorityClass.BATCH))
+        await asyncio.sleep(0.02)
+
+        stats = scheduler.get_stats()
+        assert stats["classes"]["batch"]["queued"] == 1
+
+        scheduler.release()
+        await waiter
+
+        stats = scheduler.get_stats()
+        assert stats["running"] == 1
+        assert stats["classes"]["batch"]["dispatched"] == 1
+        assert stats["classes"]["batch"]["max_wait_ms"] >= 10
+        assert stats["classes"]["interactive"]["dispatched"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_skipped(self):
+        """Should not hand a slot to a cancelled waiter"""
+        scheduler = TaskScheduler(max_concurrency=1)
+
+        await scheduler.acquire(PriorityClass.INTERACTIVE)
+        waiter = asyncio.create_task(scheduler.acquire(PriorityClass.BATCH))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        scheduler.release()
+
+        assert scheduler.get_stats()["running"] == 0
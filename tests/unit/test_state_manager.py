@@ -2,9 +2,12 @@
 State management tests
 """
 
+import json
 import os
+import sqlite3
+import time
 import pytest
-from src.state_manager import StateManager, TaskState
+from src.state_manager import StateManager, TaskRecord, TaskState
 
 
 class TestStateManager:
@@ -21,8 +24,8 @@ class TestStateManager:
         assert isinstance(task_id, str)
 
         task = manager.get_task(task_id)
-        assert task["description"] == "Test task description"
-        assert task["state"] == TaskState.IDLE.value
+        assert task.description == "Test task description"
+        assert task.state == TaskState.IDLE
 
     def test_update_task_state(self, tmp_path):
         """Should update task state correctly"""
@@ -33,7 +36,7 @@ class TestStateManager:
         manager.update_state(task_id, TaskState.DISPATCHING)
 
         task = manager.get_task(task_id)
-        assert task["state"] == TaskState.DISPATCHING.value
+        assert task.state == TaskState.DISPATCHING
 
     def test_state_transitions(self, tmp_path):
         """Should handle all state transitions"""
@@ -44,15 +47,15 @@ class TestStateManager:
 
         # IDLE -> DISPATCHING
         manager.update_state(task_id, TaskState.DISPATCHING)
-        assert manager.get_task(task_id)["state"] == TaskState.DISPATCHING.value
+        assert manager.get_task(task_id).state == TaskState.DISPATCHING
 
         # DISPATCHING -> EXECUTING
         manager.update_state(task_id, TaskState.EXECUTING)
-        assert manager.get_task(task_id)["state"] == TaskState.EXECUTING.value
+        assert manager.get_task(task_id).state == TaskState.EXECUTING
 
         # EXECUTING -> COMPLETED
         manager.update_state(task_id, TaskState.COMPLETED)
-        assert manager.get_task(task_id)["state"] == TaskState.COMPLETED.value
+        assert manager.get_task(task_id).state == TaskState.COMPLETED
 
     def test_get_pending_tasks(self, tmp_path):
         """Should retrieve all non-completed tasks"""
@@ -71,4 +74,307 @@ class TestStateManager:
         pending = manager.get_pending_tasks()
 
         assert len(pending) == 2
-        assert task3 not in [t["task_id"] for t in pending]
+        assert task3 not in [t.task_id for t in pending]
+
+    def test_migrates_legacy_database(self, tmp_path):
+        """Should add new columns to a database created by an older version"""
+        import sqlite3
+
+        db_path = tmp_path / "state.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute(
+            "CREATE TABLE tasks (task_id TEXT PRIMARY KEY, description TEXT NOT NULL, "
+            "state TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+            "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO tasks (task_id, description, state) VALUES ('old', 'Old task', 'idle')")
+        conn.commit()
+        conn.close()
+
+        manager = StateManager(str(db_path))
+        manager.record_result_source("old", "cache", "origin")
+
+        task = manager.get_task("old")
+        assert task.result_source == "cache"
+        assert task.source_task_id == "origin"
+
+    def test_get_tasks_by_states(self, tmp_path):
+        """Should return only tasks in the requested states"""
+        manager = StateManager(str(tmp_path / "state.db"))
+
+        dispatching = manager.create_task("Task 1")
+        manager.update_state(dispatching, TaskState.DISPATCHING)
+        executing = manager.create_task("Task 2")
+        manager.update_state(executing, TaskState.EXECUTING)
+        manager.create_task("Task 3")
+
+        tasks = manager.get_tasks_by_states([TaskState.DISPATCHING, TaskState.EXECUTING])
+
+        assert {t.task_id for t in tasks} == {dispatching, executing}
+        assert manager.get_tasks_by_states([]) == []
+
+    def test_create_task_with_deadline(self, tmp_path):
+        """Should persist the client-supplied deadline"""
+        manager = StateManager(str(tmp_path / "state.db"))
+
+        task_id = manager.create_task("Test task", deadline=1700000000.5)
+
+        assert manager.get_task(task_id).deadline == 1700000000.5
+
+    def test_create_task_with_session(self, tmp_path):
+        """Should persist the conversation session of a task"""
+        manager = StateManager(str(tmp_path / "state.db"))
+
+        task_id = manager.create_task("Test task", session_id="session-1")
+
+        assert manager.get_task(task_id).session_id == "session-1"
+        assert manager.get_task(manager.create_task("Other")).session_id is None
+
+    def test_close_persists_state(self, tmp_path):
+        """Should commit and close the connection so a new process sees the state"""
+        db_path = str(tmp_path / "state.db")
+        manager = StateManager(db_path)
+        task_id = manager.create_task("Test task")
+        manager.update_state(task_id, TaskState.EXECUTING)
+
+        manager.close()
+
+        reopened = StateManager(db_path)
+        assert reopened.get_task(task_id).state == TaskState.EXECUTING
+
+    def test_records_state_transition_timeline(self, tmp_path):
+        """Should log every state transition and buffered events in order"""
+        manager = StateManager(str(tmp_path / "state.db"))
+        task_id = manager.create_task("Test task")
+        manager.update_state(task_id, TaskState.DISPATCHING)
+        manager.record_event(task_id, "route", executor="openclaw", model="gpt-4")
+        manager.update_state(task_id, TaskState.EXECUTING)
+        manager.update_state(task_id, TaskState.COMPLETED)
+
+        events = manager.get_task_events(task_id)
+
+        assert [e["kind"] for e in events] == ["state", "state", "route", "state", "state"]
+        assert [e.get("state") for e in events if e["kind"] == "state"] == [
+            "idle",
+            "dispatching",
+            "executing",
+            "completed",
+        ]
+        assert events[2]["executor"] == "openclaw"
+        assert all(a["at"] <= b["at"] for a, b in zip(events, events[1:]))
+
+    def test_events_are_batched(self, tmp_path):
+        """Should buffer standalone events until the batch size is reached"""
+        manager = StateManager(
+            str(tmp_path / "state.db"), event_batch_size=3, event_flush_interval=60
+        )
+        task_id = manager.create_task("Test task")
+
+        def stored():
+            return manager.conn.execute(
+                "SELECT COUNT(*) FROM task_events WHERE kind = 'route'"
+            ).fetchone()[0]
+
+        manager.record_event(task_id, "route", executor="openclaw")
+        manager.record_event(task_id, "route", executor="openclaw")
+        assert stored() == 0
+
+        manager.record_event(task_id, "route", executor="openclaw")
+        assert stored() == 3
+
+    def test_deferred_state_is_write_behind(self, tmp_path):
+        """Should buffer deferred states but still serve them to readers"""
+        manager = StateManager(
+            str(tmp_path / "state.db"), event_batch_size=100, event_flush_interval=60
+        )
+        task_id = manager.create_task("Test task")
+        other = sqlite3.connect(str(tmp_path / "state.db"))
+
+        def stored_state():
+            return other.execute(
+                "SELECT state FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()[0]
+
+        manager.update_state(task_id, TaskState.DISPATCHING, defer=True)
+        assert stored_state() == TaskState.IDLE.value
+
+        assert manager.get_task(task_id).state == TaskState.DISPATCHING
+        assert stored_state() == TaskState.DISPATCHING.value
+
+        manager.update_state(task_id, TaskState.EXECUTING, defer=True)
+        manager.update_state(task_id, TaskState.COMPLETED)
+        assert stored_state() == TaskState.COMPLETED.value
+        states = [e["state"] for e in manager.get_task_events(task_id) if e["kind"] == "state"]
+        assert states == ["idle", "dispatching", "executing", "completed"]
+
+    def test_get_slowest_stages(self, tmp_path):
+        """Should rank stage durations within the window, slowest first"""
+        manager = StateManager(str(tmp_path / "state.db"))
+        now = time.time()
+        manager.conn.executemany(
+            "INSERT INTO task_events (task_id, at, kind, data) VALUES (?, ?, 'state', ?)",
+            [
+                ("fast", now - 10, '{"state":"executing"}'),
+                ("fast", now - 9, '{"state":"completed"}'),
+                ("slow", now - 10, '{"state":"executing"}'),
+                ("slow", now - 5, '{"state":"completed"}'),
+                ("old", now - 7200, '{"state":"executing"}'),
+                ("old", now - 3700, '{"state":"completed"}'),
+            ],
+        )
+
+        slowest = manager.get_slowest_stages(stage="executing")
+
+        assert [s["task_id"] for s in slowest] == ["slow", "fast"]
+        assert slowest[0]["duration_ms"] == pytest.approx(5000)
+        assert manager.get_slowest_stages(stage="completed") == []
+
+    def test_claim_is_exclusive(self, tmp_path):
+        """Should let only one instance claim an unowned task"""
+        db_path = str(tmp_path / "state.db")
+        first = StateManager(db_path, instance_id="a")
+        second = StateManager(db_path, instance_id="b")
+        task_id = first.create_task("Queued task", claim=False)
+
+        claimed = first.claim_tasks([TaskState.IDLE])
+
+        assert [task.task_id for task in claimed] == [task_id]
+        assert claimed[0].owner == "a"
+        assert second.claim_tasks([TaskState.IDLE]) == []
+        event = first.get_task_events(task_id)[-1]
+        assert (event["kind"], event["owner"]) == ("lease", "a")
+
+    def test_created_tasks_are_owned(self, tmp_path):
+        """Should hold a lease on tasks created for immediate processing"""
+        db_path = str(tmp_path / "state.db")
+        manager = StateManager(db_path, instance_id="a")
+
+        task_id = manager.create_task("Live task")
+
+        assert manager.get_task(task_id).owner == "a"
+        assert StateManager(db_path, instance_id="b").claim_tasks([TaskState.IDLE]) == []
+        # A restart with a fixed instance id may reclaim its own leftovers
+        restarted = StateManager(db_path, instance_id="a")
+        assert len(restarted.claim_tasks([TaskState.IDLE], include_own=True)) == 1
+
+    def test_expired_lease_is_taken_over(self, tmp_path):
+        """Should allow another instance to claim a task whose lease expired"""
+        db_path = str(tmp_path / "state.db")
+        first = StateManager(db_path, instance_id="a", lease_seconds=0.05)
+        second = StateManager(db_path, instance_id="b")
+        task_id = first.create_task("Task")
+        first.update_state(task_id, TaskState.DISPATCHING)
+
+        assert second.claim_tasks([TaskState.DISPATCHING]) == []
+        time.sleep(0.06)
+        claimed = second.claim_tasks([TaskState.DISPATCHING])
+
+        assert claimed[0].owner == "b"
+        assert first.renew_leases([task_id]) == []
+        assert second.renew_leases([task_id]) == [task_id]
+
+    def test_claim_limit_and_release(self, tmp_path):
+        """Should claim at most the requested number and re-queue released tasks"""
+        manager = StateManager(str(tmp_path / "state.db"), instance_id="a")
+        for i in range(3):
+            manager.create_task(f"Task {i}", claim=False)
+
+        claimed = manager.claim_tasks([TaskState.IDLE], limit=2)
+        assert len(claimed) == 2
+        assert len(manager.claim_tasks([TaskState.IDLE], limit=0)) == 0
+
+        manager.release_task(claimed[0].task_id)
+        task = manager.get_task(claimed[0].task_id)
+        assert task.owner is None
+        assert len(manager.claim_tasks([TaskState.IDLE])) == 2
+
+    def test_wal_and_bounded_busy_timeout(self, tmp_path):
+        """Should open in WAL mode, keep reading under a foreign write lock, bound the wait"""
+        db_path = str(tmp_path / "state.db")
+        manager = StateManager.from_config({"db_path": db_path, "busy_timeout": 0.05})
+        task_id = manager.create_task("Shared task")
+
+        assert manager.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert manager.conn.execute("PRAGMA busy_timeout").fetchone()[0] == 50
+
+        other = sqlite3.connect(db_path)
+        other.execute("BEGIN IMMEDIATE")
+        other.execute("UPDATE tasks SET description = 'locked'")
+        try:
+            assert manager.get_task(task_id).description == "Shared task"
+            started = time.monotonic()
+            with pytest.raises(sqlite3.OperationalError):
+                manager.create_task("Blocked task")
+            assert time.monotonic() - started < 1
+        finally:
+            other.rollback()
+            other.close()
+
+
+class TestTaskRecord:
+    """Test the typed task record returned by StateManager"""
+
+    def test_record_is_built_from_rows(self, tmp_path):
+        """Should materialize query rows directly into slotted records"""
+        manager = StateManager(str(tmp_path / "state.db"))
+        task_id = manager.create_task("Typed task", deadline=1700000000.5, session_id="s1")
+
+        task = manager.get_task(task_id)
+        assert isinstance(task, TaskRecord)
+        assert task.state is TaskState.IDLE
+        assert not hasattr(task, "__dict__")
+        assert manager.get_pending_tasks() == [task]
+
+    def test_json_encoding(self):
+        """Should encode persisted fields compactly with the state as its value"""
+        task = TaskRecord(
+            "t1", "Encode me", TaskState.EXECUTING, conversation_history=[{"role": "user"}]
+        )
+
+        encoded = task.to_json()
+        assert " " not in encoded.replace("Encode me", "")
+        decoded = json.loads(encoded)
+        assert list(decoded) == list(TaskRecord.FIELDS)
+        assert decoded["state"] == "executing"
+        assert "conversation_history" not in decoded
+
+
+class TestSubtasks:
+    """Test parent/child task links and their leases"""
+
+    def test_create_subtasks_and_tree(self, tmp_path):
+        """Should store children with sibling dependencies and return them as a tree"""
+        manager = StateManager(str(tmp_path / "state.db"))
+        parent = manager.create_task("Implement X and document Y", deadline=1700000000.0)
+
+        code, docs, review = manager.create_subtasks(
+            parent, [("Implement X", []), ("Document Y", []), ("Review", [0, 1])]
+        )
+
+        subtasks = manager.get_subtasks(parent)
+        assert [t.task_id for t in subtasks] == [code, docs, review]
+        assert subtasks[2].depends_on == (code, docs)
+        assert all(t.parent_id == parent and t.deadline == 1700000000.0 for t in subtasks)
+        assert manager.has_subtasks(parent) and not manager.has_subtasks(code)
+
+        tree = manager.get_task_tree(parent)
+        assert tree["task_id"] == parent
+        assert [node["task_id"] for node in tree["subtasks"]] == [code, docs, review]
+        assert tree["subtasks"][2]["depends_on"] == [code, docs]
+        assert manager.get_task_tree("missing") is None
+
+    def test_subtasks_are_leased_with_parent(self, tmp_path):
+        """Should claim, renew and release subtasks only through their parent"""
+        db_path = str(tmp_path / "state.db")
+        first = StateManager(db_path, instance_id="a")
+        second = StateManager(db_path, instance_id="b")
+        parent = first.create_task("Parent", claim=False)
+        (child,) = first.create_subtasks(parent, [("Child", [])])
+
+        claimed = second.claim_tasks([TaskState.IDLE])
+        assert [t.task_id for t in claimed] == [parent]
+        assert second.get_task(child).owner == "b"
+        assert sorted(second.renew_leases([parent])) == sorted([parent, child])
+
+        second.release_task(parent)
+        assert second.get_task(child).owner is None
@@ -0,0 +1,119 @@
+"""
+Task graph tests
+"""
+
+import asyncio
+
+import pytest
+
+from src.state_manager import TaskRecord, TaskState
+from src.task_graph import TaskGraph, parse_subtasks
+
+
+def _record(task_id: str, *depends_on: str) -> TaskRecord:
+    return TaskRecord(task_id, f"Subtask {task_id}", TaskState.IDLE, depends_on=depends_on)
+
+
+def _skip(task: TaskRecord) -> dict:
+    return {"task_id": task.task_id, "status": "skipped"}
+
+
+class TestParseSubtasks:
+    """Test validation of client-submitted subtask lists"""
+
+    def test_resolves_ids_and_indices(self):
+        """Should resolve dependencies given by id or by position"""
+        plan = parse_subtasks(
+            [
+                {"id": "code", "description": "Implement X"},
+                {"description": "Write docs for Y"},
+                {"description": "Review", "depends_on": ["code", 1, "code"]},
+            ]
+        )
+
+        assert plan == [("Implement X", []), ("Write docs for Y", []), ("Review", [0, 1])]
+
+    @pytest.mark.parametrize(
+        "specs",
+        [
+            [],
+            [{"description": ""}],
+            [{"id": "a", "description": "A"}, {"id": "a", "description": "B"}],
+            [{"description": "A", "depends_on": ["missing"]}],
+            [{"description": "A", "depends_on": [0]}],
+            [{"description": "A", "depends_on": [True]}],
+            [
+                {"id": "a", "description": "A", "depends_on": ["b"]},
+                {"id": "b", "description": "B", "depends_on": ["a"]},
+            ],
+        ],
+    )
+    def test_rejects_invalid_graphs(self, specs):
+        """Should reject empty lists, bad ids, unknown or self dependencies and cycles"""
+        with pytest.raises(ValueError):
+            parse_subtasks(specs)
+
+
+class TestTaskGraph:
+    """Test dependency-ordered parallel execution"""
+
+    @pytest.mark.asyncio
+    async def test_independent_subtasks_run_in_parallel(self):
+        """Should start independent subtasks together and dependents after them"""
+        running = set()
+        overlaps = []
+        order = []
+
+        async def run(task):
+            running.add(task.task_id)
+            overlaps.append(set(running))
+            await asyncio.sleep(0.01)
+            running.discard(task.task_id)
+            order.append(task.task_id)
+            return {"task_id": task.task_id, "status": "completed"}
+
+        graph = TaskGraph([_record("a"), _record("b"), _record("c", "a", "b")], run, _skip)
+        results = await graph.run()
+
+        assert [r["task_id"] for r in results] == ["a", "b", "c"]
+        assert {"a", "b"} in overlaps
+        assert order[-1] == "c"
+
+    @pytest.mark.asyncio
+    async def test_failed_dependency_skips_dependents(self):
+        """Should skip subtasks whose dependencies failed, transitively"""
+        ran = []
+
+        async def run(task):
+            ran.append(task.task_id)
+            if task.task_id == "a":
+                raise RuntimeError("boom")
+            return {"task_id": task.task_id, "status": "completed"}
+
+        graph = TaskGraph(
+            [_record("a"), _record("b", "a"), _record("c", "b"), _record("d")], run, _skip
+        )
+        results = await graph.run()
+
+        assert [r["status"] for r in results] == ["failed", "skipped", "skipped", "completed"]
+        assert sorted(ran) == ["a", "d"]
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_running_subtasks(self):
+        """Should cancel in-flight subtasks when the graph run is cancelled"""
+        cancelled = []
+
+        async def run(task):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(task.task_id)
+                raise
+
+        run_graph = asyncio.create_task(TaskGraph([_record("a"), _record("b")], run, _skip).run())
+        await asyncio.sleep(0.01)
+        run_graph.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run_graph
+
+        assert sorted(cancelled) == ["a", "b"]
@@ -0,0 +1,73 @@
+"""
+Traffic capture tests
+"""
+
+import json
+
+from src.traffic_capture import TrafficRecorder, load_capture
+
+ROUTE = {"executor": "openclaw", "model": "gpt-4", "complexity": 40}
+
+
+def _request(description):
+    return json.dumps({"method": "create_task", "params": {"description": description}})
+
+
+class TestTrafficRecorder:
+    """Test opt-in request and executor-latency recording"""
+
+    def test_disabled_by_default(self, tmp_path):
+        """Should record nothing unless enabled"""
+        recorder = TrafficRecorder.from_config({"path": str(tmp_path / "t.jsonl")})
+
+        recorder.record_request(1.0, _request("a"), "{}", 0.1)
+        recorder.close()
+
+        assert not recorder.enabled
+        assert not (tmp_path / "t.jsonl").exists()
+
+    def test_round_trip_through_gzip_file(self, tmp_path):
+        """Should write compact records that load back sorted by time"""
+        path = str(tmp_path / "traffic.jsonl.gz")
+        recorder = TrafficRecorder(path, enabled=True, flush_every=1)
+
+        recorder.record_request(
+            20.0,
+            _request("second"),
+            json.dumps({"result": {"task_id": "t2", "status": "completed"}}),
+            0.05,
+        )
+        recorder.record_request(10.0, _request("first"), json.dumps({"result": {}}), 0.01)
+        recorder.record_request(11.0, json.dumps({"method": "ping"}), "{}", 0.0)
+        recorder.record_execution("t2", "second", ROUTE, "openclaw", 0.002, 0.04, 120, 30)
+        recorder.close()
+
+        requests, executions = load_capture(path)
+        assert [r["p"]["description"] for r in requests] == ["first", "second"]
+        assert requests[1]["task"] == "t2" and requests[1]["s"] == "completed"
+        assert executions == [
+            {
+                "k": "exec",
+                "t": executions[0]["t"],
+                "task": "t2",
+                "d": "second",
+                "e": "openclaw",
+                "mo": "gpt-4",
+                "c": 40,
+                "w": 2.0,
+                "ms": 40.0,
+                "in": 120,
+                "out": 30,
+            }
+        ]
+
+    def test_stops_at_byte_limit(self, tmp_path):
+        """Should stop recording once the byte limit is reached"""
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(str(path), enabled=True, max_bytes=100, flush_every=1)
+
+        for i in range(10):
+            recorder.record_request(float(i), _request(f"task {i}"), "{}", 0.0)
+
+        assert not recorder.enabled
+        assert len(path.read_text().splitlines()) == 2
@@ -0,0 +1,97 @@
+"""
+Traffic replay tests
+"""
+
+import json
+
+import pytest
+
+from src.traffic_replay import ReplayExecutor, main, replay_message
+
+
+def _capture(path, descriptions, latency_ms=20.0):
+    records = []
+    for i, description in enumerate(descriptions):
+        t = 1000.0 + i * 0.01
+        records.append(
+            {
+                "k": "req",
+                "t": t,
+                "m": "create_task",
+                "p": {"description": description, "wait": False, "deadline": t + 60},
+                "s": "completed",
+                "ms": latency_ms,
+            }
+        )
+        records.append(
+            {
+                "k": "exec",
+                "t": t,
+                "d": description,
+                "e": "openclaw",
+                "mo": "gpt-4",
+                "w": 0.0,
+                "ms": latency_ms,
+                "in": 1000,
+                "out": 1000,
+            }
+        )
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+
+class TestTrafficReplay:
+    """Test deterministic replay of captured traffic"""
+
+    def test_replay_message_rebases_deadlines(self):
+        """Should turn absolute deadlines into sped-up timeouts and run queued tasks inline"""
+        record = {"t": 100.0, "m": "create_task", "p": {"description": "x", "deadline": 160.0}}
+
+        params = json.loads(replay_message(record, speed=10))["params"]
+
+        assert params == {"description": "x", "timeout": 6.0}
+        record["p"] = {"description": "x", "timeout": 30, "wait": False}
+        assert json.loads(replay_message(record, speed=3))["params"]["timeout"] == 10.0
+
+    @pytest.mark.asyncio
+    async def test_executor_stub_replays_latency_and_usage(self):
+        """Should answer with the recorded usage and fail where the capture failed"""
+        stub = ReplayExecutor(
+            [
+                {"d": "ok", "ms": 1.0, "in": 5, "out": 7},
+                {"d": "bad", "ms": 1.0, "err": "Executor crashed"},
+            ],
+            speed=10,
+        )
+
+        result = await stub.call_tool("execute_task", description="ok")
+        assert result.usage == {"input_tokens": 5, "output_tokens": 7}
+        with pytest.raises(RuntimeError, match="Executor crashed"):
+            await stub.call_tool("execute_task", description="bad")
+
+    @pytest.mark.asyncio
+    async def test_report_compares_routing_queueing_and_cost(self, tmp_path, capsys):
+        """Should replay against a candidate config and report what would change"""
+        capture = tmp_path / "traffic.jsonl"
+        _capture(capture, ["Implement a parser", "List files", "Fix the login bug"])
+        config = tmp_path / "candidate.yaml"
+        config.write_text(
+            "scheduler:\n  max_concurrency: 1\n"
+            "usage:\n  prices:\n"
+            "    gpt-4: {input: 30, output: 60}\n"
+            "    gpt-3.5-turbo: {input: 1, output: 2}\n"
+        )
+
+        assert await main([str(capture), "--config", str(config), "--speed", "10"]) == 0
+
+        report = json.loads(capsys.readouterr().out)
+        assert report["requests"] == 3
+        assert report["status"]["replayed"] == {"completed": 3}
+        # Programming tasks now route to claude_code, and all three to the lightweight model
+        assert report["routing"]["compared"] == 3
+        assert report["routing"]["changed"] == 3
+        assert report["routing"]["replayed"]["claude_code/gpt-3.5-turbo"] == 2
+        assert report["cost"]["recorded"] == pytest.approx(0.27)
+        assert report["cost"]["replayed"] < report["cost"]["recorded"]
+        # One execution slot: later arrivals wait behind the first
+        assert report["queue_wait_ms"]["replayed"]["max"] > 0
+        assert not (tmp_path / "state.db").exists()
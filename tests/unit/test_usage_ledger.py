@@ -0,0 +1,130 @@
+"""
+Usage ledger tests
+"""
+
+import sqlite3
+import time
+from types import SimpleNamespace
+
+from src.usage_ledger import UsageLedger, extract_usage
+
+PRICES = {"gpt-4": {"input": 30.0, "output": 60.0}}
+
+
+def _ledger(**kwargs) -> UsageLedger:
+    return UsageLedger(sqlite3.connect(":memory:"), prices=PRICES, **kwargs)
+
+
+class TestExtractUsage:
+    """Test token usage extraction"""
+
+    def test_anthropic_response(self):
+        """Should read input/output tokens and the model from a direct API response"""
+        response = {
+            "model": "claude-3-5-sonnet-20241022",
+            "usage": {"input_tokens": 12, "output_tokens": 34},
+        }
+
+        assert extract_usage(response) == (12, 34, "claude-3-5-sonnet-20241022")
+
+    def test_openai_style_usage(self):
+        """Should accept prompt/completion token names"""
+        response = {"usage": {"prompt_tokens": 5, "completion_tokens": 7}}
+
+        assert extract_usage(response) == (5, 7, None)
+
+    def test_mcp_structured_content(self):
+        """Should read usage reported in an MCP tool result"""
+        result = SimpleNamespace(
+            content=[], structuredContent={"usage": {"input_tokens": 3, "output_tokens": 4}}
+        )
+
+        assert extract_usage(result) == (3, 4, None)
+
+    def test_missing_usage(self):
+        """Should report zero tokens when the result carries no usage"""
+        assert extract_usage("done") == (0, 0, None)
+
+
+class TestUsageLedger:
+    """Test batched usage recording and budgets"""
+
+    def test_cost_from_price_table(self):
+        """Should price tokens per million and treat unpriced models as free"""
+        ledger = _ledger()
+
+        assert ledger.cost_of("gpt-4", 1_000_000, 500_000) == 60.0
+        assert ledger.cost_of("cliproxy", 1_000_000, 1_000_000) == 0.0
+
+    def test_records_are_batched(self):
+        """Should buffer records until the batch is full"""
+        ledger = _ledger(batch_size=3, flush_interval=3600)
+
+        ledger.record("task-1", "gpt-4", "openclaw", 100, 10)
+        ledger.record("task-2", "gpt-4", "openclaw", 100, 10)
+        count = ledger.conn.execute("SELECT COUNT(*) FROM usage_ledger").fetchone()[0]
+        assert count == 0
+
+        ledger.record("task-3", "gpt-4", "openclaw", 100, 10)
+        count = ledger.conn.execute("SELECT COUNT(*) FROM usage_ledger").fetchone()[0]
+        assert count == 3
+
+    def test_minute_rollups(self):
+        """Should pre-aggregate records into one row per minute, model and executor"""
+        ledger = _ledger(batch_size=1)
+
+        ledger.record("task-1", "gpt-4", "openclaw", 100, 10)
+        ledger.record("task-2", "gpt-4", "openclaw", 200, 20)
+        ledger.record("task-3", "cliproxy", "claude_code", 50, 5)
+
+        summary = ledger.get_summary(window_seconds=3600, per_minute=True)
+        totals = {row["model"]: row for row in summary["totals"]}
+
+        assert totals["gpt-4"]["requests"] == 2
+        assert totals["gpt-4"]["input_tokens"] == 300
+        assert totals["gpt-4"]["output_tokens"] == 30
+        assert totals["cliproxy"]["cost"] == 0.0
+        assert len(summary["minutes"]) <= 4
+
+    def test_old_rollups_outside_window(self):
+        """Should exclude rollups older than the query window"""
+        ledger = _ledger()
+        ledger._pending.append(
+            ("task-1", time.time() - 7200, "gpt-4", "openclaw", 100, 10, 1.0)
+        )
+        ledger.flush()
+
+        assert ledger.get_summary(window_seconds=3600)["totals"] == []
+        assert ledger.spent(86400) == 1.0
+
+    def test_near_budget(self):
+        """Should report pressure once spend reaches the threshold, including unflushed records"""
+        ledger = _ledger(
+            budgets={"daily": {"window_seconds": 86400, "limit": 1.0}},
+            budget_threshold=0.5,
+            flush_interval=3600,
+        )
+
+        ledger.record("task-1", "gpt-4", "openclaw", cost=0.4)
+        assert not ledger.near_budget()
+
+        ledger.record("task-2", "gpt-4", "openclaw", cost=0.2)
+        assert ledger.near_budget()
+        assert abs(ledger.budget_status()[0]["spent"] - 0.6) < 1e-9
+
+    def test_from_config(self):
+        """Should build prices and budgets from the usage section"""
+        ledger = UsageLedger.from_config(
+            sqlite3.connect(":memory:"),
+            {
+                "prices": {"gpt-4": {"input": 30, "output": 60}},
+                "budgets": {"hourly": {"window_seconds": 3600, "limit": 2}},
+                "budget_threshold": 0.9,
+                "batch_size": 10,
+            },
+        )
+
+        assert ledger.prices["gpt-4"] == {"input": 30.0, "output": 60.0}
+        assert ledger.budgets["hourly"] == {"window_seconds": 3600.0, "limit": 2.0}
+        assert ledger.budget_threshold == 0.9
+        assert ledger.batch_size == 10